@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""Benchmarks for the check and update paths, run against the stub binaries in stub.py.
+
+    python benchmarks/run.py [--packages 10,500,5000] [--flatpaks 300] [--latency 0.05]
+                             [--line-delay 0] [--fixtures DIR] [--output report.json]
+    python benchmarks/run.py --compare old.json new.json
+
+Every scenario runs in its own process with throwaway XDG directories, so the
+numbers include interpreter start-up and peak RSS is per scenario. The report is
+JSON keyed by "<scenario>@<packages>" and meant to be compared across commits.
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STUB = os.path.join(ROOT, "benchmarks", "stub.py")
+TOOLS = ("zypper", "flatpak", "sudo", "pkexec")
+
+# --- Scenarios, each runs in a child process and prints one JSON object ---
+
+def scenario_check():
+    from check_engine import CheckEngine, flatpak_count
+    start = time.perf_counter()
+    results = CheckEngine(True, True, max_jobs=4, trigger="benchmark").run()
+    return {"wall_s": time.perf_counter() - start, "zypper_updates": results["zypper_updates"],
+            "flatpak_updates": flatpak_count(results)}
+
+def _update_engine(on_lines):
+    from check_engine import CheckEngine, pending_flatpaks
+    results = CheckEngine(True, True, trigger="benchmark").run()
+    pending = pending_flatpaks(results)
+    from update_engine import UpdateEngine
+    return UpdateEngine(True, pending.get("--system", []), pending.get("--user", []),
+                        config={"passwordless_updates": True}, trigger="benchmark", on_lines=on_lines)
+
+def scenario_update():
+    received = [0]
+    engine = _update_engine(lambda lines: received.__setitem__(0, received[0] + len(lines)))
+    start = time.perf_counter()
+    success, log_path = engine.run()
+    wall = time.perf_counter() - start
+    return {"wall_s": wall, "success": success, "lines": received[0], "lines_per_s": received[0] / wall,
+            "log_bytes": os.path.getsize(log_path)}
+
+def scenario_gui_log_flood():
+    try:
+        from PySide6.QtWidgets import QApplication
+        from PySide6.QtCore import QTimer, QElapsedTimer
+    except ImportError:
+        return {"skipped": "PySide6 not installed"}
+    from updater_runner import UpdaterRunner
+    from ui.advanced_window import AdvancedWindow
+    from check_engine import CheckEngine, pending_flatpaks
+
+    app = QApplication(sys.argv)
+    window = AdvancedWindow()
+    window.show()
+    pending = pending_flatpaks(CheckEngine(True, True, trigger="benchmark").run())
+    runner = UpdaterRunner(True, pending.get("--system", []), pending.get("--user", []),
+                           config={"passwordless_updates": True}, trigger="benchmark")
+    runner.log_lines.connect(window.append_lines)
+
+    # A 10 ms ticker: how late it fires is how long the event loop was blocked
+    interval = 10
+    lateness = []
+    clock = QElapsedTimer()
+    ticker = QTimer()
+    ticker.setInterval(interval)
+
+    def tick():
+        lateness.append(max(0.0, clock.restart() - interval))
+    ticker.timeout.connect(tick)
+    runner.update_finished.connect(lambda success, path: app.quit())
+
+    start = time.perf_counter()
+    clock.start()
+    ticker.start()
+    runner.start()
+    app.exec()
+    runner.wait()
+    wall = time.perf_counter() - start
+    lateness.sort()
+    return {"wall_s": wall, "ticks": len(lateness),
+            "latency_p50_ms": lateness[len(lateness) // 2] if lateness else 0.0,
+            "latency_p95_ms": lateness[int(len(lateness) * 0.95)] if lateness else 0.0,
+            "latency_max_ms": lateness[-1] if lateness else 0.0}
+
+SCENARIOS = {
+    "check": scenario_check,
+    "update": scenario_update,
+    "gui_log_flood": scenario_gui_log_flood,
+}
+
+# --- Harness ---
+
+def make_env(workdir, packages, args):
+    bin_dir = os.path.join(workdir, "bin")
+    os.makedirs(bin_dir, exist_ok=True)
+    for tool in TOOLS:
+        os.symlink(STUB, os.path.join(bin_dir, tool))
+    env = dict(os.environ)
+    env.update({
+        "PATH": bin_dir + os.pathsep + env.get("PATH", ""),
+        "PYTHONPATH": ROOT,
+        "XDG_STATE_HOME": os.path.join(workdir, "state"),
+        "XDG_CACHE_HOME": os.path.join(workdir, "cache"),
+        "XDG_CONFIG_HOME": os.path.join(workdir, "config"),
+        "XDG_CONFIG_DIRS": os.path.join(workdir, "config-system"),
+        "QT_QPA_PLATFORM": "offscreen",
+        "BENCH_PACKAGES": str(packages),
+        "BENCH_FLATPAKS": str(args.flatpaks),
+        "BENCH_LATENCY": str(args.latency),
+        "BENCH_LINE_DELAY": str(args.line_delay),
+        "BENCH_FIXTURES": args.fixtures or "",
+    })
+    return env
+
+def run_process(cmd, env):
+    """Runs cmd and returns (stdout, wall seconds, peak RSS in KiB, exit code)."""
+    start = time.perf_counter()
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, env=env, cwd=ROOT)
+    try:
+        out = proc.stdout.read()
+        _, status, rusage = os.wait4(proc.pid, 0)
+    finally:
+        proc.stdout.close()
+    proc.returncode = os.waitstatus_to_exitcode(status)
+    return out.decode(errors="replace"), time.perf_counter() - start, rusage.ru_maxrss, proc.returncode
+
+def run_scenario(name, env):
+    out, wall, rss, code = run_process([sys.executable, os.path.abspath(__file__), "--scenario", name], env)
+    try:
+        result = json.loads(out.strip().splitlines()[-1])
+    except (ValueError, IndexError):
+        result = {"error": f"scenario exited with {code}"}
+    result.update(process_wall_s=wall, peak_rss_kib=rss)
+    return result
+
+def run_cli_startup(env):
+    out, wall, rss, code = run_process([sys.executable, os.path.join(ROOT, "main.py"), "check", "--json"], env)
+    return {"wall_s": wall, "exit_code": code, "peak_rss_kib": rss}
+
+def run_gui_startup(env, timeout):
+    try:
+        import PySide6 # noqa: F401, only checks that the GUI can start at all
+    except ImportError:
+        return {"skipped": "PySide6 not installed"}
+    startup_file = os.path.join(env["XDG_STATE_HOME"], "suse-updater", "startup.json")
+    proc = subprocess.Popen([sys.executable, os.path.join(ROOT, "main.py")], env=env, cwd=ROOT,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + timeout
+    entry = None
+    while time.monotonic() < deadline and entry is None:
+        time.sleep(0.05)
+        try:
+            with open(startup_file) as f:
+                entries = json.load(f)
+            entry = entries[-1] if entries else None
+        except (OSError, ValueError):
+            pass
+    proc.terminate()
+    _, status, rusage = os.wait4(proc.pid, 0)
+    if entry is None:
+        return {"error": "no time-to-tray recorded"}
+    return {"time_to_tray_ms": entry.get("time_to_tray_ms"), "peak_rss_kib": rusage.ru_maxrss}
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+def run_all(args):
+    report = {
+        "meta": {"commit": git_commit(), "date": time.strftime("%Y-%m-%dT%H:%M:%S"), "python": platform.python_version(),
+                 "platform": platform.platform(), "flatpaks": args.flatpaks, "latency": args.latency,
+                 "line_delay": args.line_delay, "fixtures": args.fixtures},
+        "results": {},
+    }
+    for packages in args.packages:
+        runs = [(name, lambda env, name=name: run_scenario(name, env)) for name in SCENARIOS]
+        runs.append(("cli_startup", run_cli_startup))
+        runs.append(("gui_startup", lambda env: run_gui_startup(env, args.timeout)))
+        for name, fn in runs:
+            workdir = tempfile.mkdtemp(prefix="suse-updater-bench-")
+            try:
+                result = fn(make_env(workdir, packages, args))
+            finally:
+                shutil.rmtree(workdir, ignore_errors=True)
+            report["results"][f"{name}@{packages}"] = result
+            print(f"{name}@{packages}: {json.dumps(result)}", file=sys.stderr)
+    return report
+
+def compare(old_path, new_path):
+    with open(old_path) as f:
+        old = json.load(f)
+    with open(new_path) as f:
+        new = json.load(f)
+    print(f"{old['meta'].get('commit')} -> {new['meta'].get('commit')}")
+    for key in sorted(set(old["results"]) & set(new["results"])):
+        for metric, new_value in sorted(new["results"][key].items()):
+            old_value = old["results"][key].get(metric)
+            if isinstance(new_value, bool) or not isinstance(new_value, (int, float)) or not isinstance(old_value, (int, float)):
+                continue
+            ratio = f"{new_value / old_value:6.2f}x" if old_value else "     -"
+            print(f"{key:28} {metric:18} {old_value:14.4f} {new_value:14.4f} {ratio}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--packages", default="10,500,5000", help="comma separated pending package counts")
+    parser.add_argument("--flatpaks", type=int, default=300)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds before each stub command answers")
+    parser.add_argument("--line-delay", type=float, default=0.0, help="seconds between stub output lines")
+    parser.add_argument("--fixtures", help="directory with recorded outputs to replay, see stub.py")
+    parser.add_argument("--timeout", type=float, default=600, help="seconds to wait for the GUI to reach the tray")
+    parser.add_argument("--output", help="report file (default: stdout)")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"))
+    parser.add_argument("--scenario", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.scenario:
+        sys.path.insert(0, ROOT)
+        print(json.dumps(SCENARIOS[args.scenario]()))
+        return 0
+    if args.compare:
+        compare(*args.compare)
+        return 0
+
+    args.packages = [int(n) for n in args.packages.split(",") if n]
+    report = run_all(args)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+# Stand-in for zypper, flatpak, sudo and pkexec, selected by the name it is called as.
+# The harness symlinks it into a temporary bin directory at the front of PATH.
+#
+# BENCH_PACKAGES   packages in the pending dup (default 100)
+# BENCH_FLATPAKS   pending Flatpaks, two thirds system and one third user (default 30)
+# BENCH_LATENCY    seconds before a command produces output (default 0)
+# BENCH_LINE_DELAY seconds between output lines (default 0)
+# BENCH_FIXTURES   directory with recorded outputs, see fixture_name(); replayed instead of synthesized
+import os
+import sys
+import time
+
+PACKAGES = int(os.environ.get("BENCH_PACKAGES", "100"))
+FLATPAKS = int(os.environ.get("BENCH_FLATPAKS", "30"))
+LATENCY = float(os.environ.get("BENCH_LATENCY", "0"))
+LINE_DELAY = float(os.environ.get("BENCH_LINE_DELAY", "0"))
+FIXTURES = os.environ.get("BENCH_FIXTURES", "")
+
+def emit(lines):
+    time.sleep(LATENCY)
+    out = sys.stdout
+    for line in lines:
+        out.write(line + "\n")
+        if LINE_DELAY:
+            out.flush()
+            time.sleep(LINE_DELAY)
+    out.flush()
+
+def fixture_name(tool, args):
+    # e.g. zypper--non-interactive--xmlout-dup--dry-run.out
+    return tool + "".join("-" + a for a in args if not a.startswith("--installation=") and "." not in a) + ".out"
+
+def replay(tool, args):
+    if not FIXTURES:
+        return False
+    path = os.path.join(FIXTURES, fixture_name(tool, args))
+    if not os.path.exists(path):
+        return False
+    with open(path, encoding="utf-8") as f:
+        emit(f.read().splitlines())
+    return True
+
+def package(i):
+    return f"pkg{i:05d}", f"1.{i}-1.1", f"1.{i}-2.1", "x86_64" if i % 3 else "noarch"
+
+def zypper_xml():
+    yield "<?xml version='1.0'?>"
+    yield "<stream>"
+    yield "<message type=\"info\">Loading repository data...</message>"
+    yield f"<install-summary download-size=\"{PACKAGES * 1048576}\" space-usage-diff=\"0\" packages-to-change=\"{PACKAGES}\">"
+    yield "<to-upgrade>"
+    for i in range(PACKAGES):
+        name, old, new, arch = package(i)
+        yield (f"<solvable type=\"package\" name=\"{name}\" edition=\"{new}\" edition-old=\"{old}\" arch=\"{arch}\""
+               f" repository=\"repo-oss\" download-size=\"1048576\"/>")
+    yield "</to-upgrade>"
+    yield "</install-summary>"
+    yield "</stream>"
+
+def zypper_text():
+    yield "Loading repository data..."
+    yield "Reading installed packages..."
+    yield "Computing distribution upgrade..."
+    if not PACKAGES:
+        yield "Nothing to do."
+        return
+    yield ""
+    yield f"The following {PACKAGES} packages are going to be upgraded:"
+    yield "  " + " ".join(package(i)[0] for i in range(PACKAGES))
+    yield ""
+    yield f"{PACKAGES} packages to upgrade."
+    yield f"Overall download size: {PACKAGES}.0 MiB. Already cached: 0 B."
+
+def zypper_dup(download_only):
+    yield from list(zypper_text())[3:]
+    for i in range(PACKAGES):
+        name, old, new, arch = package(i)
+        yield f"Retrieving: {name}-{new}.{arch} (Main Repository (OSS)) ({i + 1}/{PACKAGES}),   1.0 MiB"
+        yield f"Retrieving: {name}-{new}.{arch}.rpm ....................[done (10.0 MiB/s)]"
+    if download_only:
+        return
+    yield "Checking for file conflicts: ....................[done]"
+    for i in range(PACKAGES):
+        name, old, new, arch = package(i)
+        yield f"({i + 1}/{PACKAGES}) Installing: {name}-{new}.{arch} ....................[done]"
+
+def zypper(args):
+    if replay("zypper", args):
+        return 0
+    if "ref" in args:
+        emit([f"Retrieving repository 'repo-{r}' metadata ....................[done]" for r in range(4)]
+             + ["All repositories have been refreshed."])
+    elif "--xmlout" in args:
+        emit(zypper_xml())
+    elif "--dry-run" in args:
+        emit(zypper_text())
+    elif "dup" in args:
+        emit(zypper_dup("--download-only" in args))
+    return 0
+
+def flatpak_apps(scope):
+    system = FLATPAKS * 2 // 3
+    if scope == "--user":
+        return [f"org.bench.User{i:03d}" for i in range(FLATPAKS - system)]
+    if scope == "--system":
+        return [f"org.bench.System{i:03d}" for i in range(system)]
+    return []
+
+def flatpak(args):
+    if replay("flatpak", args):
+        return 0
+    scope = next((a for a in args if a in ("--system", "--user") or a.startswith("--installation=")), "--system")
+    if "remote-ls" in args:
+        emit(f"{app}\tBench {app[-3:]}\t{i:040x}" for i, app in enumerate(flatpak_apps(scope)))
+    elif "update" in args:
+        apps = [a for a in args if a.startswith("org.")]
+        lines = []
+        for i, app in enumerate(apps):
+            for percent in (0, 50, 100):
+                lines.append(f"Updating {i + 1}/{len(apps)}… {app} {percent}%  5.0 MB/s")
+        lines.append("Updates complete.")
+        emit(lines)
+    return 0
+
+def sudo(args):
+    # -n and friends are accepted and ignored, -l answers "allowed"
+    rest = list(args)
+    listing = False
+    while rest and rest[0].startswith("-"):
+        listing = listing or rest[0] == "-l"
+        rest.pop(0)
+    if listing:
+        return 0
+    command = os.path.basename(rest[0])
+    os.execvp(command, [command] + rest[1:])
+
+def pkexec(args):
+    os.execvp(args[0], args)
+
+def main():
+    tool = os.path.basename(sys.argv[0])
+    handler = {"zypper": zypper, "flatpak": flatpak, "sudo": sudo, "pkexec": pkexec}.get(tool)
+    if handler is None:
+        sys.stderr.write(f"stub.py: unknown tool {tool}\n")
+        return 127
+    return handler(sys.argv[1:])
+
+if __name__ == "__main__":
+    sys.exit(main())
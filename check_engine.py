@@ -0,0 +1,355 @@
+import os
+import time
+import glob
+import subprocess
+import logging
+import configparser
+import tempfile
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor
+
+from zypper_xml import parse_dup_xml, summarize
+from zypper_text import parse_dup_text, OUTPUT_TAIL_LINES
+import dry_run_cache
+from repo_refresh import RefreshPolicy, DEFAULT_WINDOW_MINUTES
+from history import HistoryDB, PhaseRecorder, CountingReader
+from proc_control import ProcessGroup, Cancelled, DEFAULT_CHECK_TIMEOUT_MINUTES
+from zypp_lock import wait_for_lock, DEFAULT_LOCK_WAIT, ZYPPER_EXIT_LOCKED
+
+FLATPAK_INSTALLATIONS_DIR = "/etc/flatpak/installations.d"
+STDERR_TAIL_BYTES = 65536
+# Another process can grab the zypp lock between our wait and zypper starting
+LOCK_ATTEMPTS = 3
+
+def discover_flatpak_installations(conf_dir=FLATPAK_INSTALLATIONS_DIR):
+    # Custom system-wide installations are declared as [Installation "id"] sections
+    names = []
+    for path in sorted(glob.glob(os.path.join(conf_dir, "*.conf"))):
+        parser = configparser.ConfigParser(interpolation=None)
+        try:
+            parser.read(path)
+        except configparser.Error as e:
+            logging.getLogger("CheckEngine").warning(f"Ignoring unreadable flatpak installation file {path}: {e}")
+            continue
+        for section in parser.sections():
+            if section.startswith("Installation "):
+                name = section[len("Installation "):].strip().strip('"')
+                if name and name not in names:
+                    names.append(name)
+    return names
+
+def parse_flatpak_updates(output):
+    lines = [line.strip() for line in output.strip().split('\n') if line.strip() and not line.startswith("Application ID")]
+    return [line.split('\t')[0].split(' ')[0] for line in lines if line] # robust split for app_id
+
+def parse_flatpak_commits(output):
+    # app id -> remote commit, from the third column
+    commits = {}
+    for line in output.strip().split('\n'):
+        fields = line.strip().split('\t')
+        if len(fields) >= 3 and not line.startswith("Application ID"):
+            commits[fields[0].split(' ')[0]] = fields[2].strip()
+    return commits
+
+def pending_flatpaks(results):
+    """{scope: [app, ...]} with the scope as passed to flatpak: --system, --user or --installation=<id>"""
+    pending = {"--system": results.get("flatpak_system_updates", []), "--user": results.get("flatpak_user_updates", [])}
+    for name, apps in results.get("flatpak_installation_updates", {}).items():
+        pending[f"--installation={name}"] = apps
+    return {scope: apps for scope, apps in pending.items() if apps}
+
+def empty_results():
+    return {
+        "zypper_updates": 0,
+        "zypper_conflict": False,
+        "zypper_output": "",
+        "zypper_packages": [],
+        "zypper_problems": [],
+        "zypper_download_size": 0,
+        "flatpak_system_updates": [],
+        "flatpak_user_updates": [],
+        "flatpak_installation_updates": {},
+        "flatpak_commits": {}, # scope -> {app: commit}
+        "flatpak_output": ""
+    }
+
+def flatpak_count(results):
+    return (len(results.get("flatpak_system_updates", [])) + len(results.get("flatpak_user_updates", []))
+            + sum(len(apps) for apps in results.get("flatpak_installation_updates", {}).values()))
+
+def result_state(results):
+    """conflicts, updates_ready or up_to_date"""
+    if results.get("zypper_conflict"):
+        return "conflicts"
+    if results.get("zypper_updates", 0) or flatpak_count(results):
+        return "updates_ready"
+    return "up_to_date"
+
+class CheckEngine:
+    """Runs one update check and returns the results dict. Needs no Qt, the GUI wraps it in UpdateChecker."""
+
+    def __init__(self, check_zypper=True, check_flatpak=True, max_jobs=4, refresh_window=DEFAULT_WINDOW_MINUTES, trigger="manual",
+                 lock_wait=DEFAULT_LOCK_WAIT, timeout_minutes=DEFAULT_CHECK_TIMEOUT_MINUTES, shared_path=dry_run_cache.SHARED_PATH,
+                 shared_max_age=dry_run_cache.DEFAULT_SHARED_MAX_AGE_MINUTES):
+        self.trigger = trigger # timer, startup, manual, settings, post_update
+        self.recorder = PhaseRecorder()
+        self.zypper_exit = None
+        self.fingerprint = None # of the system the zypper result belongs to
+        # The system-wide dry-run, see `suse-updater publish`. Empty to always run our own
+        self.shared_path = shared_path
+        self.shared_max_age = shared_max_age
+        self.check_zypper = check_zypper
+        self.check_flatpak = check_flatpak
+        self.max_jobs = max(1, max_jobs)
+        self.refresh_window = refresh_window
+        self.lock_wait = lock_wait
+        self.timeout = timeout_minutes * 60 or None # per subprocess, 0 disables it
+        self.procs = ProcessGroup()
+        self.logger = logging.getLogger("CheckEngine")
+
+    def cancel(self):
+        """Stops the running subprocesses, run() then raises Cancelled. Safe to call from any thread."""
+        self.procs.cancel()
+
+    def _wait_for_zypp(self):
+        started = time.time()
+        waited = []
+
+        def announce(pid, name):
+            waited.append(name)
+            self.logger.info(f"Waiting for {name} (pid {pid}) to release the zypp lock...")
+        free = wait_for_lock(self.lock_wait, announce, cancelled=lambda: self.procs.cancelled)
+        if waited:
+            self.recorder.add("zypp_lock_wait", started, time.time() - started)
+        if self.procs.cancelled:
+            raise Cancelled()
+        if not free:
+            raise RuntimeError(f"The package manager is still locked by {waited[-1]} after {self.lock_wait // 60} min.")
+
+    def _refresh_repos(self):
+        policy = RefreshPolicy(self.refresh_window)
+        ref_cmd = policy.plan()
+        if ref_cmd is None:
+            self.logger.info("All repositories were refreshed recently, skipping zypper ref.")
+            return
+
+        self._wait_for_zypp()
+        self.logger.info(f"Running {' '.join(ref_cmd)}...")
+        with self.recorder.phase("zypper_ref") as phase:
+            # Through the root helper, or the sudoers rule that allows password-less execution
+            ref_proc = self.procs.run(["sudo", "-n"] + ref_cmd, self.timeout, ("refresh", {"repos": ref_cmd[3:]}))
+            if ref_proc.returncode != 0 and len(ref_cmd) > 3 and not ref_proc.timed_out:
+                # Sudoers rules from older versions only allow a full refresh
+                ref_cmd = ref_cmd[:3]
+                ref_proc = self.procs.run(["sudo", "-n"] + ref_cmd, self.timeout, ("refresh", {"repos": []}))
+            phase["exit_code"] = ref_proc.returncode
+            phase["output_bytes"] = len(ref_proc.stdout) + len(ref_proc.stderr)
+        if ref_proc.timed_out:
+            # A dead mirror shouldn't stop the check, the cached metadata is still there
+            self.logger.warning("zypper ref timed out, checking against the cached metadata.")
+        elif ref_proc.returncode == 0:
+            policy.record_refresh(ref_cmd)
+
+    def _shared_dry_run(self):
+        # A manual check asks for fresh metadata
+        if not self.shared_path or self.trigger == "manual" or not os.path.exists(self.shared_path):
+            return None
+        with self.recorder.phase("zypper_shared"):
+            fingerprint = dry_run_cache.system_fingerprint()
+            shared = dry_run_cache.load(fingerprint, self.shared_path, self.shared_max_age * 60)
+        if shared is None:
+            self.logger.info("The system-wide check is outdated, checking ourselves.")
+            return None
+        self.logger.info("Using the system-wide check, no zypper needed.")
+        self.fingerprint = fingerprint
+        return shared
+
+    def _check_zypper(self):
+        shared = self._shared_dry_run()
+        if shared is not None:
+            result, self.zypper_exit = shared
+            return result
+
+        self._refresh_repos()
+
+        with self.recorder.phase("zypper_fingerprint"):
+            self.fingerprint = fingerprint = dry_run_cache.system_fingerprint()
+            cached = dry_run_cache.load(fingerprint)
+        if cached is not None:
+            self.logger.info("Repositories and installed packages unchanged since the last check, reusing its dry-run.")
+            result, self.zypper_exit = cached
+            return result
+
+        for attempt in range(LOCK_ATTEMPTS):
+            self._wait_for_zypp()
+            self.logger.info("Running zypper dry-run...")
+            result = self._zypper_dry_run_xml()
+            if result is None:
+                # Older sudoers rules only allow the plain text dry-run
+                self.logger.info("XML dry-run unavailable, falling back to text output.")
+                result = self._zypper_dry_run_text()
+            if self.zypper_exit != ZYPPER_EXIT_LOCKED:
+                break
+            self.logger.info("Another process took the zypp lock first, waiting again.")
+        else:
+            # Not a conflict in the update itself, so report it as a failed check
+            raise RuntimeError("The package manager stayed locked by another process.")
+        if dry_run_cache.cacheable(self.zypper_exit):
+            dry_run_cache.save(fingerprint, result, self.zypper_exit)
+        return result
+
+    def _zypper_dry_run_xml(self):
+        zypper_cmd = ["sudo", "-n", "zypper", "--non-interactive", "--xmlout", "dup", "--dry-run"]
+        with tempfile.TemporaryFile() as err, self.recorder.phase("zypper_dry_run") as phase:
+            proc = self.procs.privileged("dry_run", {"xml": True}, zypper_cmd, self.timeout, stdout=subprocess.PIPE, stderr=err)
+            stdout = CountingReader(proc.stdout)
+            try:
+                parsed = parse_dup_xml(stdout)
+            except ET.ParseError as e:
+                # Also what a dry-run cut short by its timeout looks like
+                if not proc.timed_out:
+                    self.logger.warning(f"Could not parse zypper XML output: {e}")
+                parsed = None
+            finally:
+                proc.stdout.close()
+                proc.wait()
+                self.procs.release(proc)
+            phase["exit_code"] = self.zypper_exit = proc.returncode
+            err_size = os.fstat(err.fileno()).st_size
+            phase["output_bytes"] = stdout.count + err_size
+            err.seek(max(0, err_size - STDERR_TAIL_BYTES))
+            stderr = err.read().decode(errors="replace")
+        if proc.timed_out:
+            raise RuntimeError(f"zypper dry-run did not finish within {self.timeout // 60} min.")
+
+        if parsed is None or not parsed["valid"]:
+            if stderr.strip():
+                self.logger.warning(f"zypper --xmlout failed: {stderr.strip()}")
+            return None
+
+        result = {
+            "zypper_updates": parsed["packages_to_change"],
+            "zypper_conflict": False,
+            "zypper_output": summarize(parsed, OUTPUT_TAIL_LINES) + ("\n" + stderr if stderr.strip() else ""),
+            "zypper_packages": parsed["packages"],
+            "zypper_problems": parsed["problems"],
+            "zypper_download_size": parsed["download_size"],
+        }
+        # Exit codes 100+ are informational (reboot/restart needed etc.)
+        if parsed["problems"] or (proc.returncode != 0 and proc.returncode < 100 and not parsed["packages"]):
+            self.logger.warning("Zypper conflict or problem detected.")
+            result["zypper_conflict"] = True
+        return result
+
+    def _zypper_dry_run_text(self):
+        zypper_cmd = ["sudo", "-n", "zypper", "--non-interactive", "dup", "--dry-run"]
+        # The parser matches English messages, sudo keeps LC_ALL in its default env_keep, the helper sets it itself
+        env = dict(os.environ, LC_ALL="C")
+        with self.recorder.phase("zypper_dry_run_text") as phase:
+            proc = self.procs.privileged("dry_run", {"xml": False}, zypper_cmd, self.timeout,
+                                         stdout=subprocess.PIPE, stderr=subprocess.STDOUT, env=env)
+            stdout = CountingReader(proc.stdout)
+            try:
+                parsed = parse_dup_text(stdout)
+            finally:
+                proc.stdout.close()
+                proc.wait()
+                self.procs.release(proc)
+            phase["exit_code"] = self.zypper_exit = proc.returncode
+            phase["output_bytes"] = stdout.count
+        if proc.timed_out:
+            raise RuntimeError(f"zypper dry-run did not finish within {self.timeout // 60} min.")
+
+        result = parsed.result(proc.returncode)
+        if result["zypper_conflict"]:
+            self.logger.warning("Zypper conflict or problem detected.")
+        return result
+
+    def _check_flatpak(self, scope):
+        # scope is --system, --user or --installation=<id>
+        self.logger.info(f"Running flatpak check ({scope})...")
+        with self.recorder.phase("flatpak_" + scope.lstrip("-").replace("=", ":")) as phase:
+            proc = self.procs.run(["flatpak", "remote-ls", "--updates", scope, "--columns=app,name,commit"], self.timeout)
+            phase["exit_code"] = proc.returncode
+            phase["output_bytes"] = len(proc.stdout) + len(proc.stderr)
+        if proc.timed_out:
+            raise RuntimeError(f"flatpak remote-ls did not finish within {self.timeout // 60} min.")
+        return proc.stdout
+
+    def run(self):
+        try:
+            results = empty_results()
+
+            installations = discover_flatpak_installations() if self.check_flatpak else []
+
+            # Zypper and every flatpak installation are independent, so they run side by side
+            # and the whole check takes about as long as the slowest backend.
+            with ThreadPoolExecutor(max_workers=self.max_jobs) as pool:
+                zypper_job = pool.submit(self._check_zypper) if self.check_zypper else None
+                sys_job = usr_job = None
+                inst_jobs = {}
+                if self.check_flatpak:
+                    sys_job = pool.submit(self._check_flatpak, "--system")
+                    usr_job = pool.submit(self._check_flatpak, "--user")
+                    for name in installations:
+                        inst_jobs[name] = pool.submit(self._check_flatpak, f"--installation={name}")
+
+                # 1. Zypper Check
+                if zypper_job:
+                    results.update(zypper_job.result())
+
+                if self.check_flatpak:
+                    # 2. Flatpak Check (System)
+                    sys_out = self._job_output(sys_job, "system")
+                    results["flatpak_output"] += "System Flatpaks:\n" + sys_out + "\n"
+                    results["flatpak_system_updates"] = parse_flatpak_updates(sys_out)
+                    results["flatpak_commits"]["--system"] = parse_flatpak_commits(sys_out)
+
+                    # 3. Flatpak Check (User)
+                    usr_out = self._job_output(usr_job, "user")
+                    results["flatpak_output"] += "User Flatpaks:\n" + usr_out + "\n"
+                    results["flatpak_user_updates"] = parse_flatpak_updates(usr_out)
+                    results["flatpak_commits"]["--user"] = parse_flatpak_commits(usr_out)
+
+                    # 4. Flatpak Check (Custom installations)
+                    for name, job in inst_jobs.items():
+                        inst_out = self._job_output(job, name)
+                        results["flatpak_output"] += f"Installation '{name}' Flatpaks:\n" + inst_out + "\n"
+                        apps = parse_flatpak_updates(inst_out)
+                        if apps:
+                            results["flatpak_installation_updates"][name] = apps
+                            results["flatpak_commits"][f"--installation={name}"] = parse_flatpak_commits(inst_out)
+
+            # Whatever the killed commands printed is not a result
+            if self.procs.cancelled:
+                raise Cancelled()
+
+        except Cancelled:
+            self._record_history(None, cancelled=True)
+            raise
+        except Exception:
+            self._record_history(None)
+            raise
+
+        self._record_history(results)
+        return results
+
+    def _job_output(self, job, label):
+        # A broken flatpak installation must not take the other results down with it
+        try:
+            return job.result()
+        except Cancelled:
+            raise
+        except Exception as e:
+            self.logger.error(f"Flatpak check ({label}) failed: {e}")
+            return ""
+
+    def _record_history(self, results, cancelled=False):
+        if results is None:
+            HistoryDB().record_run("check", self.trigger, self.recorder, success=False,
+                                   exit_code=self.zypper_exit, state="cancelled" if cancelled else "error")
+            return
+        HistoryDB().record_run("check", self.trigger, self.recorder, success=True, exit_code=self.zypper_exit,
+                               state=result_state(results), zypper_count=results["zypper_updates"],
+                               flatpak_count=flatpak_count(results),
+                               download_size=results["zypper_download_size"])
@@ -0,0 +1,276 @@
+import os
+import sys
+import json
+import time
+import shlex
+import signal
+import logging
+import argparse
+from contextlib import contextmanager
+
+from check_engine import CheckEngine, result_state, flatpak_count
+from update_engine import UpdateEngine
+from config import read_config
+from zypper_xml import format_size
+from scheduler import CheckScheduler
+from predownload import Predownloader, is_staged, ready_to_install
+from flatpak_prefetch import FlatpakPrefetcher
+from proc_control import Cancelled
+import result_cache
+import dry_run_cache
+import fleet
+
+# Same convention as zypper: 100 means "there is something to install"
+EXIT_UP_TO_DATE = 0
+EXIT_ERROR = 1
+EXIT_CONFLICTS = 2
+EXIT_UPDATES = 100
+EXIT_CANCELLED = 130
+
+COMMANDS = ("check", "apply", "publish", "fleet")
+
+def is_cli(argv):
+    # Options like -v may come before the command
+    return next((arg for arg in argv if not arg.startswith("-")), None) in COMMANDS
+
+class _Parser(argparse.ArgumentParser):
+    # argparse exits with 2 on usage errors, which would read as "conflicts"
+    def error(self, message):
+        self.print_usage(sys.stderr)
+        self.exit(EXIT_ERROR, f"{self.prog}: error: {message}\n")
+
+def _build_parser():
+    parser = _Parser(prog="suse-updater", description="Check for and apply zypper and Flatpak updates without the GUI.")
+    parser.add_argument("-v", "--verbose", action="store_true", help="log progress to stderr")
+    # Also accepted after the command, without resetting a -v given before it
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("-v", "--verbose", action="store_true", default=argparse.SUPPRESS, help="log progress to stderr")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    check = sub.add_parser("check", parents=[common], help="check for updates (exit 0 up to date, 100 updates, 2 conflicts, 1 error)")
+    check.add_argument("--json", action="store_true", help="print the full results as JSON")
+    check.add_argument("--no-zypper", action="store_true", help="skip the zypper check")
+    check.add_argument("--no-flatpak", action="store_true", help="skip the Flatpak check")
+    check.add_argument("--predownload", action="store_true",
+                       help="download pending updates at low priority afterwards (state becomes ready_to_install)")
+    check.add_argument("--no-record", action="store_true",
+                       help="leave the tray app's cached result and check schedule alone")
+
+    apply = sub.add_parser("apply", parents=[common], help="check, then install every available update")
+    apply.add_argument("--json", action="store_true", help="print the outcome as JSON")
+    apply.add_argument("--no-zypper", action="store_true", help="leave system packages alone")
+    apply.add_argument("--no-flatpak", action="store_true", help="leave Flatpaks alone")
+    apply.add_argument("--passwordless", action="store_true",
+                       help="use the sudoers rule instead of pkexec (needed without a polkit agent)")
+
+    publish = sub.add_parser("publish", parents=[common], help="as root: run the zypper check once for all users (suse-updater-check.timer)")
+    publish.add_argument("--output", default=dry_run_cache.SHARED_PATH, help="where to publish the result")
+
+    fleet_cmd = sub.add_parser("fleet", parents=[common], help="check many hosts and show one table (exit 1 if a host failed, else like check)")
+    fleet_cmd.add_argument("hosts", nargs="*", help="host names as passed to the transport")
+    fleet_cmd.add_argument("--hosts-file", help="file with one host per line, # starts a comment")
+    fleet_cmd.add_argument("--transport", choices=sorted(fleet.TRANSPORTS), default="ssh",
+                           help="ssh, or local to run the check here for every host (testing)")
+    fleet_cmd.add_argument("--check-command", help="check command to run instead of 'suse-updater check --json'")
+    fleet_cmd.add_argument("--jobs", type=int, default=fleet.DEFAULT_JOBS, help="hosts checked at once")
+    fleet_cmd.add_argument("--timeout", type=int, default=fleet.DEFAULT_HOST_TIMEOUT_MINUTES,
+                           help="minutes per host, 0 waits forever")
+    fleet_cmd.add_argument("--max-age", type=int, default=fleet.DEFAULT_MAX_AGE_MINUTES,
+                           help="minutes before a host's result is polled again")
+    fleet_cmd.add_argument("--all", action="store_true", help="poll every host, not just the stale ones")
+    fleet_cmd.add_argument("--json", action="store_true", help="print the rows as JSON")
+    return parser
+
+@contextmanager
+def _cancel_on_signals(job):
+    # Commands run in their own process groups, so Ctrl-C only reaches us and has to be passed on
+    def handler(signum, frame):
+        logging.getLogger("CLI").warning("Interrupted, stopping...")
+        job.cancel()
+    previous = {sig: signal.signal(sig, handler) for sig in (signal.SIGINT, signal.SIGTERM)}
+    try:
+        yield
+    finally:
+        for sig, old_handler in previous.items():
+            signal.signal(sig, old_handler)
+
+def _run_check(config, args, trigger):
+    check_zypper = config["check_zypper"] and not args.no_zypper
+    check_flatpak = config["check_flatpak"] and not args.no_flatpak
+    # The tray app shows the cached result on its next start and waits for its next due time instead of
+    # checking again, so only a check of the same backends as its own may stand in for it
+    record = ((check_zypper, check_flatpak) == (config["check_zypper"], config["check_flatpak"])
+              and not getattr(args, "no_record", False))
+    scheduler = CheckScheduler(config["check_interval_minutes"])
+    engine = CheckEngine(check_zypper, check_flatpak,
+                         max_jobs=config["check_concurrency"], refresh_window=config["refresh_window_minutes"], trigger=trigger,
+                         timeout_minutes=config["check_timeout_minutes"], shared_path=config["system_check_file"],
+                         shared_max_age=config["system_check_max_age_minutes"])
+    try:
+        with _cancel_on_signals(engine):
+            results = engine.run()
+    except Cancelled:
+        if record:
+            scheduler.record("cancelled")
+        raise
+    except Exception:
+        if record:
+            scheduler.record("error")
+        raise
+    if record:
+        result_cache.save_results(results)
+        scheduler.record(result_state(results))
+    return results
+
+def _print_summary(results, state):
+    zypper_line = f"zypper: {results['zypper_updates']} package(s)"
+    if results.get("zypper_download_size"):
+        zypper_line += f", {format_size(results['zypper_download_size'])} to download"
+    print(zypper_line)
+    if results["zypper_conflict"]:
+        problems = results.get("zypper_problems") or []
+        print("zypper: conflicts detected" + (f": {problems[0]['description']}" if problems else ""))
+    print(f"flatpak: {len(results['flatpak_system_updates'])} system, {len(results['flatpak_user_updates'])} user")
+    for name, apps in results["flatpak_installation_updates"].items():
+        print(f"flatpak: {len(apps)} in installation '{name}'")
+    print(f"state: {state}")
+
+def _exit_code(state):
+    return {"conflicts": EXIT_CONFLICTS, "updates_ready": EXIT_UPDATES, "ready_to_install": EXIT_UPDATES}.get(state, EXIT_UP_TO_DATE)
+
+def cmd_check(config, args):
+    results = _run_check(config, args, "cli")
+    state = result_state(results)
+    if state == "updates_ready":
+        if args.predownload or config["predownload"]:
+            downloader = Predownloader("cli")
+            if results.get("zypper_packages") and not is_staged(results):
+                with _cancel_on_signals(downloader):
+                    downloader.run()
+            if downloader.cancelled:
+                raise Cancelled()
+            prefetcher = FlatpakPrefetcher(results, "cli")
+            with _cancel_on_signals(prefetcher):
+                prefetcher.run()
+        if ready_to_install(results):
+            state = "ready_to_install"
+    if args.json:
+        json.dump(dict(results, state=state, checked_at=time.time()), sys.stdout, indent=2)
+        print()
+    else:
+        _print_summary(results, state)
+    return _exit_code(state)
+
+def cmd_apply(config, args):
+    results = _run_check(config, args, "cli")
+    state = result_state(results)
+    outcome = {"state": state, "zypper_updates": results["zypper_updates"], "flatpak_updates": flatpak_count(results),
+               "success": True, "log_path": None}
+
+    if state == "conflicts":
+        logging.getLogger("CLI").error("zypper reported conflicts, resolve them with 'zypper dup' first.")
+        outcome["success"] = False
+        code = EXIT_CONFLICTS
+    elif state == "up_to_date":
+        code = EXIT_UP_TO_DATE
+    else:
+        if args.passwordless:
+            config = dict(config, passwordless_updates=True)
+        engine = UpdateEngine(results["zypper_updates"] > 0, results["flatpak_system_updates"], results["flatpak_user_updates"],
+                              results["flatpak_installation_updates"], config=config, trigger="cli",
+                              zypper_count=results["zypper_updates"], on_lines=_echo_lines)
+        with _cancel_on_signals(engine):
+            success, log_path = engine.run()
+        outcome.update(success=success, log_path=log_path)
+        code = EXIT_UP_TO_DATE if success else (EXIT_CANCELLED if engine.cancelled else EXIT_ERROR)
+
+    if args.json:
+        json.dump(outcome, sys.stdout, indent=2)
+        print()
+    elif outcome["log_path"]:
+        print(f"{'updated' if outcome['success'] else 'update failed'}, log: {outcome['log_path']}")
+    else:
+        print(f"state: {state}")
+    return code
+
+def cmd_publish(config, args):
+    if os.geteuid() != 0:
+        logging.getLogger("CLI").error("publish needs root, it runs from suse-updater-check.service.")
+        return EXIT_ERROR
+    # Flatpaks are checked by every user, --user is theirs anyway and the rest needs no zypp lock
+    engine = CheckEngine(True, False, refresh_window=config["refresh_window_minutes"], trigger="system",
+                         timeout_minutes=config["check_timeout_minutes"], shared_path="")
+    with _cancel_on_signals(engine):
+        results = engine.run()
+    if not dry_run_cache.cacheable(engine.zypper_exit) or engine.fingerprint is None:
+        # The last good result stays until it gets too old, then the users check themselves
+        logging.getLogger("CLI").error(f"zypper exited with {engine.zypper_exit} or the system can't be fingerprinted, "
+                                       "nothing published.")
+        return EXIT_ERROR
+    zypper_result = {key: value for key, value in results.items() if key.startswith("zypper_")}
+    dry_run_cache.save(engine.fingerprint, zypper_result, engine.zypper_exit, args.output, mode=0o644)
+    state = result_state(results)
+    print(f"state: {state}")
+    return _exit_code(state)
+
+def _read_hosts(args):
+    hosts = list(args.hosts)
+    if args.hosts_file:
+        with open(args.hosts_file) as f:
+            hosts += [line.split("#", 1)[0].strip() for line in f]
+    # Keep the order, drop blanks and duplicates
+    return list(dict.fromkeys(host for host in hosts if host))
+
+def cmd_fleet(config, args):
+    hosts = _read_hosts(args)
+    if not hosts:
+        logging.getLogger("CLI").error("No hosts given.")
+        return EXIT_ERROR
+    command = shlex.split(args.check_command) if args.check_command else None
+    if args.transport == "ssh":
+        transport = fleet.SSHTransport(command or fleet.REMOTE_COMMAND)
+    else:
+        transport = fleet.LocalTransport(command)
+    scanner = fleet.FleetScanner(transport, args.jobs, args.timeout * 60, args.max_age * 60)
+    with _cancel_on_signals(scanner):
+        rows = scanner.scan(hosts, force=args.all)
+    if args.json:
+        json.dump(rows, sys.stdout, indent=2)
+        print()
+    else:
+        print(fleet.format_table(rows))
+    if any(row.get("error") for row in rows.values()):
+        return EXIT_ERROR
+    # Worst host wins, mapped the same way as a single check
+    codes = [_exit_code(row.get("state")) for row in rows.values()]
+    for code in (EXIT_CONFLICTS, EXIT_UPDATES):
+        if code in codes:
+            return code
+    return EXIT_UP_TO_DATE
+
+def _echo_lines(lines):
+    # stdout is reserved for the result, the transcript goes to stderr
+    sys.stderr.write("".join(line + "\n" for line in lines))
+    sys.stderr.flush()
+
+def main(argv=None):
+    args = _build_parser().parse_args(argv)
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING, stream=sys.stderr)
+    config = read_config()
+    try:
+        if args.command == "check":
+            return cmd_check(config, args)
+        if args.command == "publish":
+            return cmd_publish(config, args)
+        if args.command == "fleet":
+            return cmd_fleet(config, args)
+        return cmd_apply(config, args)
+    except Cancelled:
+        logging.getLogger("CLI").error(f"{args.command} cancelled.")
+        return EXIT_CANCELLED
+    except Exception as e:
+        logging.getLogger("CLI").error(f"{args.command} failed: {e}")
+        return EXIT_ERROR
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,72 @@
+import os
+import logging
+import configparser
+
+from repo_refresh import DEFAULT_WINDOW_MINUTES
+from result_cache import DEFAULT_TTL_MINUTES
+from scheduler import DEFAULT_INTERVAL_MINUTES
+from proc_control import DEFAULT_CHECK_TIMEOUT_MINUTES, DEFAULT_UPDATE_TIMEOUT_MINUTES
+from privileged_ops import HELPER_SOCKET
+from dry_run_cache import SHARED_PATH, DEFAULT_SHARED_MAX_AGE_MINUTES
+
+ORGANIZATION = "SuseUpdater"
+APPLICATION = "OpenSUSE_Tool"
+
+# key -> (type, default)
+SCHEMA = {
+    "language": (str, "en"),
+    "check_zypper": (bool, True),
+    "check_flatpak": (bool, True),
+    "passwordless_updates": (bool, False),
+    "predownload": (bool, False),
+    "check_concurrency": (int, 4),
+    "refresh_window_minutes": (int, DEFAULT_WINDOW_MINUTES),
+    "cache_ttl_minutes": (int, DEFAULT_TTL_MINUTES),
+    "check_interval_minutes": (int, DEFAULT_INTERVAL_MINUTES),
+    "log_max_lines": (int, 5000),
+    # Limit for each command of a check or an update, 0 waits forever
+    "check_timeout_minutes": (int, DEFAULT_CHECK_TIMEOUT_MINUTES),
+    "update_timeout_minutes": (int, DEFAULT_UPDATE_TIMEOUT_MINUTES),
+    # Socket of the root helper, used instead of sudo/pkexec when it exists. Empty turns it off
+    "helper_socket": (str, HELPER_SOCKET),
+    # Dry-run published by suse-updater-check.timer, used while it matches the system. Empty always checks locally
+    "system_check_file": (str, SHARED_PATH),
+    "system_check_max_age_minutes": (int, DEFAULT_SHARED_MAX_AGE_MINUTES),
+    # e.g. /var/lib/node_exporter/textfile_collector/suse_updater.prom, written after every run
+    "metrics_textfile": (str, ""),
+}
+
+def config_paths():
+    """The INI files QSettings uses on Linux, lowest priority first."""
+    config_dirs = os.environ.get("XDG_CONFIG_DIRS") or "/etc/xdg"
+    user_dir = os.environ.get("XDG_CONFIG_HOME") or os.path.expanduser("~/.config")
+    dirs = list(reversed([d for d in config_dirs.split(":") if d])) + [user_dir]
+    return [os.path.join(d, ORGANIZATION, f"{APPLICATION}.conf") for d in dirs]
+
+def _convert(value_type, raw):
+    raw = raw.strip()
+    if len(raw) >= 2 and raw[0] == raw[-1] == '"':
+        raw = raw[1:-1]
+    if value_type is bool:
+        return raw.lower() in ("true", "1", "yes", "on")
+    return value_type(raw)
+
+def read_config(paths=None):
+    """Reads the settings without Qt, for the command line. The GUI goes through settings_store."""
+    values = {key: default for key, (value_type, default) in SCHEMA.items()}
+    for path in paths or config_paths():
+        parser = configparser.ConfigParser(interpolation=None)
+        parser.optionxform = str
+        try:
+            if not parser.read(path, encoding="utf-8") or not parser.has_section("General"):
+                continue
+        except configparser.Error as e:
+            logging.getLogger("Config").warning(f"Ignoring unreadable settings file {path}: {e}")
+            continue
+        for key, (value_type, default) in SCHEMA.items():
+            if parser.has_option("General", key):
+                try:
+                    values[key] = _convert(value_type, parser.get("General", key))
+                except ValueError:
+                    pass
+    return values
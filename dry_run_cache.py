@@ -0,0 +1,90 @@
+import os
+import glob
+import time
+import hashlib
+import logging
+
+from storage import state_dir, load_json, save_json
+
+CACHE_VERSION = 1
+ZYPP_CACHE_DIR = "/var/cache/zypp"
+RPMDB_DIRS = ("/usr/lib/sysimage/rpm", "/var/lib/rpm")
+# Small files the solver result depends on, hashed by content: repo metadata indexes
+# (they carry the checksums of everything else) and the zypp configuration
+METADATA_PATTERNS = ("raw/*/repodata/repomd.xml", "raw/*/content")
+CONFIG_PATTERNS = ("/etc/zypp/repos.d/*.repo", "/etc/zypp/locks", "/etc/zypp/zypp.conf")
+# Published by `suse-updater publish` from suse-updater-check.timer, read by every user's check
+SHARED_PATH = "/var/lib/suse-updater/check.json"
+DEFAULT_SHARED_MAX_AGE_MINUTES = 720 # twice the timer interval
+
+def cache_path():
+    return os.path.join(state_dir(), "dry_run.json")
+
+def _hash_file(digest, path):
+    try:
+        with open(path, "rb") as f:
+            content = f.read()
+    except OSError:
+        return False
+    digest.update(path.encode() + b"\0" + hashlib.sha256(content).digest())
+    return True
+
+def system_fingerprint(cache_dir=ZYPP_CACHE_DIR, rpmdb_dirs=RPMDB_DIRS, config_patterns=CONFIG_PATTERNS):
+    """Hash of what `zypper dup --dry-run` resolves against: repo metadata, installed packages and zypp config.
+
+    The solv files are left out on purpose, zypper rebuilds them from the raw
+    metadata and the rpmdb, sometimes during the dry-run itself. Returns None
+    when the metadata or the rpmdb can't be read, so a check is never skipped blindly.
+    """
+    digest = hashlib.sha256()
+    metadata = sorted(p for pattern in METADATA_PATTERNS for p in glob.glob(os.path.join(cache_dir, pattern)))
+    if not metadata or not all(_hash_file(digest, path) for path in metadata):
+        return None
+
+    # The rpmdb is too big to hash, any transaction changes its files' size or mtime
+    rpmdb_seen = False
+    for directory in rpmdb_dirs:
+        try:
+            entries = sorted(os.scandir(directory), key=lambda e: e.name)
+        except OSError:
+            continue
+        rpmdb_seen = True
+        for entry in entries:
+            try:
+                st = entry.stat()
+            except OSError:
+                continue
+            digest.update(f"{entry.path} {st.st_size} {st.st_mtime_ns} {st.st_ino}\n".encode())
+    if not rpmdb_seen:
+        return None
+
+    for path in sorted(p for pattern in config_patterns for p in glob.glob(pattern)):
+        _hash_file(digest, path)
+    return digest.hexdigest()
+
+def cacheable(exit_code):
+    # A held zypp lock or a crash says nothing about the system, only real answers are kept
+    return exit_code == 0 or (exit_code or 0) >= 100
+
+def load(fingerprint, path=None, max_age=None):
+    """Returns (result, exit_code) of the last dry-run if the system still has the same fingerprint, else None.
+    `max_age` (seconds) also drops results whose repository metadata may be outdated by now."""
+    if fingerprint is None:
+        return None
+    entry = load_json(path or cache_path())
+    if (not isinstance(entry, dict) or entry.get("version") != CACHE_VERSION
+            or entry.get("fingerprint") != fingerprint or not isinstance(entry.get("result"), dict)):
+        return None
+    if max_age is not None and not 0 <= time.time() - entry.get("timestamp", 0) <= max_age:
+        return None
+    return entry["result"], entry.get("exit_code")
+
+def save(fingerprint, result, exit_code, path=None, mode=None):
+    if fingerprint is None:
+        return
+    entry = {"version": CACHE_VERSION, "timestamp": time.time(), "fingerprint": fingerprint,
+             "result": result, "exit_code": exit_code}
+    try:
+        save_json(path or cache_path(), entry, mode)
+    except (OSError, TypeError, ValueError) as e:
+        logging.getLogger("DryRunCache").warning(f"Could not cache the dry-run: {e}")
@@ -0,0 +1,105 @@
+import os
+import logging
+import subprocess
+
+from storage import state_dir, load_json, save_json
+from check_engine import pending_flatpaks
+from privileged_ops import LOW_PRIORITY, flatpak_scope
+from history import HistoryDB, PhaseRecorder
+from proc_control import ProcessGroup, Cancelled, DEFAULT_UPDATE_TIMEOUT_MINUTES
+
+def staged_path():
+    return os.path.join(state_dir(), "flatpak_staged.json")
+
+def load_staged():
+    staged = load_json(staged_path(), {})
+    return staged if isinstance(staged, dict) else {}
+
+def staged_apps(results):
+    """{scope: set(apps)} of pending apps whose pending commit has already been pulled."""
+    staged = load_staged()
+    commits = results.get("flatpak_commits", {})
+    found = {}
+    for scope, apps in pending_flatpaks(results).items():
+        pulled = staged.get(scope, {})
+        wanted = commits.get(scope, {})
+        # Without a known commit we can't tell an old pull from the current one
+        found[scope] = {app for app in apps if wanted.get(app) and pulled.get(app) == wanted[app]}
+    return found
+
+def all_staged(results):
+    staged = staged_apps(results)
+    return all(set(apps) <= staged.get(scope, set()) for scope, apps in pending_flatpaks(results).items())
+
+def prefetch_command(scope, apps):
+    cmd = ["flatpak", "update", "-y", "--no-deploy", scope] + apps
+    if scope == "--user":
+        return LOW_PRIORITY + cmd
+    return LOW_PRIORITY + ["sudo", "-n"] + cmd
+
+class FlatpakPrefetcher:
+    """Pulls pending Flatpak refs with --no-deploy, so the real update only deploys locally."""
+
+    def __init__(self, results, trigger="background"):
+        self.results = results
+        self.trigger = trigger
+        self.recorder = PhaseRecorder()
+        self.logger = logging.getLogger("FlatpakPrefetcher")
+        self.procs = ProcessGroup()
+
+    @property
+    def cancelled(self):
+        return self.procs.cancelled
+
+    def run(self):
+        """Returns True when every pending scope was pulled."""
+        staged = load_staged()
+        already = staged_apps(self.results)
+        commits = self.results.get("flatpak_commits", {})
+        ok = True
+        for scope, apps in pending_flatpaks(self.results).items():
+            missing = [app for app in apps if app not in already.get(scope, set())]
+            if not missing or self.cancelled:
+                continue
+            self.logger.info(f"Prefetching {len(missing)} flatpaks ({scope})...")
+            with self.recorder.phase("flatpak_prefetch_" + scope.lstrip("-").replace("=", ":")) as phase:
+                try:
+                    kwargs = dict(stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+                    timeout = DEFAULT_UPDATE_TIMEOUT_MINUTES * 60
+                    if scope == "--user":
+                        proc = self.procs.popen(prefetch_command(scope, missing), timeout, **kwargs)
+                    else:
+                        args = {"scope": flatpak_scope(scope), "apps": missing, "no_deploy": True}
+                        proc = self.procs.privileged("flatpak_update", args, prefetch_command(scope, missing), timeout, **kwargs)
+                    try:
+                        _, stderr = proc.communicate()
+                    finally:
+                        self.procs.release(proc)
+                    returncode = proc.returncode
+                except (OSError, Cancelled) as e:
+                    stderr, returncode = str(e), -1
+                phase["exit_code"] = returncode
+                phase["output_bytes"] = len(stderr)
+            if returncode != 0:
+                ok = False
+                if not self.cancelled:
+                    self.logger.warning(f"Flatpak prefetch ({scope}) failed ({returncode}): {stderr.strip()}")
+                continue
+            scope_staged = staged.setdefault(scope, {})
+            for app in missing:
+                scope_staged[app] = commits.get(scope, {}).get(app, "")
+        # Forget pulls for apps that are no longer pending, they have been deployed since
+        pending = pending_flatpaks(self.results)
+        staged = {scope: {app: commit for app, commit in apps.items() if app in pending.get(scope, [])}
+                  for scope, apps in staged.items() if scope in pending}
+        try:
+            save_json(staged_path(), staged)
+        except OSError as e:
+            self.logger.warning(f"Could not save prefetch state: {e}")
+        if self.recorder.phases:
+            HistoryDB().record_run("prefetch", self.trigger, self.recorder, ok,
+                                   state="cancelled" if self.cancelled else ("staged" if ok else "failed"))
+        return ok
+
+    def cancel(self):
+        self.procs.cancel()
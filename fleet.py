@@ -0,0 +1,146 @@
+import os
+import sys
+import json
+import time
+import shlex
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from storage import state_dir, load_json, save_json
+from check_engine import flatpak_count
+from proc_control import ProcessGroup, Cancelled
+from progress import format_eta
+from zypper_xml import format_size
+
+DEFAULT_JOBS = 8
+DEFAULT_HOST_TIMEOUT_MINUTES = 15
+DEFAULT_MAX_AGE_MINUTES = 60
+REMOTE_COMMAND = ["suse-updater", "check", "--json"]
+# Exit codes of `check`, see cli.py: up to date, conflicts, updates
+CHECK_RESULT_CODES = (0, 2, 100)
+
+class SSHTransport:
+    """Runs the check on each host over ssh, without prompts: keys or an agent have to be set up."""
+
+    def __init__(self, command=REMOTE_COMMAND, ssh_options=()):
+        self.remote = " ".join(shlex.quote(arg) for arg in command)
+        self.ssh_options = list(ssh_options)
+
+    def command(self, host):
+        return ["ssh", "-o", "BatchMode=yes", "-o", "ConnectTimeout=15"] + self.ssh_options + [host, self.remote]
+
+class LocalTransport:
+    """Runs the check on this machine for every host, with FLEET_HOST set. For testing the aggregator."""
+
+    def __init__(self, command=None):
+        # --no-record: the pretend hosts must not overwrite this machine's own last check
+        self.local = list(command) if command else [sys.executable, os.path.join(os.path.dirname(__file__), "main.py"),
+                                                    "check", "--json", "--no-record"]
+
+    def command(self, host):
+        # env only, no shell: the host name is just a label here
+        return ["env", f"FLEET_HOST={host}"] + self.local
+
+TRANSPORTS = {"ssh": SSHTransport, "local": LocalTransport}
+
+def fleet_path():
+    return os.path.join(state_dir(), "fleet.json")
+
+def summarize(output, returncode, polled_at):
+    """Table row for one host from the output of `check --json`."""
+    results = json.loads(output)
+    return {
+        "state": results.get("state", "error"),
+        "zypper_updates": results.get("zypper_updates", 0),
+        "flatpak_updates": flatpak_count(results),
+        "download_size": results.get("zypper_download_size", 0),
+        "checked_at": results.get("checked_at", polled_at),
+        "polled_at": polled_at,
+        "exit_code": returncode,
+        "error": None,
+    }
+
+class FleetScanner:
+    """Checks many hosts through a transport and keeps the merged results in fleet.json.
+
+    At most `jobs` hosts are checked at once, each within `host_timeout` seconds.
+    A host is polled again once its last check is older than `max_age` seconds
+    or failed, so repeated scans only reach the stale part of the fleet.
+    """
+
+    def __init__(self, transport, jobs=DEFAULT_JOBS, host_timeout=DEFAULT_HOST_TIMEOUT_MINUTES * 60,
+                 max_age=DEFAULT_MAX_AGE_MINUTES * 60, path=None):
+        self.transport = transport
+        self.jobs = max(1, jobs)
+        self.host_timeout = host_timeout or None
+        self.max_age = max_age
+        self.path = path or fleet_path()
+        self.procs = ProcessGroup()
+        self.logger = logging.getLogger("FleetScanner")
+
+    def load(self):
+        rows = load_json(self.path, {})
+        return rows if isinstance(rows, dict) else {}
+
+    def is_stale(self, row, now=None):
+        now = time.time() if now is None else now
+        return not row or row.get("error") is not None or not 0 <= now - row.get("checked_at", 0) < self.max_age
+
+    def cancel(self):
+        self.procs.cancel()
+
+    def _poll(self, host):
+        polled_at = time.time()
+        try:
+            proc = self.procs.run(self.transport.command(host), self.host_timeout)
+        except (OSError, Cancelled) as e:
+            return {"state": "error", "polled_at": polled_at, "error": str(e) or "cancelled"}
+        if proc.timed_out:
+            return {"state": "error", "polled_at": polled_at, "error": f"no answer within {format_eta(self.host_timeout)}"}
+        if proc.returncode in CHECK_RESULT_CODES:
+            try:
+                return summarize(proc.stdout, proc.returncode, polled_at)
+            except (ValueError, AttributeError) as e:
+                return {"state": "error", "polled_at": polled_at, "error": f"unreadable result: {e}"}
+        # ssh exits with 255 for its own errors, the check with 1 or 130
+        lines = (proc.stderr or "").strip().splitlines()
+        return {"state": "error", "polled_at": polled_at, "exit_code": proc.returncode,
+                "error": lines[-1] if lines else f"exit code {proc.returncode}"}
+
+    def scan(self, hosts, force=False):
+        """Polls the stale hosts, or all of them with `force`. Returns {host: row} for every host.
+        Rows of hosts that failed keep the last good counts, with the error added."""
+        rows = self.load()
+        now = time.time()
+        due = [host for host in hosts if force or self.is_stale(rows.get(host), now)]
+        self.logger.info(f"Polling {len(due)} of {len(hosts)} hosts.")
+        with ThreadPoolExecutor(max_workers=self.jobs) as pool:
+            for host, row in zip(due, pool.map(self._poll, due)):
+                if row["error"] is not None:
+                    if not self.procs.cancelled:
+                        self.logger.warning(f"{host}: {row['error']}")
+                    row = dict(rows.get(host, {}), **row)
+                rows[host] = row
+        if self.procs.cancelled:
+            raise Cancelled()
+        try:
+            save_json(self.path, rows)
+        except OSError as e:
+            self.logger.warning(f"Could not save the fleet state: {e}")
+        return {host: rows.get(host, {}) for host in hosts}
+
+COLUMNS = ("host", "state", "zypper", "flatpak", "download", "checked")
+
+def format_table(rows, now=None):
+    now = time.time() if now is None else now
+    lines = [COLUMNS]
+    for host, row in sorted(rows.items()):
+        checked_at = row.get("checked_at")
+        age = format_eta(now - checked_at) + " ago" if checked_at else "never"
+        state = row.get("state", "unknown")
+        if row.get("error"):
+            state = f"error ({row['error']})"
+        lines.append((host, state, str(row.get("zypper_updates", "-")), str(row.get("flatpak_updates", "-")),
+                      format_size(row["download_size"]) if row.get("download_size") else "-", age))
+    widths = [max(len(line[i]) for line in lines) for i in range(len(COLUMNS))]
+    return "\n".join("  ".join(cell.ljust(width) for cell, width in zip(line, widths)).rstrip() for line in lines)
@@ -0,0 +1,149 @@
+import os
+import json
+import signal
+import socket
+import logging
+import threading
+import subprocess
+
+from privileged_ops import encode, HELPER_SOCKET
+
+def socket_path():
+    from config import read_config
+    # An empty helper_socket setting turns the helper off
+    return read_config().get("helper_socket", HELPER_SOCKET)
+
+def available(path=None):
+    """Whether the root helper is installed. Only looks for the socket, connecting would start the service."""
+    path = socket_path() if path is None else path
+    return bool(path) and os.path.exists(path)
+
+class HelperProcess:
+    """One operation running in the root helper, with enough of the subprocess.Popen
+    interface for ProcessGroup and the engines.
+
+    stdout can be PIPE or DEVNULL, stderr PIPE, STDOUT, DEVNULL or an open file. The
+    helper's progress events go to `on_progress`, its phase spans end up in `spans`.
+    terminate() asks the helper to stop the command and hangs up. A plain hangup, e.g. when
+we crash, leaves updates of the system running in the helper.
+    """
+
+    def __init__(self, sock, op, args, stdout=None, stderr=None, text=False, on_progress=None):
+        self.args = ["helper", op] + [f"{key}={value}" for key, value in args.items()]
+        self.pid = None
+        self.returncode = None
+        self.spans = {}
+        self.on_progress = on_progress
+        self._sock = sock
+        self._terminated = False
+        self._done = threading.Event()
+        self._writers = {} # stream name -> write fd or None to drop it
+        self._owned = [] # write ends we close at the end
+        self.stdout = self._pipe("stdout", stdout, text)
+        self.stderr = self._pipe("stderr", stderr, text)
+        self.logger = logging.getLogger("HelperProcess")
+        sock.sendall(encode({"op": op, "args": args}))
+        threading.Thread(target=self._pump, daemon=True).start()
+
+    def _pipe(self, name, target, text):
+        if target == subprocess.PIPE:
+            read_fd, write_fd = os.pipe()
+            self._writers[name] = write_fd
+            self._owned.append(write_fd)
+            return open(read_fd, "r", encoding="utf-8", errors="replace") if text else open(read_fd, "rb")
+        if target == subprocess.STDOUT:
+            self._writers[name] = self._writers.get("stdout")
+        elif target is not None and target != subprocess.DEVNULL:
+            self._writers[name] = target if isinstance(target, int) else target.fileno()
+        return None
+
+    def _write(self, name, text):
+        fd = self._writers.get(name)
+        if fd is None:
+            return
+        try:
+            os.write(fd, (text + "\n").encode())
+        except OSError:
+            # The reader closed its end, keep draining the helper anyway
+            self._writers[name] = None
+
+    def _pump(self):
+        code = None
+        try:
+            for raw in self._sock.makefile("rb"):
+                message = json.loads(raw)
+                if message["type"] == "line":
+                    self._write(message["stream"], message["text"])
+                elif message["type"] == "progress" and self.on_progress:
+                    self.on_progress(message["event"])
+                elif message["type"] == "exit":
+                    code = message["code"]
+                    self.spans = message.get("spans", {})
+                    break
+                elif message["type"] == "error":
+                    self.logger.warning(f"Helper refused {self.args[1]}: {message['message']}")
+                    self._write("stderr", message["message"])
+                    code = 1
+                    break
+        except (OSError, ValueError, KeyError) as e:
+            self.logger.warning(f"Lost the connection to the helper: {e}")
+        finally:
+            if code is None:
+                code = -signal.SIGTERM if self._terminated else 1
+            for fd in self._owned:
+                os.close(fd)
+            self._sock.close()
+            self.returncode = code
+            self._done.set()
+
+    def poll(self):
+        return self.returncode if self._done.is_set() else None
+
+    def wait(self, timeout=None):
+        if not self._done.wait(timeout):
+            raise subprocess.TimeoutExpired(self.args, timeout)
+        return self.returncode
+
+    def communicate(self):
+        stderr = []
+        reader = None
+        if self.stderr:
+            reader = threading.Thread(target=lambda: stderr.append(self.stderr.read()))
+            reader.start()
+        stdout = self.stdout.read() if self.stdout else None
+        if reader:
+            reader.join()
+        for stream in (self.stdout, self.stderr):
+            if stream:
+                stream.close()
+        self.wait()
+        return stdout, stderr[0] if stderr else None
+
+    def terminate(self):
+        self._terminated = True
+        try:
+            self._sock.sendall(encode({"type": "cancel"}))
+            self._sock.shutdown(socket.SHUT_WR)
+        except OSError:
+            pass
+
+    kill = terminate
+
+    def send_signal(self, sig):
+        self.terminate()
+
+def connect(op, args, stdout=None, stderr=None, text=False, on_progress=None, path=None, **kwargs):
+    """Starts `op` in the root helper. None when the helper isn't installed or doesn't answer,
+    the caller then falls back to sudo. Other Popen arguments (env, stdin) don't apply."""
+    path = socket_path() if path is None else path
+    if not path:
+        return None
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(path)
+        return HelperProcess(sock, op, args, stdout, stderr, text, on_progress)
+    except OSError as e:
+        sock.close()
+        if os.path.exists(path):
+            logging.getLogger("HelperProcess").warning(f"Could not reach the helper at {path}: {e}")
+        return None
@@ -0,0 +1,184 @@
+import os
+import time
+import sqlite3
+import logging
+import threading
+from contextlib import contextmanager
+
+from storage import state_dir
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    trigger TEXT NOT NULL,
+    started REAL NOT NULL,
+    duration REAL NOT NULL,
+    success INTEGER NOT NULL,
+    exit_code INTEGER,
+    state TEXT,
+    zypper_count INTEGER NOT NULL DEFAULT 0,
+    flatpak_count INTEGER NOT NULL DEFAULT 0,
+    download_size INTEGER NOT NULL DEFAULT 0,
+    log_path TEXT
+);
+CREATE TABLE IF NOT EXISTS phases (
+    run_id INTEGER NOT NULL REFERENCES runs(id) ON DELETE CASCADE,
+    name TEXT NOT NULL,
+    started REAL NOT NULL,
+    duration REAL NOT NULL,
+    exit_code INTEGER,
+    output_bytes INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS runs_started ON runs(started DESC);
+CREATE INDEX IF NOT EXISTS runs_failures ON runs(success, started DESC);
+CREATE INDEX IF NOT EXISTS phases_run ON phases(run_id);
+CREATE INDEX IF NOT EXISTS phases_slowest ON phases(duration DESC);
+"""
+
+RUN_COLUMNS = ("id", "kind", "trigger", "started", "duration", "success", "exit_code", "state",
+               "zypper_count", "flatpak_count", "download_size", "log_path")
+
+def db_path():
+    return os.path.join(state_dir(), "history.sqlite")
+
+class PhaseRecorder:
+    """Collects per-phase timings of a run, from any number of threads."""
+
+    def __init__(self):
+        self.started = time.time()
+        self._start_clock = time.monotonic()
+        self.phases = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def phase(self, name):
+        # Callers set record["exit_code"] and record["output_bytes"] once they know them
+        record = {"name": name, "started": time.time(), "exit_code": None, "output_bytes": 0}
+        start = time.monotonic()
+        try:
+            yield record
+        finally:
+            record["duration"] = time.monotonic() - start
+            with self._lock:
+                self.phases.append(record)
+
+    def add(self, name, started, duration, exit_code=None, output_bytes=0):
+        with self._lock:
+            self.phases.append({"name": name, "started": started, "duration": duration, "exit_code": exit_code,
+                                "output_bytes": output_bytes})
+
+    def elapsed(self):
+        return time.monotonic() - self._start_clock
+
+class CountingReader:
+    """Wraps a binary stream and counts the bytes read through it."""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.count = 0
+
+    def read(self, size=-1):
+        data = self.stream.read(size)
+        self.count += len(data)
+        return data
+
+class HistoryDB:
+    def __init__(self, path=None):
+        self.path = path or db_path()
+        self.logger = logging.getLogger("HistoryDB")
+        try:
+            with self._connect() as conn:
+                conn.executescript(SCHEMA)
+                columns = [row["name"] for row in conn.execute("PRAGMA table_info(phases)")]
+                if "output_bytes" not in columns:
+                    # Databases from before output sizes were traced
+                    conn.execute("ALTER TABLE phases ADD COLUMN output_bytes INTEGER NOT NULL DEFAULT 0")
+        except sqlite3.Error as e:
+            self.logger.warning(f"Could not open history database {self.path}: {e}")
+
+    @contextmanager
+    def _connect(self):
+        # Short-lived connections keep this safe to use from worker threads
+        conn = sqlite3.connect(self.path, timeout=5)
+        try:
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA foreign_keys = ON")
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def record_run(self, kind, trigger, recorder, success, exit_code=None, state=None,
+                   zypper_count=0, flatpak_count=0, download_size=0, log_path=None):
+        try:
+            with self._connect() as conn:
+                cur = conn.execute(
+                    "INSERT INTO runs (kind, trigger, started, duration, success, exit_code, state,"
+                    " zypper_count, flatpak_count, download_size, log_path)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (kind, trigger, recorder.started, recorder.elapsed(), int(bool(success)), exit_code, state,
+                     zypper_count, flatpak_count, download_size, log_path))
+                run_id = cur.lastrowid
+                conn.executemany(
+                    "INSERT INTO phases (run_id, name, started, duration, exit_code, output_bytes) VALUES (?, ?, ?, ?, ?, ?)",
+                    [(run_id, p["name"], p["started"], p["duration"], p["exit_code"], p.get("output_bytes", 0))
+                     for p in recorder.phases])
+        except sqlite3.Error as e:
+            self.logger.warning(f"Could not record {kind} run: {e}")
+            return None
+        # Keep the exported metrics in step with the database
+        from metrics import export_metrics
+        export_metrics(self)
+        return run_id
+
+    def _runs(self, where="", params=(), limit=20, offset=0):
+        with self._connect() as conn:
+            rows = conn.execute(
+                f"SELECT {', '.join(RUN_COLUMNS)} FROM runs {where} ORDER BY started DESC LIMIT ? OFFSET ?",
+                tuple(params) + (limit, offset)).fetchall()
+        return [dict(row) for row in rows]
+
+    def last_runs(self, limit=20, offset=0, kind=None):
+        if kind:
+            return self._runs("WHERE kind = ?", (kind,), limit, offset)
+        return self._runs(limit=limit, offset=offset)
+
+    def failures(self, limit=20, offset=0):
+        return self._runs("WHERE success = 0", (), limit, offset)
+
+    def count_runs(self, failures_only=False):
+        with self._connect() as conn:
+            query = "SELECT COUNT(*) FROM runs" + (" WHERE success = 0" if failures_only else "")
+            return conn.execute(query).fetchone()[0]
+
+    def phases_for(self, run_id):
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT name, started, duration, exit_code, output_bytes FROM phases WHERE run_id = ? ORDER BY started",
+                (run_id,)).fetchall()
+        return [dict(row) for row in rows]
+
+    def latest_by_kind(self, success_only=False):
+        """{kind: run} with the newest (successful) run of every kind."""
+        where = "WHERE success = 1" if success_only else ""
+        with self._connect() as conn:
+            # SQLite takes the bare columns from the row that holds the MAX()
+            rows = conn.execute(
+                f"SELECT {', '.join(RUN_COLUMNS)}, MAX(started) FROM runs {where} GROUP BY kind").fetchall()
+        return {row["kind"]: {column: row[column] for column in RUN_COLUMNS} for row in rows}
+
+    def run_counts(self):
+        """[(kind, success, count), ...] over the whole history."""
+        with self._connect() as conn:
+            rows = conn.execute("SELECT kind, success, COUNT(*) FROM runs GROUP BY kind, success").fetchall()
+        return [tuple(row) for row in rows]
+
+    def slowest_phases(self, limit=20, since=None):
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT p.name, p.started, p.duration, p.exit_code, r.kind, r.trigger, r.id AS run_id"
+                " FROM phases p JOIN runs r ON r.id = p.run_id"
+                " WHERE p.started >= ? ORDER BY p.duration DESC LIMIT ?",
+                (since or 0, limit)).fetchall()
+        return [dict(row) for row in rows]
@@ -1,141 +1,42 @@
-from PySide6.QtCore import QSettings
+import os
+import json
+import logging
 
-TRANSLATIONS = {
-    "en": {
-        "title": "System Updater",
-        "settings": "Settings",
-        "advanced": "Advanced (Selective Flatpaks)",
-        "real_time_logs": "Show Real-Time Logs",
-        "checking": "Checking for updates...",
-        "wait_query": "Please wait while we query the repositories.",
-        "up_to_date": "System is up to date.",
-        "zypper_uptodate": "Zypper: Up to date",
-        "flatpak_uptodate": "Flatpak: Up to date",
-        "zypper_updates": "Zypper: Updates are available",
-        "flatpak_updates": "Flatpak: Updates are available",
-        "updates_available_title": "Updates are available.",
-        "os_update_zypper": "OS Update (Zypper)",
-        "apps_flatpaks": "Apps (Flatpak)",
-        "update_all": "Update All Now",
-        "conflicts_title": "Update later please.",
-        "conflicts_desc": "Your repositories are out of sync. We recommend waiting to install these updates. This is usually resolved within few hours, up to a day. Try again later.",
-        "updating_title": "Updating System...",
-        "applying_changes": "Applying changes. This may take a while.",
-        "update_failed": "Update Failed.",
-        "check_advanced": "Check Advanced log.",
-        "no_updates": "No updates available.",
-        "selective_updates": "Selective Updates",
-        "raw_logs": "Raw Logs",
-        "running_selective": "--- RUNNING SELECTIVE UPDATES ---",
-        "updates_completed": "--- UPDATES COMPLETED SUCCESSFULLY ---",
-        "errors_occurred": "--- ERRORS OCCURRED DURING UPDATE ---",
-        
-        # Tray Menu
-        "tray_open": "Open Application",
-        "tray_check": "Check for Updates",
-        "tray_settings": "Settings",
-        "tray_quit": "Quit",
-        "check_updates_link": "Check for Updates",
-        
-        # Settings
-        "settings_title": "System Updater Settings",
-        "engines_group": "Active Update Engines",
-        "check_zypper_label": "Check for OpenSUSE system updates (Zypper)",
-        "check_flatpak_label": "Check for application updates (Flatpak)",
-        "sys_behavior": "System Behavior",
-        "autostart": "Start automatically when I log in",
-        "passwordless_updates": "Allow passwordless system updates",
-        "passwordless_confirm_title": "Enable Passwordless Updates?",
-        "passwordless_confirm_msg": "This will add 'zypper dup' and 'flatpak update' to your sudoers file, allowing them to run without a password prompt. You will be prompted for a password once now to apply these changes.\n\nAre you sure you want to proceed?",
-        "language": "Language",
-        "adv_utilities": "Advanced Utilities",
-        "open_logs": "Open Historical Logs",
-        "reinstall_sudoers": "Reinstall Sudoers Rule (Wizard)",
-        "remove_sudoers": "Remove Sudoers Rule (Reset)",
-        "save": "Save Settings",
-        "cancel": "Cancel",
-        "remove_confirm_title": "Remove Permissions?",
-        "remove_confirm_msg": "This will delete the background polkit/sudoers rule, meaning tests will no longer run automatically without a password.\n\nAre you sure you want to revert to default behavior?",
-        
-        # Wizard
-        "wizard_title": "SUSE Updater Setup",
-        "wizard_welcome": "Welcome to SUSE Updater",
-        "wizard_desc": "This tool needs a small permission tweak to check for Tumbleweed updates in the background without asking for your password every time.",
-        "wizard_action": "Continue",
-        "wizard_skip": "Skip (Manual Mode)",
-        "wizard_success": "Setup Complete!",
-        "wizard_success_desc": "The sudoers rule has been installed. The app will now check for updates silently in the background.",
-        "wizard_close": "Close",
-    },
-    "sk": {
-        "title": "Systémove aktualizácie",
-        "settings": "Nastavenia",
-        "advanced": "Pokročilé (Selektívne Flatpaky)",
-        "real_time_logs": "Zobraziť logy v reálnom čase",
-        "checking": "Kontrola aktualizácií..",
-        "wait_query": "Prosím čakajte, kým preverujeme repozitáre.",
-        "up_to_date": "Váš systém je aktuálny!",
-        "zypper_uptodate": "Zypper: Žiadne aktualizácie",
-        "flatpak_uptodate": "Flatpak: Žiadne aktualizácie",
-        "zypper_updates": "Zypper: Aktualizácie sú dostupné",
-        "flatpak_updates": "Flatpak: Aktualizácie sú dostupné",
-        "updates_available_title": "Nové aktualizácie sú dostupné.",
-        "os_update_zypper": "Aktualizácia OS (Zypper)",
-        "apps_flatpaks": "Aplikácie (Flatpak)",
-        "update_all": "Inštalovať aktualizácie",
-        "conflicts_title": "Skúste to neskôr!",
-        "conflicts_desc": "Repozitáre nie sú synchronizované. Odporúčame s inštaláciou týchto aktualizácií počkať. Tento problém sa zvyčajne vyrieši v priebehu niekoľkých hodín, maximálne do jedného dňa.",
-        "updating_title": "Aktualizujem systém...",
-        "applying_changes": "Aplikujem zmeny. Môže to chvíľu trvať.",
-        "update_failed": "Aktualizácia zlyhala. Skúste to prosím o pár hodín, alebo zajtra.",
-        "check_advanced": "Pokročilé: Skontrolujte log.",
-        "no_updates": "Žiadne aktualizácie k dispozícii.",
-        "selective_updates": "Selektívne aktualizácie",
-        "raw_logs": "Surové logy",
-        "running_selective": "--- SPÚŠŤAM SELEKTÍVNE AKTUALIZÁCIE ---",
-        "updates_completed": "--- AKTUALIZÁCIE ÚSPEŠNE DOKONČENÉ ---",
-        "errors_occurred": "--- POČAS AKTUALIZÁCIE NASTALI CHYBY ---",
-        
-        # Tray Menu
-        "tray_open": "Otvoriť aplikáciu",
-        "tray_check": "Skontrolovať dostupné aktualizácie",
-        "tray_settings": "Nastavenia",
-        "tray_quit": "Ukončiť",
-        "check_updates_link": "Vyhľadať aktualizácie",
-        
-        # Settings
-        "settings_title": "Nastavenia systémového aktualizátora",
-        "engines_group": "Aktívne moduly aktualizácií",
-        "check_zypper_label": "Kontrolovať systémové aktualizácie OpenSUSE (Zypper)",
-        "check_flatpak_label": "Kontrolovať aktualizácie aplikácií (Flatpak)",
-        "sys_behavior": "Správanie systému",
-        "autostart": "Spustiť automaticky pri prihlásení",
-        "passwordless_updates": "Povoliť systémové aktualizácie bez hesla",
-        "passwordless_confirm_title": "Povoliť aktualizácie bez hesla?",
-        "passwordless_confirm_msg": "Týmto sa do vášho súboru sudoers pridajú príkazy 'zypper dup' a 'flatpak update', čo im umožní spustenie bez výzvy na zadanie hesla. Teraz budete raz vyzvaní na zadanie hesla na uloženie týchto zmien.\n\nSte si istí, že chcete pokračovať?",
-        "language": "Jazyk",
-        "adv_utilities": "Pokročilé nástroje",
-        "open_logs": "Otvoriť historické logy",
-        "reinstall_sudoers": "Preinštalovať pravidlo Sudoers (Sprievodca)",
-        "remove_sudoers": "Odstrániť pravidlo Sudoers (Reset)",
-        "save": "Uložiť nastavenia",
-        "cancel": "Zrušiť",
-        "remove_confirm_title": "Odstrániť oprávnenia?",
-        "remove_confirm_msg": "Týmto sa odstráni pravidlo pre polkit/sudoers, čo znamená, že testy už nebudú prebiehať automaticky bez hesla.\n\nNaozaj sa chcete vrátiť k pôvodnému správaniu?",
-        
-        # Wizard
-        "wizard_title": "Nastavenie SUSE Update",
-        "wizard_welcome": "Vitajte v SUSE Update",
-        "wizard_desc": "Tento nástroj potrebuje malú úpravu oprávnení, aby mohol kontrolovať aktualizácie Tumbleweed v pozadí bez toho, aby sa zakaždým pýtal na vaše heslo.",
-        "wizard_action": "Pokračovať",
-        "wizard_skip": "Preskočiť (Manuálne)",
-        "wizard_success": "Nastavenie dokončené!",
-        "wizard_success_desc": "Pravidlo sudoers bolo nainštalované. Aplikácia bude teraz kontrolovať aktualizácie ticho na pozadí.",
-        "wizard_close": "Zavrieť",
-    }
-}
+from settings_store import store
+
+CATALOG_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "assets", "i18n")
+DEFAULT_LANGUAGE = "en"
+
+# Catalogs are read from disk the first time a language is used
+_catalogs = {}
+
+def _load_catalog(lang):
+    if lang not in _catalogs:
+        try:
+            with open(os.path.join(CATALOG_DIR, f"{lang}.json"), "r", encoding="utf-8") as f:
+                _catalogs[lang] = json.load(f)
+        except (OSError, ValueError) as e:
+            logging.getLogger("i18n").warning(f"Could not load catalog '{lang}': {e}")
+            _catalogs[lang] = {}
+    return _catalogs[lang]
+
+def available_languages():
+    """Returns [(code, display name), ...] for every shipped catalog."""
+    try:
+        with open(os.path.join(CATALOG_DIR, "languages.json"), "r", encoding="utf-8") as f:
+            return list(json.load(f).items())
+    except (OSError, ValueError):
+        return [(DEFAULT_LANGUAGE, "English")]
+
+def get_language():
+    return store().get("language")
+
+def set_language(lang):
+    store().set("language", lang)
 
 def get_text(key, default=None):
-    settings = QSettings("SuseUpdater", "OpenSUSE_Tool")
-    lang = settings.value("language", "en")
-    return TRANSLATIONS.get(lang, TRANSLATIONS["en"]).get(key, default if default is not None else key)
+    catalog = _load_catalog(get_language())
+    if key in catalog:
+        return catalog[key]
+    fallback = _load_catalog(DEFAULT_LANGUAGE)
+    return fallback.get(key, default if default is not None else key)
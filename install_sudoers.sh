@@ -1,4 +1,4 @@
 #!/bin/bash
 SUDOERS_FILE="/etc/sudoers.d/suse-updater"
-echo "ALL ALL=(root) NOPASSWD: /usr/bin/zypper --non-interactive dup --dry-run" > "$SUDOERS_FILE"
+echo "ALL ALL=(root) NOPASSWD: /usr/bin/zypper --non-interactive dup --dry-run, /usr/bin/zypper --non-interactive --xmlout dup --dry-run, /usr/bin/zypper --non-interactive ref, /usr/bin/zypper --non-interactive ref *, /usr/bin/zypper --non-interactive dup --download-only, /usr/bin/flatpak update -y --no-deploy --system*, /usr/bin/flatpak update -y --no-deploy --installation=*" > "$SUDOERS_FILE"
 chmod 440 "$SUDOERS_FILE"
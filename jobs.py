@@ -0,0 +1,61 @@
+import logging
+
+CHECK = "check"
+UPDATE = "update"
+PREDOWNLOAD = "predownload"
+# Waiting jobs start in this order, lowest first
+PRIORITY = {UPDATE: 0, CHECK: 1, PREDOWNLOAD: 2}
+
+class JobCoordinator:
+    """Runs one zypp job at a time in the GUI: an update, a check or a pre-download.
+
+    A check or pre-download requested while another one is running or waiting
+    is merged into it. Updates go ahead of waiting checks, so the check
+    afterwards sees the updated system. A running pre-download is only
+    background work: any other job stops it through its `cancel` and takes
+    over once it has ended. `start` is called when the job's turn comes, the
+    app reports the end of each job with finished().
+    """
+
+    def __init__(self):
+        self.current = None # kind of the running job
+        self.queue = [] # [(kind, start, cancel)]
+        self._cancel_current = None
+        self.logger = logging.getLogger("JobCoordinator")
+
+    def busy(self):
+        """True while a check or an update runs, a pre-download gives way to new jobs."""
+        return self.current not in (None, PREDOWNLOAD)
+
+    def submit(self, kind, start, merge_running=True, cancel=None):
+        """Returns "started", "queued" or "merged"."""
+        if kind in (CHECK, PREDOWNLOAD):
+            # A waiting check reads the settings when it starts, a running one already has
+            if any(k == kind for k, _, _ in self.queue) or (merge_running and self.current == kind):
+                return "merged"
+        if self.current is None:
+            self._start(kind, start, cancel)
+            return "started"
+        index = next((i for i, (k, _, _) in enumerate(self.queue) if PRIORITY[k] > PRIORITY[kind]), len(self.queue))
+        self.queue.insert(index, (kind, start, cancel))
+        if self.current == PREDOWNLOAD and kind != PREDOWNLOAD and self._cancel_current:
+            self.logger.info(f"Stopping the pre-download for a {kind} job.")
+            self._cancel_current()
+        return "queued"
+
+    def finished(self, kind):
+        if self.current != kind:
+            self.logger.warning(f"Got the end of a {kind} job while {self.current} was running.")
+            return
+        self.current = self._cancel_current = None
+        if self.queue:
+            self._start(*self.queue.pop(0))
+
+    def _start(self, kind, start, cancel):
+        self.current = kind
+        self._cancel_current = cancel
+        try:
+            start()
+        except Exception:
+            self.current = self._cancel_current = None
+            raise
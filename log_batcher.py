@@ -0,0 +1,49 @@
+import threading
+
+DEFAULT_INTERVAL = 0.075 # seconds
+DEFAULT_MAX_LINES = 500
+
+class LineBatcher:
+    """Collects log lines and hands them to `flush_fn` in batches.
+
+    A batch goes out every `interval` seconds, or earlier once `max_lines`
+    are waiting, so a chatty child process costs a handful of GUI updates per
+    second instead of one per line. `flush_fn` runs on the batcher's own thread
+    (and on the closing thread for the last batch).
+    """
+
+    def __init__(self, flush_fn, interval=DEFAULT_INTERVAL, max_lines=DEFAULT_MAX_LINES):
+        self.flush_fn = flush_fn
+        self.interval = interval
+        self.max_lines = max_lines
+        self._lines = []
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._closed = False
+        self._thread = threading.Thread(target=self._loop, name="LineBatcher", daemon=True)
+        self._thread.start()
+
+    def add(self, line):
+        with self._lock:
+            self._lines.append(line)
+            full = len(self._lines) >= self.max_lines
+        if full:
+            self._wake.set()
+
+    def _loop(self):
+        while not self._closed:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            self._flush()
+
+    def _flush(self):
+        with self._lock:
+            batch, self._lines = self._lines, []
+        if batch:
+            self.flush_fn(batch)
+
+    def close(self):
+        self._closed = True
+        self._wake.set()
+        self._thread.join()
+        self._flush()
@@ -1,19 +1,66 @@
 import sys
 import os
+import time
 import logging
-from PySide6.QtWidgets import QApplication, QSystemTrayIcon, QMenu
+
+import cli
+# The CLI commands (check, apply, ...) run headless and must not pull in Qt
+if __name__ == "__main__" and cli.is_cli(sys.argv[1:]):
+    sys.exit(cli.main(sys.argv[1:]))
+
+from PySide6.QtWidgets import QApplication, QSystemTrayIcon, QMenu, QMessageBox
 from PySide6.QtGui import QIcon, QPixmap
-from PySide6.QtCore import QTimer
+from PySide6.QtCore import QTimer, QThread, Signal
 
-from ui.main_window import MainWindow
-from ui.wizard_window import WizardWindow
-from ui.settings_window import SettingsWindow
 from update_checker import UpdateChecker
+from check_engine import result_state
+from scheduler import CheckScheduler, POLL_SECONDS
+from predownload import Predownloader, is_staged, ready_to_install
+from flatpak_prefetch import FlatpakPrefetcher, staged_apps
 from updater_runner import UpdaterRunner
+from jobs import JobCoordinator, CHECK, UPDATE, PREDOWNLOAD
+from settings_store import store
+import result_cache
+import sudoers
+from startup_timing import process_age, record_time_to_tray
+from version import APP_VERSION
 from i18n import get_text
 
 logging.basicConfig(level=logging.INFO)
 
+_IMPORT_TIME = time.perf_counter()
+# Covers zypper's SIGTERM grace period, see proc_control.TERMINATE_GRACE
+SHUTDOWN_TIMEOUT_MS = 15000
+
+class SudoersProbe(QThread):
+    probe_finished = Signal(bool)
+
+    def run(self):
+        ok = sudoers.probe_rule()
+        sudoers.store_probe(ok)
+        self.probe_finished.emit(ok)
+
+class PredownloadWorker(QThread):
+    download_finished = Signal(bool)
+
+    def __init__(self, results, parent=None):
+        super().__init__(parent)
+        self.results = results
+        self.zypper = Predownloader()
+        self.flatpak = FlatpakPrefetcher(results)
+
+    def run(self):
+        ok = True
+        if self.results.get("zypper_packages") and not is_staged(self.results):
+            ok = self.zypper.run()
+        if not self.zypper.cancelled:
+            ok = self.flatpak.run() and ok
+        self.download_finished.emit(ok)
+
+    def cancel(self):
+        self.zypper.cancel()
+        self.flatpak.cancel()
+
 class UpdateApp:
     def __init__(self):
         self.app = QApplication(sys.argv)
@@ -29,67 +76,154 @@ class UpdateApp:
         self.icon_yellow = QIcon(os.path.join(self.assets_dir, "tray_yellow.svg"))
         self.icon_red = QIcon(os.path.join(self.assets_dir, "tray_red.svg"))
         
-        # Windows
-        self.main_window = MainWindow(self.icon_green)
-        self.settings_window = SettingsWindow()
-        
-        # Connect refresh link from main window
-        self.main_window.refresh_requested_callback = self.start_check
+        # Windows are built on first use, until then we only remember what they should show
+        self._main_window = None
+        self._settings_window = None
+        self._history_window = None
+        self.status = ("checking", None)
+        self._quit_after_update = False
         
         # Tray setup
         self.tray = QSystemTrayIcon(self.icon_green, self.app)
         self.tray_menu = QMenu()
         
         self.action_show = self.tray_menu.addAction(get_text("tray_open"))
-        self.action_show.triggered.connect(self.main_window.show)
+        self.action_show.triggered.connect(self.show_main_window)
         
         self.action_check = self.tray_menu.addAction(get_text("tray_check"))
-        self.action_check.triggered.connect(self.start_check)
+        self.action_check.triggered.connect(lambda: self.start_check("manual"))
         
+        self.action_cancel = self.tray_menu.addAction(get_text("tray_cancel"))
+        self.action_cancel.triggered.connect(self.cancel_jobs)
+        self.action_cancel.setVisible(False)
+
         self.action_settings = self.tray_menu.addAction(get_text("tray_settings"))
         self.action_settings.triggered.connect(self.show_settings)
         
         self.tray_menu.addSeparator()
         
         self.action_quit = self.tray_menu.addAction(get_text("tray_quit"))
-        self.action_quit.triggered.connect(self.app.quit)
+        self.action_quit.triggered.connect(self.request_quit)
+        self.app.aboutToQuit.connect(self.shutdown)
+        self.app.aboutToQuit.connect(store().sync)
+        store().changed.connect(self._on_setting_changed)
         
         self.tray.setContextMenu(self.tray_menu)
         self.tray.activated.connect(self.tray_activated)
+
+        self.checker = None
+        self.runner = None
+        self.predownloader = None
+        # Checks, updates and pre-downloads all need the zypp lock, they take turns
+        self.jobs = JobCoordinator()
+        self.scheduler = CheckScheduler(store().get("check_interval_minutes"))
+
+        # Show the last known state right away instead of waiting for a full check
+        self.last_results = None
+        self.last_check_time = 0
+        cached, checked_at = result_cache.load_results()
+        if cached is not None:
+            logging.info("Showing cached check results.")
+            self.last_check_time = checked_at
+            self.process_check_results(cached, from_cache=True)
+
         self.tray.show()
+        self._record_time_to_tray()
         
-        # Connect window buttons
-        self.main_window.update_btn.clicked.connect(self.run_updates)
-        self.main_window.settings_btn.clicked.connect(self.show_settings)
-        self.main_window.advanced_window.update_selected.connect(self.run_custom_updates)
-        
-        # Initialize Settings & Settings Manager
-        self.settings_window = SettingsWindow()
-        self.settings_window.trigger_wizard.connect(self.run_wizard)
-        self.settings_window.trigger_logs.connect(self.main_window.show_logs)
-        self.settings_window.settings_changed.connect(self.on_settings_saved)
-
-        
-        # Check rule installation on startup by testing policy presence with sudo -n -l
-        import subprocess
-        try:
-            # We use 'sudo -n -l <cmd>' to check if the rule exists in sudoers without executing it.
-            # This is fast and network-independent, preventing the wizard from showing if network is down.
-            ref_cmd = ["sudo", "-n", "-l", "/usr/bin/zypper", "--non-interactive", "ref"]
-            dup_cmd = ["sudo", "-n", "-l", "/usr/bin/zypper", "--non-interactive", "dup", "--dry-run"]
+        # Check rule installation off the GUI thread, reusing the last answer while the rule file is unchanged
+        cached_rule = sudoers.cached_probe()
+        if cached_rule is not None:
+            QTimer.singleShot(0, lambda: self._on_rule_probed(cached_rule))
+        else:
+            self.probe = SudoersProbe()
+            self.probe.probe_finished.connect(self._on_rule_probed)
+            self.probe.start()
+
+    def _record_time_to_tray(self):
+        age = process_age()
+        if age is None:
+            age = time.perf_counter() - _IMPORT_TIME
+        logging.info(f"Time to tray: {age * 1000:.0f} ms")
+        record_time_to_tray(age, APP_VERSION)
+
+    def _on_rule_probed(self, ok):
+        if ok:
+            self.setup_complete()
+        else:
+            self.run_wizard()
+
+    @property
+    def main_window(self):
+        if self._main_window is None:
+            from ui.main_window import MainWindow
+            self._main_window = MainWindow(self.icon_green)
             
-            ref_proc = subprocess.run(ref_cmd, capture_output=True, text=True)
-            dup_proc = subprocess.run(dup_cmd, capture_output=True, text=True)
+            # Connect refresh link from main window
+            self._main_window.refresh_requested_callback = lambda: self.start_check("manual")
             
-            if ref_proc.returncode == 0 and dup_proc.returncode == 0:
-                self.setup_complete()
-            else:
-                self.run_wizard()
-        except Exception:
-            self.run_wizard()
+            # Connect window buttons
+            self._main_window.update_btn.clicked.connect(self.run_updates)
+            self._main_window.settings_btn.clicked.connect(self.show_settings)
+            self._main_window.cancel_btn.clicked.connect(self.cancel_jobs)
+            self._main_window.advanced_window.update_selected.connect(self.run_custom_updates)
+            
+            # Replay the state we collected while the window didn't exist
+            if self.last_results is not None:
+                self._populate_updates(self.last_results)
+            state, updates_data = self.status
+            self._main_window.set_status(state, updates_data=updates_data)
+        return self._main_window
+
+    @property
+    def settings_window(self):
+        if self._settings_window is None:
+            from ui.settings_window import SettingsWindow
+            self._settings_window = SettingsWindow()
+            self._settings_window.trigger_wizard.connect(self.run_wizard)
+            self._settings_window.trigger_logs.connect(self.open_log_history)
+            self._settings_window.settings_changed.connect(self.on_settings_saved)
+        return self._settings_window
+
+    @property
+    def history_window(self):
+        if self._history_window is None:
+            from ui.history_window import HistoryWindow
+            self._history_window = HistoryWindow()
+        return self._history_window
+
+    def open_log_history(self):
+        self.history_window.show()
+        self.history_window.raise_()
+
+    def show_main_window(self):
+        self.main_window.show()
+
+    def _set_status(self, state, updates_data=None):
+        self.status = (state, updates_data)
+        self.action_cancel.setVisible(state in ("checking", "updating"))
+        tooltip = "SUSE Updater"
+        if state == "ready_to_install":
+            tooltip += " - " + get_text("ready_to_install_msg")
+        elif state in ("update_failed", "update_cancelled"):
+            tooltip += " - " + get_text(state)
+        self.tray.setToolTip(tooltip)
+        if self._main_window is not None:
+            self._main_window.set_status(state, updates_data=updates_data)
+
+    def _populate_updates(self, results):
+        window = self._main_window
+        if window is None:
+            return
+        window.advanced_window.populate_updates(
+            results.get("zypper_updates", 0) > 0,
+            results.get("flatpak_system_updates", []),
+            results.get("flatpak_user_updates", []),
+            results.get("flatpak_installation_updates", {}),
+            zypper_summary=results, staged=staged_apps(results))
             
     def run_wizard(self):
         logging.info("Sudoers rule not found. Showing wizard.")
+        from ui.wizard_window import WizardWindow
         self.wizard = WizardWindow()
         self.wizard.setup_complete.connect(self.setup_complete)
         self.wizard.setup_skipped.connect(self.setup_skipped)
@@ -97,81 +231,224 @@ class UpdateApp:
         
     def setup_complete(self):
         logging.info("Sudoers rule is installed. Enabling automatic background checks.")
-        # Start automatic checks
-        self.start_check()
+        # The schedule survives restarts, so a login only checks if one is actually due.
+        # Before the first scheduled check we go by the age of the cached result.
+        due = self.scheduler.is_due() if self.scheduler.has_schedule() else self._cache_is_stale()
+        if due:
+            self.start_check("startup")
+        else:
+            logging.info(f"No check due yet, next one in {self.scheduler.seconds_until_due() / 60:.0f} min.")
+        # Poll the wall clock instead of timing the interval, so time spent suspended counts
         self.timer = QTimer()
-        self.timer.timeout.connect(self.start_check)
-        self.timer.start(14400000) # Every 4 hours
+        self.timer.timeout.connect(self._on_schedule_tick)
+        self.timer.start(POLL_SECONDS * 1000)
+
+    def _on_schedule_tick(self):
+        if not self.jobs.busy() and self.scheduler.is_due():
+            self.start_check("timer")
         
     def setup_skipped(self):
         logging.info("Wizard skipped. Checks will remain manual.")
-        self.main_window.set_status("up_to_date")
-        self._update_tray_icon("green")
+        if self.last_results is None:
+            self._set_status("up_to_date")
+            self._update_tray_icon("green")
         # No timer started!
 
     def tray_activated(self, reason):
         if reason == QSystemTrayIcon.Trigger:
-            if self.main_window.isVisible():
+            if self._main_window is not None and self._main_window.isVisible():
                 self.main_window.hide()
             else:
                 self.main_window.show()
 
     def refresh_all_texts(self):
-        self.main_window.refresh_texts()
-        self.settings_window.refresh_texts()
+        if self._main_window is not None:
+            self._main_window.refresh_texts()
+        if self._settings_window is not None:
+            self._settings_window.refresh_texts()
+        if self._history_window is not None:
+            self._history_window.refresh_texts()
         if hasattr(self, 'wizard'):
             self.wizard.refresh_texts()
         
         # Update tray menu
         self.action_show.setText(get_text("tray_open"))
         self.action_check.setText(get_text("tray_check"))
+        self.action_cancel.setText(get_text("tray_cancel"))
         self.action_settings.setText(get_text("tray_settings"))
         self.action_quit.setText(get_text("tray_quit"))
 
+    def _on_setting_changed(self, key, value):
+        # The wizard switches language before any settings window exists
+        if key == "language":
+            self.refresh_all_texts()
+
     def on_settings_saved(self):
         self.refresh_all_texts()
-        self.start_check() # Re-check engines
+        self.start_check("settings") # Re-check engines
 
     def show_settings(self):
         # Ensure it has latest settings/lang
         self.settings_window.refresh_texts()
         self.settings_window.show()
 
-    def start_check(self):
-        self.main_window.set_status("checking")
-        
-        from PySide6.QtCore import QSettings
-        settings = QSettings("SuseUpdater", "OpenSUSE_Tool")
-        check_zyp = settings.value("check_zypper", True, type=bool)
-        check_fp = settings.value("check_flatpak", True, type=bool)
+    def start_check(self, trigger="manual"):
+        # New settings may change what gets checked, so that check can't ride along with a running one
+        outcome = self.jobs.submit(CHECK, lambda: self._run_check(trigger), merge_running=trigger != "settings")
+        if outcome != "started":
+            logging.info(f"Check requested ({trigger}) while busy: {outcome}.")
+
+    def _run_check(self, trigger):
+        self._set_status("checking")
         
-        self.checker = UpdateChecker(check_zyp, check_fp)
+        config = store().snapshot()
+        self.checker = UpdateChecker(config["check_zypper"], config["check_flatpak"],
+                                     max_jobs=config["check_concurrency"], refresh_window=config["refresh_window_minutes"],
+                                     trigger=trigger, timeout_minutes=config["check_timeout_minutes"],
+                                     shared_path=config["system_check_file"],
+                                     shared_max_age=config["system_check_max_age_minutes"])
         self.checker.updates_found.connect(self.process_check_results)
+        self.checker.error_occurred.connect(self._on_check_failed)
+        self.checker.check_cancelled.connect(self._on_check_cancelled)
+        self.checker.finished.connect(self._on_check_thread_finished)
         self.checker.start()
+
+    def _on_check_thread_finished(self):
+        self.jobs.finished(CHECK)
         
-    def process_check_results(self, results):
+    def _on_check_failed(self, message):
+        logging.error(f"Update check failed: {message}")
+        self.scheduler.record("error")
+        self._restore_last_results()
+
+    def _on_check_cancelled(self):
+        # Not a failure, but the next tick must not start the check the user just stopped
+        self.scheduler.record("cancelled")
+        self._restore_last_results()
+
+    def _restore_last_results(self):
+        # Don't leave the spinner running, the last known results still apply
+        if self.last_results is not None:
+            self.process_check_results(self.last_results, from_cache=True)
+        else:
+            self._set_status("up_to_date")
+            self._update_tray_icon("green")
+
+    def _running_workers(self):
+        return [w for w in (self.checker, self.runner, self.predownloader) if w is not None and w.isRunning()]
+
+    def cancel_jobs(self):
+        """Stops the running check or update and drops the ones waiting for their turn."""
+        logging.info("Cancelling running jobs.")
+        self.jobs.queue.clear()
+        if self._main_window is not None:
+            self._main_window.cancel_btn.setEnabled(False)
+        for worker in self._running_workers():
+            worker.cancel()
+
+    def _installing(self):
+        return self.runner is not None and self.runner.isRunning() and self.runner.engine.installing()
+
+    def request_quit(self):
+        # Quitting would cut zypper dup off from its output mid-transaction, offer to quit once it is done
+        if self._installing():
+            reply = QMessageBox.question(None, get_text("quit_during_update_title"), get_text("quit_during_update_msg"),
+                                         QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
+            if reply == QMessageBox.Yes:
+                self._quit_after_update = True
+                self.cancel_jobs()
+            return
+        self.app.quit()
+
+    def shutdown(self):
+        # Children run in their own process groups and would outlive us, stop them within a bounded time
+        workers = self._running_workers()
+        if not workers:
+            return
+        logging.info(f"Stopping {len(workers)} running job(s) before quitting...")
+        self.jobs.queue.clear()
+        for worker in workers:
+            worker.cancel()
+        deadline = time.monotonic() + SHUTDOWN_TIMEOUT_MS / 1000
+        for worker in workers:
+            if worker is self.runner and self._installing():
+                # e.g. the session ends, a running dup is never stopped, so wait for it
+                logging.warning("Waiting for the system upgrade to finish before quitting...")
+                worker.wait()
+                continue
+            if not worker.wait(max(0, int((deadline - time.monotonic()) * 1000))):
+                logging.warning("A job did not stop in time, quitting anyway.")
+
+    def _cache_is_stale(self):
+        if self.last_results is None:
+            return True
+        return result_cache.is_stale(self.last_check_time, store().get("cache_ttl_minutes"))
+
+    def process_check_results(self, results, from_cache=False):
         has_zypper_updates = results.get("zypper_updates", 0) > 0
         sys_flatpaks = results.get("flatpak_system_updates", [])
         usr_flatpaks = results.get("flatpak_user_updates", [])
-        has_flatpak_updates = len(sys_flatpaks) > 0 or len(usr_flatpaks) > 0
+        inst_flatpaks = results.get("flatpak_installation_updates", {})
+        has_flatpak_updates = len(sys_flatpaks) > 0 or len(usr_flatpaks) > 0 or any(inst_flatpaks.values())
         has_conflict = results.get("zypper_conflict", False)
         
         # Populate UI checkboxes
-        self.main_window.advanced_window.populate_updates(has_zypper_updates, sys_flatpaks, usr_flatpaks)
+        self._populate_updates(results)
         
         if has_conflict:
-            self.main_window.set_status("conflicts", updates_data=results)
+            self._set_status("conflicts", updates_data=results)
             self._update_tray_icon("yellow")
-            self.tray.showMessage(get_text("conflicts_title"), get_text("conflicts_desc"), QSystemTrayIcon.Warning)
+            if not from_cache:
+                self.tray.showMessage(get_text("conflicts_title"), get_text("conflicts_desc"), QSystemTrayIcon.Warning)
         elif has_zypper_updates or has_flatpak_updates:
-            self.main_window.set_status("updates_ready", updates_data=results)
+            self._set_status("ready_to_install" if ready_to_install(results) else "updates_ready", updates_data=results)
             self._update_tray_icon("yellow")
-            self.tray.showMessage(get_text("updates_available_title"), get_text("wait_query"), QSystemTrayIcon.Information)
+            flatpak_count = len(sys_flatpaks) + len(usr_flatpaks) + sum(len(a) for a in inst_flatpaks.values())
+            message = get_text("updates_available_msg").format(zypper=results.get("zypper_updates", 0), flatpak=flatpak_count)
+            if not from_cache:
+                self.tray.showMessage(get_text("updates_available_title"), message, QSystemTrayIcon.Information)
         else:
-            self.main_window.set_status("up_to_date")
+            self._set_status("up_to_date")
             self._update_tray_icon("green")
             
         self.last_results = results
+        if not from_cache:
+            self.last_check_time = time.time()
+            result_cache.save_results(results, when=self.last_check_time)
+            self.scheduler.record(result_state(results), now=self.last_check_time)
+            if self.status[0] == "updates_ready":
+                self._start_predownload()
+
+    def _start_predownload(self):
+        if not store().get("predownload"):
+            return
+        # Background work, a check or an update stops it and takes the zypp lock over
+        self.jobs.submit(PREDOWNLOAD, self._run_predownload, cancel=self._cancel_predownload)
+
+    def _run_predownload(self):
+        # An update may have run while this one waited for its turn
+        if self.status[0] != "updates_ready":
+            QTimer.singleShot(0, lambda: self.jobs.finished(PREDOWNLOAD))
+            return
+        self.predownloader = PredownloadWorker(self.last_results)
+        self.predownloader.download_finished.connect(self._on_predownload_finished)
+        self.predownloader.finished.connect(self._on_predownload_thread_finished)
+        self.predownloader.start()
+
+    def _on_predownload_thread_finished(self):
+        self.jobs.finished(PREDOWNLOAD)
+
+    def _on_predownload_finished(self, ok):
+        # Partial prefetches still mark their apps as staged
+        self._populate_updates(self.last_results)
+        # Only upgrade the state if nothing else happened in the meantime
+        if self.status[0] == "updates_ready" and ready_to_install(self.last_results):
+            self._set_status("ready_to_install", updates_data=self.last_results)
+
+    def _cancel_predownload(self):
+        # No waiting here, the coordinator starts the next job once the worker has ended
+        if self.predownloader is not None and self.predownloader.isRunning():
+            self.predownloader.cancel()
 
     def _update_tray_icon(self, color):
         if color == "red":
@@ -182,39 +459,63 @@ class UpdateApp:
             self.tray.setIcon(self.icon_green)
         
     def run_updates(self):
-        self.main_window.set_status("updating")
+        self.jobs.submit(UPDATE, self._run_update_all)
+
+    def _run_update_all(self):
+        self._set_status("updating")
         
         run_zyp = self.last_results.get("zypper_updates", 0) > 0
         sys_apps = self.last_results.get("flatpak_system_updates", [])
         usr_apps = self.last_results.get("flatpak_user_updates", [])
+        inst_apps = self.last_results.get("flatpak_installation_updates", {})
         
-        self.runner = UpdaterRunner(run_zyp, sys_apps, usr_apps)
-        self.runner.update_progress.connect(self.main_window.advanced_window.append_log)
+        self.runner = UpdaterRunner(run_zyp, sys_apps, usr_apps, inst_apps, config=store().snapshot(),
+                                    trigger="update_all", zypper_count=self.last_results.get("zypper_updates", 0))
+        self.runner.log_lines.connect(self.main_window.advanced_window.append_lines)
+        self.runner.progress.connect(self._on_update_progress)
         self.runner.update_finished.connect(self.on_update_finished)
+        self.runner.finished.connect(self._on_runner_thread_finished)
         self.runner.start()
         
-    def run_custom_updates(self, run_zyp, sys_apps, usr_apps):
-        self.main_window.set_status("updating")
+    def run_custom_updates(self, run_zyp, sys_apps, usr_apps, inst_apps):
+        self.jobs.submit(UPDATE, lambda: self._run_custom_updates(run_zyp, sys_apps, usr_apps, inst_apps))
+
+    def _run_custom_updates(self, run_zyp, sys_apps, usr_apps, inst_apps):
+        self._set_status("updating")
         self.main_window.advanced_window.append_log(f"\n--- RUNNING SELECTIVE UPDATES ---\n")
         
         # Run specific selections
-        self.runner = UpdaterRunner(run_zypper=run_zyp, flatpak_system_apps=sys_apps, flatpak_user_apps=usr_apps)
-        self.runner.update_progress.connect(self.main_window.advanced_window.append_log)
+        self.runner = UpdaterRunner(run_zypper=run_zyp, flatpak_system_apps=sys_apps, flatpak_user_apps=usr_apps,
+                                    flatpak_installation_apps=inst_apps, config=store().snapshot(), trigger="selective",
+                                    zypper_count=(self.last_results or {}).get("zypper_updates", 0))
+        self.runner.log_lines.connect(self.main_window.advanced_window.append_lines)
+        self.runner.progress.connect(self._on_update_progress)
         self.runner.update_finished.connect(self.on_update_finished)
+        self.runner.finished.connect(self._on_runner_thread_finished)
         self.runner.start()
+
+    def _on_runner_thread_finished(self):
+        self.jobs.finished(UPDATE)
+        if self._quit_after_update:
+            self.app.quit()
         
-    def on_update_finished(self, success, logs):
+    def _on_update_progress(self, summary):
+        from ui.main_window import progress_text
+        self.main_window.set_progress(summary)
+        self.tray.setToolTip(f"SUSE Updater - {get_text('updating_title')} {progress_text(summary)}")
+
+    def on_update_finished(self, success, log_path):
+        logging.info(f"Update log written to {log_path}")
         if success:
             self.main_window.advanced_window.append_log("\n--- UPDATES COMPLETED SUCCESSFULLY ---")
-            # Re-check to ensure we are up to date
-            self.start_check()
+            # Re-check to ensure we are up to date, it starts once the runner thread is done
+            self.start_check("post_update")
         else:
-            self.main_window.advanced_window.append_log("\n--- ERRORS OCCURRED DURING UPDATE ---")
-            self.main_window.set_status("checking") # Temp reset
-            self.main_window.status_label.setText("Update Failed.")
-            self.main_window.status_icon.set_emoji("❌")
-            self.main_window.details_label.setText("Check Advanced log.")
-            self.main_window.progress_bar.hide()
+            cancelled = self.runner is not None and self.runner.engine.cancelled
+            self.main_window.advanced_window.append_log("\n--- UPDATE CANCELLED ---" if cancelled else "\n--- ERRORS OCCURRED DURING UPDATE ---")
+            self._set_status("update_cancelled" if cancelled else "update_failed", updates_data=self.last_results)
+            # Cancelled leaves the updates pending, a failure needs a look at the log
+            self._update_tray_icon("yellow" if cancelled else "red")
         
     def run(self):
         sys.exit(self.app.exec())
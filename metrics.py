@@ -0,0 +1,101 @@
+import os
+import time
+import logging
+
+from storage import state_dir, save_json, save_text
+
+PREFIX = "suse_updater"
+
+def status_path():
+    return os.path.join(state_dir(), "status.json")
+
+def textfile_path():
+    return os.path.join(state_dir(), "metrics.prom")
+
+def collect(db):
+    """Snapshot of the run history for monitoring: latest run and phases per kind, last successes and totals."""
+    latest = db.latest_by_kind()
+    successes = db.latest_by_kind(success_only=True)
+    status = {"generated": time.time(), "runs": {}, "totals": {}}
+    for kind, run in latest.items():
+        run = dict(run, phases=db.phases_for(run["id"]))
+        run["last_success"] = successes[kind]["started"] + successes[kind]["duration"] if kind in successes else None
+        status["runs"][kind] = run
+    for kind, success, count in db.run_counts():
+        status["totals"].setdefault(kind, {"success": 0, "failure": 0})["success" if success else "failure"] += count
+    check = latest.get("check")
+    if check and check["success"]:
+        status["pending"] = {"zypper": check["zypper_count"], "flatpak": check["flatpak_count"]}
+    return status
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _labels(**labels):
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
+
+def _value(value):
+    value = float(value)
+    return str(int(value)) if value.is_integer() else repr(value)
+
+def _merge_phases(phases):
+    # Retries record a phase once per attempt, and a series may appear only once in a scrape
+    merged = {}
+    for phase in phases:
+        total = merged.get(phase["name"])
+        if total is None:
+            merged[phase["name"]] = dict(phase)
+            continue
+        for key in ("duration", "output_bytes"):
+            if phase[key] is not None:
+                total[key] = (total[key] or 0) + phase[key]
+        if phase["exit_code"] is not None:
+            total["exit_code"] = phase["exit_code"]
+    return list(merged.values())
+
+def render_prometheus(status):
+    metrics = {} # name -> (type, help, [(labels, value)])
+
+    def add(name, metric_type, help_text, labels, value):
+        if value is None:
+            return
+        metrics.setdefault(name, (metric_type, help_text, []))[2].append((labels, value))
+
+    for kind, run in status["runs"].items():
+        add("last_run_timestamp_seconds", "gauge", "Start of the latest run.", _labels(kind=kind), run["started"])
+        add("last_run_duration_seconds", "gauge", "Duration of the latest run.", _labels(kind=kind), run["duration"])
+        add("last_run_success", "gauge", "1 if the latest run succeeded.", _labels(kind=kind), run["success"])
+        add("last_success_timestamp_seconds", "gauge", "End of the latest successful run.", _labels(kind=kind), run["last_success"])
+        for phase in _merge_phases(run["phases"]):
+            labels = _labels(kind=kind, phase=phase["name"])
+            add("phase_duration_seconds", "gauge", "Duration of each phase of the latest run, summed over retries.", labels, phase["duration"])
+            add("phase_exit_code", "gauge", "Exit code of the last attempt of each phase of the latest run.", labels, phase["exit_code"])
+            add("phase_output_bytes", "gauge", "Output size of each phase of the latest run, summed over retries.", labels, phase["output_bytes"])
+    for kind, totals in status["totals"].items():
+        for result, count in totals.items():
+            add("runs_total", "counter", "Runs recorded in the local history.", _labels(kind=kind, result=result), count)
+    for source, count in status.get("pending", {}).items():
+        add("pending_updates", "gauge", "Updates found by the latest successful check.", _labels(source=source), count)
+
+    lines = []
+    for name, (metric_type, help_text, samples) in metrics.items():
+        lines.append(f"# HELP {PREFIX}_{name} {help_text}")
+        lines.append(f"# TYPE {PREFIX}_{name} {metric_type}")
+        lines.extend(f"{PREFIX}_{name}{labels} {_value(value)}" for labels, value in samples)
+    return "\n".join(lines) + "\n"
+
+def export_metrics(db, extra_textfile=None):
+    """Writes status.json and metrics.prom to the state directory, and the textfile-collector file if one is configured."""
+    logger = logging.getLogger("Metrics")
+    try:
+        status = collect(db)
+        save_json(status_path(), status)
+        text = render_prometheus(status)
+        if extra_textfile is None:
+            from config import read_config
+            extra_textfile = read_config()["metrics_textfile"]
+        for path in filter(None, [textfile_path(), extra_textfile]):
+            # node_exporter runs as its own user and must be able to read the file
+            save_text(path, text, mode=0o644)
+    except Exception as e:
+        logger.warning(f"Could not export metrics: {e}")
@@ -0,0 +1,91 @@
+import os
+import logging
+import subprocess
+
+from history import HistoryDB, PhaseRecorder
+from proc_control import ProcessGroup, Cancelled, DEFAULT_UPDATE_TIMEOUT_MINUTES
+from zypp_lock import wait_for_lock, DEFAULT_LOCK_WAIT
+from privileged_ops import LOW_PRIORITY
+
+PACKAGES_CACHE_DIR = "/var/cache/zypp/packages"
+DOWNLOAD_CMD = ["zypper", "--non-interactive", "dup", "--download-only"]
+
+# Actions that need a package file, removals and vendor-only changes don't
+DOWNLOAD_ACTIONS = ("upgrade", "downgrade", "install", "reinstall", "change-arch")
+
+def rpm_filename(package):
+    # The edition may carry an epoch ("1:2.0-1.1"), rpm file names never do
+    version = package.get("new_version", "").split(":", 1)[-1]
+    return f"{package['name']}-{version}.{package['arch']}.rpm"
+
+def cached_rpms(cache_dir=PACKAGES_CACHE_DIR):
+    names = set()
+    for root, dirs, files in os.walk(cache_dir):
+        names.update(f for f in files if f.endswith(".rpm"))
+    return names
+
+def staged_status(packages, cache_dir=PACKAGES_CACHE_DIR):
+    """Returns (staged, needed): how many of the pending package files are already in zypper's cache."""
+    wanted = {rpm_filename(p) for p in packages if p.get("action") in DOWNLOAD_ACTIONS}
+    if not wanted:
+        return 0, 0
+    return len(wanted & cached_rpms(cache_dir)), len(wanted)
+
+def is_staged(results, cache_dir=PACKAGES_CACHE_DIR):
+    staged, needed = staged_status(results.get("zypper_packages", []), cache_dir)
+    return needed > 0 and staged == needed
+
+def ready_to_install(results):
+    """True when every pending update, zypper and Flatpak, is already downloaded."""
+    from flatpak_prefetch import all_staged
+    zypper_ready = not results.get("zypper_updates") or is_staged(results)
+    return zypper_ready and all_staged(results)
+
+class Predownloader:
+    """Downloads the pending `zypper dup` at low priority, so applying it later is mostly local I/O."""
+
+    def __init__(self, trigger="background"):
+        self.trigger = trigger
+        self.recorder = PhaseRecorder()
+        self.logger = logging.getLogger("Predownloader")
+        self.procs = ProcessGroup()
+
+    @property
+    def cancelled(self):
+        return self.procs.cancelled
+
+    def run(self):
+        """Returns True when the download finished."""
+        cmd = LOW_PRIORITY + ["sudo", "-n"] + DOWNLOAD_CMD
+        # Nothing is urgent here, let YaST or a terminal zypper finish first
+        if not wait_for_lock(DEFAULT_LOCK_WAIT, cancelled=lambda: self.cancelled):
+            self.logger.info("Package manager stayed locked, skipping the pre-download.")
+            return False
+        self.logger.info("Pre-downloading pending packages...")
+        try:
+            with self.recorder.phase("zypper_download") as phase:
+                proc = self.procs.privileged("download_only", {}, cmd, DEFAULT_UPDATE_TIMEOUT_MINUTES * 60,
+                                             stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+                try:
+                    _, stderr = proc.communicate()
+                finally:
+                    self.procs.release(proc)
+                phase["exit_code"] = proc.returncode
+                phase["output_bytes"] = len(stderr)
+        except Cancelled:
+            return False
+        except OSError as e:
+            self.logger.warning(f"Could not start the pre-download: {e}")
+            return False
+        returncode = proc.returncode
+        # Exit codes 100+ are informational, like for the dry-run
+        ok = returncode == 0 or returncode >= 100
+        if not ok and not self.cancelled:
+            self.logger.warning(f"Pre-download failed ({returncode}): {stderr.strip()}")
+        HistoryDB().record_run("predownload", self.trigger, self.recorder, ok, exit_code=returncode,
+                               state="cancelled" if self.cancelled else ("staged" if ok else "failed"))
+        return ok
+
+    def cancel(self):
+        # sudo or the helper passes the signal on to zypper, which stops cleanly and releases its lock
+        self.procs.cancel()
@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""Root helper for SUSE Updater, started by suse-updater-helper.socket.
+
+Runs a fixed set of zypper and flatpak operations for local clients and streams
+their output and progress back as JSON lines. One request per connection:
+
+    -> {"op": "dup", "args": {}}
+    -> {"type": "cancel"}   any time later, stops the operation, except for dup
+    <- {"type": "line", "stream": "stdout", "text": "..."}
+    <- {"type": "progress", "event": {...}}   see progress.ProgressTracker
+    <- {"type": "exit", "code": 0, "spans": {"download": [start, end], ...}}
+    <- {"type": "error", "message": "..."}   instead of exit when the request was refused
+
+A client that hangs up without a cancel only cancels operations that leave the
+system unchanged, the others run to the end and their output is dropped.
+Operations that change the system need the polkit action
+io.github.madroots.suse-updater.update.
+
+    python3 privileged_helper.py --user-mode --socket $XDG_RUNTIME_DIR/suse-updater-helper.sock
+
+runs it as the current user, without polkit, against whatever zypper and flatpak
+are first on PATH, for testing.
+"""
+import os
+import sys
+import json
+import socket
+import struct
+import logging
+import argparse
+import threading
+import subprocess
+
+from privileged_ops import build_command, encode, InvalidRequest, POLKIT_ACTION_UPDATE, UNINTERRUPTIBLE_OPS
+from proc_control import ProcessGroup, Cancelled
+from progress import tracker_for
+
+IDLE_TIMEOUT = 60 # seconds without a client before exiting, systemd starts us again on demand
+MAX_REQUEST_BYTES = 65536
+SD_LISTEN_FDS_START = 3
+
+def peer_credentials(conn):
+    pid, uid, gid = struct.unpack("3i", conn.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, struct.calcsize("3i")))
+    return pid, uid
+
+def process_start_time(pid):
+    with open(f"/proc/{pid}/stat") as f:
+        return f.read().rsplit(")", 1)[1].split()[19]
+
+def polkit_authorized(pid, uid):
+    # The start time pins the subject to this exact process, a recycled PID can't inherit the answer
+    try:
+        subject = f"{pid},{process_start_time(pid)},{uid}"
+        return subprocess.run(["pkcheck", "--action-id", POLKIT_ACTION_UPDATE, "--process", subject,
+                               "--allow-user-interaction"], capture_output=True).returncode == 0
+    except OSError:
+        return False
+
+class Connection:
+    def __init__(self, conn, user_mode):
+        self.conn = conn
+        self.user_mode = user_mode
+        self.procs = ProcessGroup()
+        self.op = None
+        self.changes_system = False
+        self.client_gone = False
+        self.finished = False
+        self._pending = b"" # what the client sent after the request
+        self._send_lock = threading.Lock()
+        self.logger = logging.getLogger("Helper")
+
+    def send(self, message):
+        if self.client_gone:
+            return
+        try:
+            with self._send_lock:
+                self.conn.sendall(encode(message))
+        except OSError:
+            self._client_left()
+
+    def _client_left(self):
+        # Nobody wants the rest of the output, but an update of the system still runs to the end
+        self.client_gone = True
+        if not self.changes_system:
+            self.procs.cancel()
+        elif not self.finished:
+            self.logger.info(f"Client went away, letting {self.op} finish.")
+
+    def _read_request(self):
+        data = b""
+        while b"\n" not in data:
+            chunk = self.conn.recv(4096)
+            if not chunk or len(data) > MAX_REQUEST_BYTES:
+                raise InvalidRequest("incomplete request")
+            data += chunk
+        line, self._pending = data.split(b"\n", 1)
+        try:
+            request = json.loads(line)
+        except ValueError:
+            raise InvalidRequest("request is not JSON")
+        if not isinstance(request, dict):
+            raise InvalidRequest("request must be an object")
+        return request
+
+    def _watch_hangup(self):
+        # After the request the client only ever sends a cancel
+        data = self._pending
+        try:
+            while b"\n" not in data:
+                chunk = self.conn.recv(4096)
+                if not chunk:
+                    break
+                data += chunk
+        except OSError:
+            pass
+        try:
+            cancel = json.loads(data.split(b"\n", 1)[0]).get("type") == "cancel"
+        except (ValueError, AttributeError):
+            cancel = False
+        if not cancel:
+            self._client_left()
+        elif self.op in UNINTERRUPTIBLE_OPS:
+            self.logger.warning(f"Ignored a cancel for {self.op}, it can't be stopped safely.")
+        else:
+            self.procs.cancel()
+
+    def _pump(self, stream, name, tracker, tracker_lock):
+        for raw in iter(stream.readline, b""):
+            text = raw.decode(errors="replace").rstrip("\n")
+            self.send({"type": "line", "stream": name, "text": text})
+            if tracker:
+                with tracker_lock:
+                    event = tracker.feed(text)
+                if event:
+                    self.send({"type": "progress", "event": event})
+
+    def handle(self):
+        try:
+            pid, uid = peer_credentials(self.conn)
+            request = self._read_request()
+            argv, env, phase, self.changes_system = build_command(request.get("op"), request.get("args", {}), self.user_mode)
+        except (InvalidRequest, OSError) as e:
+            self.send({"type": "error", "message": str(e)})
+            return
+        self.op = request["op"]
+        if self.changes_system and not self.user_mode and not polkit_authorized(pid, uid):
+            self.logger.warning(f"Refused {request['op']} for uid {uid}.")
+            self.send({"type": "error", "message": "not authorized"})
+            return
+
+        self.logger.info(f"{request['op']} for uid {uid}: {' '.join(argv)}")
+        threading.Thread(target=self._watch_hangup, daemon=True).start()
+        tracker = tracker_for(phase)
+        tracker_lock = threading.Lock()
+        try:
+            proc = self.procs.popen(argv, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                                    env=dict(os.environ, **env))
+        except (OSError, Cancelled) as e:
+            self.send({"type": "error", "message": str(e) or "cancelled"})
+            return
+        err_pump = threading.Thread(target=self._pump, args=(proc.stderr, "stderr", tracker, tracker_lock))
+        err_pump.start()
+        self._pump(proc.stdout, "stdout", tracker, tracker_lock)
+        err_pump.join()
+        proc.wait()
+        self.finished = True
+        self.procs.release(proc)
+        self.send({"type": "exit", "code": proc.returncode, "spans": tracker.spans if tracker else {}})
+
+def listening_socket(path):
+    if os.environ.get("LISTEN_PID") == str(os.getpid()) and int(os.environ.get("LISTEN_FDS", "0")) >= 1:
+        return socket.socket(fileno=SD_LISTEN_FDS_START)
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    old_umask = os.umask(0o177)
+    try:
+        sock.bind(path)
+    finally:
+        os.umask(old_umask)
+    sock.listen(8)
+    return sock
+
+def serve(sock, user_mode=False, idle_timeout=IDLE_TIMEOUT):
+    active = []
+    sock.settimeout(idle_timeout or None)
+    while True:
+        try:
+            conn, _ = sock.accept()
+        except socket.timeout:
+            active = [t for t in active if t.is_alive()]
+            if not active:
+                return
+            continue
+        conn.settimeout(None)
+
+        def run(conn=conn):
+            try:
+                Connection(conn, user_mode).handle()
+            finally:
+                # Wakes up the hangup watcher, a plain close() leaves the connection open while it waits
+                try:
+                    conn.shutdown(socket.SHUT_RDWR)
+                except OSError:
+                    pass
+                conn.close()
+        thread = threading.Thread(target=run)
+        thread.start()
+        active.append(thread)
+
+def main(argv=None):
+    from privileged_ops import HELPER_SOCKET
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--socket", default=HELPER_SOCKET, help="path to listen on without socket activation")
+    parser.add_argument("--user-mode", action="store_true", help="run as a user-mode stand-in, see above")
+    parser.add_argument("--idle-timeout", type=int, default=IDLE_TIMEOUT, help="seconds, 0 runs forever")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, stream=sys.stderr)
+    if not args.user_mode and os.geteuid() != 0:
+        parser.error("must run as root, or with --user-mode")
+    serve(listening_socket(args.socket), args.user_mode, args.idle_timeout)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
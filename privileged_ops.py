@@ -0,0 +1,69 @@
+import re
+import json
+
+# Shared by the root helper and its clients: the socket, the messages and the only commands it runs
+HELPER_SOCKET = "/run/suse-updater/helper.sock"
+POLKIT_ACTION_UPDATE = "io.github.madroots.suse-updater.update"
+# Idle I/O class and lowest CPU priority, inherited through sudo or the helper by zypper and flatpak
+LOW_PRIORITY = ["nice", "-n", "19", "ionice", "-c", "3"]
+# Never stopped once started, not even on a cancel request: a half done dup leaves a broken system
+UNINTERRUPTIBLE_OPS = ("dup",)
+
+REPO_ALIAS_RE = re.compile(r"^[A-Za-z0-9][A-Za-z0-9_.:@+-]*$")
+APP_ID_RE = re.compile(r"^[A-Za-z_][A-Za-z0-9_-]*(\.[A-Za-z0-9_-]+)+$")
+INSTALLATION_RE = re.compile(r"^[A-Za-z0-9][A-Za-z0-9_.-]*$")
+
+class InvalidRequest(Exception):
+    pass
+
+def _names(values, pattern, what):
+    if not isinstance(values, list) or not all(isinstance(v, str) and pattern.match(v) for v in values):
+        raise InvalidRequest(f"invalid {what}")
+    return values
+
+def _scope(args):
+    scope = args.get("scope", "system")
+    if scope == "system":
+        return "--system"
+    if isinstance(scope, str) and INSTALLATION_RE.match(scope):
+        return f"--installation={scope}"
+    raise InvalidRequest("invalid scope")
+
+def flatpak_scope(flag):
+    """The helper's scope argument for --system or --installation=<id>."""
+    return "system" if flag == "--system" else flag.split("=", 1)[1]
+
+def build_command(op, args, user_mode=False):
+    """Returns (argv, env overrides, progress phase, changes the system) for a request, or raises InvalidRequest.
+
+    In user mode the tools are looked up on PATH, so the helper can run against stand-ins.
+    """
+    if not isinstance(args, dict):
+        raise InvalidRequest("args must be an object")
+    zypper = ["zypper" if user_mode else "/usr/bin/zypper", "--non-interactive"]
+    flatpak = "flatpak" if user_mode else "/usr/bin/flatpak"
+    if op == "refresh":
+        return zypper + ["ref"] + _names(args.get("repos", []), REPO_ALIAS_RE, "repository alias"), {}, "zypper_ref", False
+    if op == "dry_run":
+        if args.get("xml", True):
+            return zypper + ["--xmlout", "dup", "--dry-run"], {}, "zypper_dry_run", False
+        # The text parser matches English messages
+        return zypper + ["dup", "--dry-run"], {"LC_ALL": "C"}, "zypper_dry_run_text", False
+    if op == "download_only":
+        return LOW_PRIORITY + zypper + ["dup", "--download-only"], {}, "zypper_download", False
+    if op == "dup":
+        return zypper + ["dup"], {}, "zypper_dup", True
+    if op == "flatpak_update":
+        scope = _scope(args)
+        apps = _names(args.get("apps"), APP_ID_RE, "app id")
+        if not apps:
+            raise InvalidRequest("no apps given")
+        phase = "flatpak_system" if scope == "--system" else "flatpak_installation:" + scope.split("=", 1)[1]
+        if args.get("no_deploy"):
+            # Only fills the repo, like the pre-download
+            return LOW_PRIORITY + [flatpak, "update", "-y", "--no-deploy", scope] + apps, {}, phase, False
+        return [flatpak, "update", "-y", scope] + apps, {}, phase, True
+    raise InvalidRequest(f"unknown operation {op!r}")
+
+def encode(message):
+    return (json.dumps(message) + "\n").encode()
@@ -0,0 +1,132 @@
+import os
+import signal
+import logging
+import threading
+import subprocess
+
+DEFAULT_CHECK_TIMEOUT_MINUTES = 10
+DEFAULT_UPDATE_TIMEOUT_MINUTES = 120
+TERMINATE_GRACE = 10 # seconds between SIGTERM and SIGKILL
+
+class Cancelled(Exception):
+    pass
+
+def _signal_group(proc, sig):
+    try:
+        os.killpg(proc.pid, sig)
+    except ProcessLookupError:
+        pass
+    except PermissionError:
+        # pkexec turns the whole group into root processes, only the leader may still be ours
+        try:
+            proc.send_signal(sig)
+        except (ProcessLookupError, PermissionError):
+            pass
+
+class ProcessGroup:
+    """Starts the children of one job, each in its own process group with an optional timeout.
+
+    cancel() and an expired timeout send SIGTERM to the whole group, so sudo passes
+    it on to zypper or flatpak, which stop cleanly and release their locks. Whatever
+    is still running after TERMINATE_GRACE seconds gets SIGKILL. Readers of the
+    child's output simply see EOF.
+
+    `protected` children, like zypper dup, are never stopped: they get no timeout
+    and cancel() leaves them running, since a kill mid-transaction can leave the
+    system half upgraded.
+    """
+
+    def __init__(self):
+        self.cancelled = False
+        self._procs = {} # proc -> watchdog timer or None
+        self._lock = threading.Lock()
+        self.logger = logging.getLogger("ProcessGroup")
+
+    def popen(self, cmd, timeout=None, protected=False, **kwargs):
+        """Like subprocess.Popen, raises Cancelled after cancel(). The process gets a `timed_out`
+        attribute, call release() once it has exited."""
+        if self.cancelled:
+            raise Cancelled()
+        return self._track(subprocess.Popen(cmd, start_new_session=True, **kwargs), timeout, protected)
+
+    def privileged(self, op, args, fallback, timeout=None, on_progress=None, protected=False, **kwargs):
+        """Runs an operation of the root helper (see privileged_ops) like popen. Without the
+        helper it runs `fallback` instead, the same command through sudo -n. Helper progress
+        events go to `on_progress`, the process then also has the helper's `spans`."""
+        import helper_client # reads the settings, which import this module
+        if self.cancelled:
+            raise Cancelled()
+        proc = helper_client.connect(op, args, on_progress=on_progress, **kwargs)
+        if proc is None:
+            return self.popen(fallback, timeout, protected, **kwargs)
+        return self._track(proc, timeout, protected)
+
+    def _track(self, proc, timeout, protected=False):
+        proc.timed_out = False
+        proc.protected = protected
+        timer = None
+        if timeout and not protected:
+            timer = threading.Timer(timeout, self._expire, (proc, timeout))
+            timer.daemon = True
+            timer.start()
+        with self._lock:
+            self._procs[proc] = timer
+        # cancel() may have run while the process was starting
+        if self.cancelled and not protected:
+            self.terminate(proc)
+        return proc
+
+    def release(self, proc):
+        with self._lock:
+            timer = self._procs.pop(proc, None)
+        if timer:
+            timer.cancel()
+
+    def run(self, cmd, timeout=None, privileged=None):
+        """Like subprocess.run with capture_output and text. A timed out run has returncode -SIGTERM and timed_out set.
+        `privileged` is an (op, args) pair to try in the root helper first, `cmd` is then the fallback."""
+        kwargs = dict(stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+        if privileged:
+            proc = self.privileged(*privileged, cmd, timeout, **kwargs)
+        else:
+            proc = self.popen(cmd, timeout, **kwargs)
+        try:
+            stdout, stderr = proc.communicate()
+        finally:
+            self.release(proc)
+        result = subprocess.CompletedProcess(cmd, proc.returncode, stdout, stderr)
+        result.timed_out = proc.timed_out
+        return result
+
+    def _expire(self, proc, timeout):
+        if proc.poll() is None:
+            self.logger.warning(f"{' '.join(proc.args[:4])} still running after {timeout:.0f}s, stopping it.")
+            proc.timed_out = True
+            self.terminate(proc)
+
+    def terminate(self, proc):
+        if not isinstance(proc, subprocess.Popen):
+            # The root helper stops its command itself once we hang up
+            proc.terminate()
+            return
+        _signal_group(proc, signal.SIGTERM)
+
+        def kill():
+            if proc.poll() is None:
+                _signal_group(proc, signal.SIGKILL)
+        timer = threading.Timer(TERMINATE_GRACE, kill)
+        timer.daemon = True
+        timer.start()
+
+    def protected_running(self):
+        with self._lock:
+            procs = list(self._procs)
+        return any(proc.protected and proc.poll() is None for proc in procs)
+
+    def cancel(self):
+        self.cancelled = True
+        with self._lock:
+            procs = list(self._procs)
+        for proc in procs:
+            if proc.poll() is None and not proc.protected:
+                self.terminate(proc)
@@ -0,0 +1,151 @@
+import re
+import time
+
+SIZE_UNITS = {"": 1, "B": 1, "K": 1024, "M": 1024 ** 2, "G": 1024 ** 3, "T": 1024 ** 4}
+SIZE_RE = r"([\d.,]+)\s*([KMGT]?)i?B"
+
+# Retrieving: vim-9.1.0-1.1.x86_64 (Main Repository (OSS)) (12/345),   1.6 MiB
+# Retrieving package vim-9.1.0-1.1.x86_64 (12/345), 1.6 MiB (6.9 MiB unpacked)
+ZYPPER_RETRIEVE_RE = re.compile(r"Retrieving(?::| package) (\S+).*?\((\d+)/(\d+)\),\s*" + SIZE_RE)
+# (12/345) Installing: vim-9.1.0-1.1.x86_64 ...[done]
+ZYPPER_INSTALL_RE = re.compile(r"^\((\d+)/(\d+)\) (?:Installing|Removing|Upgrading|Downgrading)")
+ZYPPER_TOTAL_RE = re.compile(r"Overall download size: " + SIZE_RE)
+# Updating 2/5… / Installing 1/1... with an optional "45%" and "1.2 MB/s" on the same line
+FLATPAK_ITEM_RE = re.compile(r"(?:Updating|Installing) (\d+)/(\d+)")
+FLATPAK_PERCENT_RE = re.compile(r"(\d{1,3})%")
+FLATPAK_RATE_RE = re.compile(SIZE_RE + r"/s")
+
+def parse_size(number, unit):
+    return int(float(number.replace(",", ".")) * SIZE_UNITS.get(unit.upper(), 1))
+
+class ProgressTracker:
+    """Turns the output lines of one task into progress events.
+
+    An event is a dict with task, phase, done, total (items), bytes_done, bytes_total,
+    rate (bytes/s, or items/s while installing), eta (seconds) and percent (0-100).
+    `feed` returns None for lines that say nothing about progress. The tracker
+    also remembers when each phase started and ended, so the history can tell a
+    slow mirror (download) from slow scriptlets (install).
+    """
+
+    def __init__(self, task, clock=time.monotonic, wallclock=time.time):
+        self.task = task
+        self.clock = clock
+        self.wallclock = wallclock
+        self.phase = None
+        self.spans = {} # phase -> [wall start, wall end]
+        # A phase starts where the previous output left off, the tool was already busy with it before its first line
+        self._mark = (self.clock(), self.wallclock())
+        self._phase_start = self._mark[0]
+
+    def _enter(self, phase):
+        if phase != self.phase:
+            self.phase = phase
+            self._phase_start = self._mark[0]
+            self.spans.setdefault(phase, [self._mark[1], self._mark[1]])
+        self._mark = (self.clock(), self.wallclock())
+        self.spans[phase][1] = self._mark[1]
+
+    def _elapsed(self):
+        return max(self.clock() - self._phase_start, 1e-6)
+
+    def _event(self, done, total, percent, bytes_done=0, bytes_total=0, rate=0.0, eta=None):
+        return {"task": self.task, "phase": self.phase, "done": done, "total": total,
+                "bytes_done": bytes_done, "bytes_total": bytes_total, "rate": rate, "eta": eta,
+                "percent": max(0.0, min(100.0, percent))}
+
+    def feed(self, line):
+        # Subclasses parse their tool's output, the base tracker knows no progress lines
+        return None
+
+class ZypperProgress(ProgressTracker):
+    # Downloading and installing each get half of the bar, unless everything was already cached
+    def __init__(self, task="zypper_dup", **kwargs):
+        super().__init__(task, **kwargs)
+        self.bytes_total = 0
+        self.bytes_done = 0
+        self.downloaded = False
+
+    def feed(self, line):
+        line = line.strip()
+        match = ZYPPER_TOTAL_RE.search(line)
+        if match:
+            self.bytes_total = parse_size(*match.groups())
+            return None
+
+        match = ZYPPER_RETRIEVE_RE.search(line)
+        if match:
+            self._enter("download")
+            self.downloaded = True
+            done, total = int(match.group(2)), int(match.group(3))
+            self.bytes_done += parse_size(match.group(4), match.group(5))
+            rate = self.bytes_done / self._elapsed()
+            if self.bytes_total:
+                fraction = min(self.bytes_done / self.bytes_total, 1.0)
+                eta = (self.bytes_total - self.bytes_done) / rate if rate else None
+            else:
+                fraction = done / total
+                eta = (total - done) * self._elapsed() / done
+            return self._event(done, total, fraction * 50, self.bytes_done, self.bytes_total, rate, eta)
+
+        match = ZYPPER_INSTALL_RE.search(line)
+        if match:
+            self._enter("install")
+            done, total = int(match.group(1)), int(match.group(2))
+            rate = done / self._elapsed()
+            eta = (total - done) / rate if rate else None
+            offset, share = (50, 50) if self.downloaded else (0, 100)
+            return self._event(done, total, offset + share * done / total, self.bytes_done, self.bytes_total, rate, eta)
+        return None
+
+class FlatpakProgress(ProgressTracker):
+    def __init__(self, task="flatpak", **kwargs):
+        super().__init__(task, **kwargs)
+        self.done = 0
+        self.total = 0
+
+    def feed(self, line):
+        match = FLATPAK_ITEM_RE.search(line)
+        if not match:
+            return None
+        self._enter("update")
+        # The counter names the ref being worked on, so the ones before it are finished
+        current, self.total = int(match.group(1)), int(match.group(2))
+        self.done = current - 1
+        percent_match = FLATPAK_PERCENT_RE.search(line)
+        ref_fraction = int(percent_match.group(1)) / 100 if percent_match else 0.0
+        rate_match = FLATPAK_RATE_RE.search(line)
+        rate = parse_size(*rate_match.groups()) if rate_match else 0.0
+        fraction = (self.done + ref_fraction) / self.total
+        eta = self._elapsed() * (1 - fraction) / fraction if fraction else None
+        return self._event(self.done, self.total, fraction * 100, rate=rate, eta=eta)
+
+def tracker_for(phase_name):
+    if phase_name == "zypper_dup":
+        return ZypperProgress(phase_name)
+    if phase_name.startswith("flatpak_"):
+        return FlatpakProgress(phase_name)
+    return None
+
+def combine(events):
+    """Overall progress of tasks running side by side, from the latest event of each."""
+    if not events:
+        return None
+    percent = sum(e["percent"] for e in events.values()) / len(events)
+    etas = [e["eta"] for e in events.values() if e["eta"] is not None]
+    return {"percent": percent, "eta": max(etas) if etas else None, "tasks": dict(events)}
+
+def download_rate(summary):
+    """Combined bytes/s of the tasks currently downloading."""
+    # While installing the rate counts packages, not bytes
+    return sum(e.get("rate", 0) for e in summary["tasks"].values() if e.get("phase") in ("download", "update"))
+
+def format_eta(seconds):
+    if seconds is None:
+        return ""
+    seconds = int(seconds)
+    if seconds >= 3600:
+        return f"{seconds // 3600}h {seconds % 3600 // 60}m"
+    if seconds >= 60:
+        return f"{seconds // 60}m {seconds % 60}s"
+    return f"{seconds}s"
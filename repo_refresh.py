@@ -0,0 +1,96 @@
+import os
+import glob
+import time
+import logging
+import configparser
+
+from storage import state_dir, load_json, save_json
+
+REPOS_DIR = "/etc/zypp/repos.d"
+RAW_CACHE_DIR = "/var/cache/zypp/raw"
+DEFAULT_WINDOW_MINUTES = 30
+
+# Files zypp rewrites or touches when a repository's metadata is refreshed
+METADATA_FILES = ("cookie", "repodata/repomd.xml", "content", "")
+
+def load_repos(repos_dir=REPOS_DIR):
+    repos = []
+    for path in sorted(glob.glob(os.path.join(repos_dir, "*.repo"))):
+        parser = configparser.ConfigParser(interpolation=None)
+        try:
+            parser.read(path)
+        except configparser.Error as e:
+            logging.getLogger("RefreshPolicy").warning(f"Ignoring unreadable repo file {path}: {e}")
+            continue
+        for alias in parser.sections():
+            section = parser[alias]
+            repos.append({
+                "alias": alias,
+                "name": section.get("name", alias),
+                "enabled": section.get("enabled", "1").strip() == "1",
+                "autorefresh": section.get("autorefresh", "1").strip() == "1",
+            })
+    return repos
+
+def metadata_timestamp(alias, cache_dir=RAW_CACHE_DIR):
+    newest = 0.0
+    for name in METADATA_FILES:
+        try:
+            newest = max(newest, os.stat(os.path.join(cache_dir, alias, name)).st_mtime)
+        except OSError:
+            pass
+    return newest
+
+class RefreshPolicy:
+    """Decides which repositories actually need a `zypper ref`.
+
+    A repository counts as fresh when either its metadata cache or our own
+    record of the last successful refresh is younger than the window.
+    """
+
+    def __init__(self, window_minutes=DEFAULT_WINDOW_MINUTES, repos_dir=REPOS_DIR, cache_dir=RAW_CACHE_DIR, state_path=None):
+        self.window = max(0, window_minutes) * 60
+        self.repos_dir = repos_dir
+        self.cache_dir = cache_dir
+        self.state_path = state_path or os.path.join(state_dir(), "refresh.json")
+        self.logger = logging.getLogger("RefreshPolicy")
+
+    def tracked_repos(self):
+        return [r["alias"] for r in load_repos(self.repos_dir) if r["enabled"] and r["autorefresh"]]
+
+    def last_refresh(self, alias, recorded=None):
+        if recorded is None:
+            recorded = load_json(self.state_path, {})
+        return max(recorded.get(alias, 0.0), metadata_timestamp(alias, self.cache_dir))
+
+    def stale_repos(self, now=None):
+        now = now or time.time()
+        recorded = load_json(self.state_path, {})
+        return [alias for alias in self.tracked_repos() if now - self.last_refresh(alias, recorded) >= self.window]
+
+    def plan(self):
+        """Returns the `zypper ref` command to run, or None when every repository is fresh."""
+        base = ["zypper", "--non-interactive", "ref"]
+        tracked = self.tracked_repos()
+        if not tracked:
+            # Can't see the repo definitions, so we can't tell what is stale either
+            return base
+        stale = self.stale_repos()
+        if not stale:
+            return None
+        # Refreshing everything keeps the command identical to the oldest sudoers rules
+        if len(stale) == len(tracked):
+            return base
+        return base + stale
+
+    def record_refresh(self, command, when=None):
+        # Aliases passed to `zypper ref`, or every tracked repo for a full refresh
+        when = when or time.time()
+        aliases = command[3:] or self.tracked_repos()
+        recorded = load_json(self.state_path, {})
+        for alias in aliases:
+            recorded[alias] = when
+        try:
+            save_json(self.state_path, recorded)
+        except OSError as e:
+            self.logger.warning(f"Could not save refresh state: {e}")
@@ -0,0 +1,30 @@
+import os
+import time
+import logging
+
+from storage import cache_dir, load_json, save_json
+
+CACHE_VERSION = 1
+DEFAULT_TTL_MINUTES = 240
+
+def cache_path():
+    return os.path.join(cache_dir(), "last_check.json")
+
+def save_results(results, path=None, when=None):
+    entry = {"version": CACHE_VERSION, "timestamp": when or time.time(), "results": results}
+    try:
+        save_json(path or cache_path(), entry)
+    except (OSError, TypeError, ValueError) as e:
+        logging.getLogger("ResultCache").warning(f"Could not cache check results: {e}")
+
+def load_results(path=None):
+    """Returns (results, timestamp) from the last check, or (None, 0) if there is no usable cache."""
+    entry = load_json(path or cache_path())
+    if not isinstance(entry, dict) or entry.get("version") != CACHE_VERSION or not isinstance(entry.get("results"), dict):
+        return None, 0
+    return entry["results"], entry.get("timestamp", 0)
+
+def is_stale(timestamp, ttl_minutes=DEFAULT_TTL_MINUTES, now=None):
+    age = (now or time.time()) - timestamp
+    # A timestamp from the future means the clock was changed, don't trust it
+    return age < 0 or age >= ttl_minutes * 60
@@ -0,0 +1,77 @@
+import os
+import glob
+import gzip
+import time
+import shutil
+import logging
+
+from storage import state_dir
+
+KEEP_UNCOMPRESSED = 3
+MAX_RUNS = 50
+MAX_AGE_DAYS = 90
+MAX_TOTAL_BYTES = 200 * 1024 * 1024
+
+def log_dir():
+    path = os.path.join(state_dir(), "logs")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+class RunLog:
+    """Transcript of a single run, written line by line as it happens."""
+
+    def __init__(self, kind="update", directory=None):
+        self.run_id = f"{kind}-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}"
+        self.path = os.path.join(directory or log_dir(), f"{self.run_id}.log")
+        # Line buffered, so the file is readable while the run is still going
+        self._file = open(self.path, "a", encoding="utf-8", buffering=1)
+
+    def write(self, text):
+        self._file.write(text if text.endswith("\n") else text + "\n")
+
+    def close(self):
+        self._file.close()
+
+def list_runs(directory=None):
+    """Returns [(run_id, path, mtime, size), ...] newest first, for plain and compressed logs."""
+    runs = []
+    for path in glob.glob(os.path.join(directory or log_dir(), "*.log*")):
+        name = os.path.basename(path)
+        if not (name.endswith(".log") or name.endswith(".log.gz")):
+            continue
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue
+        runs.append((name.split(".log")[0], path, st.st_mtime, st.st_size))
+    runs.sort(key=lambda run: run[2], reverse=True)
+    return runs
+
+def open_run(path):
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8", errors="replace")
+    return open(path, "r", encoding="utf-8", errors="replace")
+
+def _compress(path):
+    gz_path = path + ".gz"
+    with open(path, "rb") as src, gzip.open(gz_path, "wb") as dst:
+        shutil.copyfileobj(src, dst)
+    shutil.copystat(path, gz_path)
+    os.unlink(path)
+
+def rotate_logs(directory=None, keep_uncompressed=KEEP_UNCOMPRESSED, max_runs=MAX_RUNS,
+                max_age_days=MAX_AGE_DAYS, max_total_bytes=MAX_TOTAL_BYTES, now=None):
+    logger = logging.getLogger("RunLog")
+    now = now or time.time()
+    total = 0
+    for index, (run_id, path, mtime, size) in enumerate(list_runs(directory)):
+        try:
+            if index >= max_runs or now - mtime > max_age_days * 86400 or total + size > max_total_bytes:
+                os.unlink(path)
+                continue
+            if index >= keep_uncompressed and path.endswith(".log"):
+                _compress(path)
+                size = os.path.getsize(path + ".gz")
+            total += size
+        except OSError as e:
+            logger.warning(f"Could not rotate {path}: {e}")
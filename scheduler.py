@@ -0,0 +1,89 @@
+import os
+import time
+import random
+import logging
+
+from storage import state_dir, load_json, save_json
+
+DEFAULT_INTERVAL_MINUTES = 240
+MIN_INTERVAL_MINUTES = 60
+MAX_INTERVAL_MINUTES = 24 * 60
+JITTER = 0.15 # +-15% of every delay
+RETRY_MINUTES = 15 # first retry after a failed check, doubles each time
+POLL_SECONDS = 60
+
+def schedule_path():
+    return os.path.join(state_dir(), "schedule.json")
+
+class CheckScheduler:
+    """Decides when the next background check is due.
+
+    The due time is kept on disk as wall-clock time, so restarting the app or
+    logging in doesn't trigger a check, and a machine waking from suspend
+    notices a missed check on the next poll. Each delay gets random jitter so a
+    fleet drifts apart instead of hitting the mirrors together. Failed checks
+    back off exponentially. The regular interval shrinks while updates keep
+    showing up and grows while the system stays up to date.
+    """
+
+    def __init__(self, base_minutes=DEFAULT_INTERVAL_MINUTES, path=None, rng=None):
+        self.path = path or schedule_path()
+        self.rng = rng or random.Random()
+        self.base_minutes = min(max(base_minutes, MIN_INTERVAL_MINUTES), MAX_INTERVAL_MINUTES)
+        self.min_interval = max(MIN_INTERVAL_MINUTES, self.base_minutes / 2)
+        self.max_interval = min(MAX_INTERVAL_MINUTES, self.base_minutes * 3)
+
+        state = load_json(self.path, {})
+        if not isinstance(state, dict):
+            state = {}
+        self.next_due = state.get("next_due")
+        self.interval = self._clamp(state.get("interval", self.base_minutes))
+        self.failures = state.get("failures", 0)
+
+    def _clamp(self, minutes):
+        return min(max(minutes, self.min_interval), self.max_interval)
+
+    def has_schedule(self):
+        return self.next_due is not None
+
+    def is_due(self, now=None):
+        now = now or time.time()
+        if self.next_due is None:
+            return True
+        # A due time further away than any delay we hand out means the clock was turned back
+        if self.next_due - now > MAX_INTERVAL_MINUTES * (1 + JITTER) * 60:
+            return True
+        return now >= self.next_due
+
+    def seconds_until_due(self, now=None):
+        if self.next_due is None:
+            return 0
+        return max(0, self.next_due - (now or time.time()))
+
+    def record(self, state, now=None):
+        """Plans the next check after one finished with state error, cancelled, conflicts, updates_ready or up_to_date."""
+        now = now or time.time()
+        if state == "error":
+            self.failures += 1
+            delay = min(RETRY_MINUTES * 2 ** (self.failures - 1), self.max_interval)
+        elif state in ("conflicts", "cancelled"):
+            # Neither is a failure: conflicts stay until someone resolves them, and the
+            # user just didn't want this check. Come back after the regular interval.
+            if state == "conflicts":
+                self.failures = 0
+            delay = self.interval
+        else:
+            self.failures = 0
+            self.interval = self._clamp(self.interval * (0.75 if state == "updates_ready" else 1.25))
+            delay = self.interval
+        delay *= 1 + self.rng.uniform(-JITTER, JITTER)
+        self.next_due = now + delay * 60
+        self._save()
+        logging.getLogger("CheckScheduler").info(
+            f"Next check at {time.strftime('%Y-%m-%d %H:%M', time.localtime(self.next_due))} ({state}, {delay:.0f} min)")
+
+    def _save(self):
+        try:
+            save_json(self.path, {"next_due": self.next_due, "interval": self.interval, "failures": self.failures})
+        except OSError as e:
+            logging.getLogger("CheckScheduler").warning(f"Could not save check schedule: {e}")
@@ -0,0 +1,60 @@
+from types import MappingProxyType
+from PySide6.QtCore import QObject, QSettings, QTimer, Signal
+
+from config import ORGANIZATION, APPLICATION, SCHEMA
+
+FLUSH_DELAY_MS = 500
+
+class SettingsStore(QObject):
+    """In-memory view of the user settings.
+
+    Everything is read once at construction. Writes update memory immediately
+    and are flushed to disk together shortly after. Missing user values fall back to
+    QSettings' system scope (/etc/xdg/SuseUpdater/OpenSUSE_Tool.conf), which is
+    where fleet deployments put their defaults.
+    """
+    changed = Signal(str, object) # key, new value
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._qsettings = QSettings(ORGANIZATION, APPLICATION)
+        self._values = {}
+        for key, (value_type, default) in SCHEMA.items():
+            self._values[key] = self._qsettings.value(key, default, type=value_type)
+        self._pending = {}
+        self._flush_timer = QTimer(self)
+        self._flush_timer.setSingleShot(True)
+        self._flush_timer.setInterval(FLUSH_DELAY_MS)
+        self._flush_timer.timeout.connect(self.sync)
+
+    def get(self, key):
+        return self._values[key]
+
+    def set(self, key, value):
+        value_type = SCHEMA[key][0]
+        value = value_type(value)
+        if self._values.get(key) == value:
+            return
+        self._values[key] = value
+        self._pending[key] = value
+        self._flush_timer.start()
+        self.changed.emit(key, value)
+
+    def sync(self):
+        self._flush_timer.stop()
+        for key, value in self._pending.items():
+            self._qsettings.setValue(key, value)
+        self._pending.clear()
+        self._qsettings.sync()
+
+    def snapshot(self):
+        # Read-only copy for worker threads, which must not touch QSettings
+        return MappingProxyType(dict(self._values))
+
+_store = None
+
+def store():
+    global _store
+    if _store is None:
+        _store = SettingsStore()
+    return _store
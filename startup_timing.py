@@ -0,0 +1,30 @@
+import os
+import time
+
+from storage import state_dir, load_json, save_json
+
+HISTORY_LENGTH = 50
+
+def process_age():
+    """Seconds since this process was started, including interpreter startup."""
+    try:
+        with open("/proc/self/stat") as f:
+            # The command name may contain spaces, fields after it are fixed
+            fields = f.read().rsplit(")", 1)[1].split()
+        start_ticks = int(fields[19])
+        with open("/proc/uptime") as f:
+            uptime = float(f.read().split()[0])
+        return max(0.0, uptime - start_ticks / os.sysconf("SC_CLK_TCK"))
+    except (OSError, ValueError, IndexError):
+        return None
+
+def record_time_to_tray(seconds, version):
+    path = os.path.join(state_dir(), "startup.json")
+    history = load_json(path, [])
+    if not isinstance(history, list):
+        history = []
+    history.append({"timestamp": time.time(), "version": version, "time_to_tray_ms": round(seconds * 1000, 1)})
+    try:
+        save_json(path, history[-HISTORY_LENGTH:])
+    except OSError:
+        pass
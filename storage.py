@@ -0,0 +1,47 @@
+import os
+import json
+import tempfile
+
+APP_DIR_NAME = "suse-updater"
+
+def _xdg_dir(env_var, fallback):
+    base = os.environ.get(env_var) or os.path.expanduser(fallback)
+    path = os.path.join(base, APP_DIR_NAME)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+def state_dir():
+    return _xdg_dir("XDG_STATE_HOME", "~/.local/state")
+
+def cache_dir():
+    return _xdg_dir("XDG_CACHE_HOME", "~/.cache")
+
+def load_json(path, default=None):
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return default
+
+def save_json(path, data, mode=None):
+    save_text(path, json.dumps(data), mode)
+
+def save_text(path, text, mode=None):
+    # Write to a temp file in the same directory and rename, so readers never see half a file
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(prefix=".tmp-", dir=directory)
+    try:
+        with os.fdopen(fd, "w") as f:
+            if mode is not None:
+                os.fchmod(f.fileno(), mode)
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
@@ -0,0 +1,116 @@
+import os
+import time
+import shutil
+import tempfile
+import subprocess
+
+from storage import cache_dir, load_json, save_json
+import helper_client
+
+SUDOERS_FILE = "/etc/sudoers.d/suse-updater"
+
+# Commands the background checks need without a password
+CHECK_COMMANDS = [
+    "/usr/bin/zypper --non-interactive dup --dry-run",
+    "/usr/bin/zypper --non-interactive --xmlout dup --dry-run",
+    "/usr/bin/zypper --non-interactive ref",
+    "/usr/bin/zypper --non-interactive ref *",
+    "/usr/bin/zypper --non-interactive dup --download-only",
+    "/usr/bin/flatpak update -y --no-deploy --system*",
+    "/usr/bin/flatpak update -y --no-deploy --installation=*",
+]
+
+# Extra commands allowed when "passwordless updates" is enabled
+PASSWORDLESS_COMMANDS = [
+    "/usr/bin/zypper --non-interactive dup",
+    "/usr/bin/flatpak update -y --system*",
+    "/usr/bin/flatpak update -y --installation=*",
+]
+
+def build_rule(passwordless=False):
+    commands = CHECK_COMMANDS + (PASSWORDLESS_COMMANDS if passwordless else [])
+    return "ALL ALL=(root) NOPASSWD: " + ", ".join(commands)
+
+def install_rule(passwordless=False):
+    """Installs the rule through pkexec, raises CalledProcessError when that fails or is refused.
+
+    The rule is checked with visudo first and copied into place by install(1), so no
+    shell runs as root and a broken rule can't lock anyone out of sudo.
+    """
+    fd, path = tempfile.mkstemp(prefix="suse-updater-sudoers-")
+    try:
+        with os.fdopen(fd, "w") as f:
+            f.write(build_rule(passwordless) + "\n")
+        visudo = shutil.which("visudo") or ("/usr/sbin/visudo" if os.path.exists("/usr/sbin/visudo") else None)
+        if visudo:
+            subprocess.run([visudo, "-c", "-q", "-f", path], check=True, capture_output=True)
+        subprocess.run(["pkexec", "/usr/bin/install", "-m", "0440", "-o", "root", "-g", "root", path, SUDOERS_FILE], check=True)
+    finally:
+        os.unlink(path)
+
+# 'sudo -n -l <cmd>' checks whether the policy allows a command without executing it.
+# This is fast and network-independent, preventing the wizard from showing if network is down.
+PROBE_COMMANDS = [
+    ["sudo", "-n", "-l", "/usr/bin/zypper", "--non-interactive", "ref"],
+    ["sudo", "-n", "-l", "/usr/bin/zypper", "--non-interactive", "dup", "--dry-run"],
+]
+PROBE_CACHE_MAX_AGE = 24 * 3600
+# Rules installed before background downloads existed lack these
+DOWNLOAD_PROBES = [
+    ["sudo", "-n", "-l", "/usr/bin/zypper", "--non-interactive", "dup", "--download-only"],
+    ["sudo", "-n", "-l", "/usr/bin/flatpak", "update", "-y", "--no-deploy", "--system"],
+]
+
+def probe_rule():
+    # The root helper runs the checks without any sudoers rule
+    if helper_client.available():
+        return True
+    try:
+        return all(subprocess.run(cmd, capture_output=True).returncode == 0 for cmd in PROBE_COMMANDS)
+    except OSError:
+        return False
+
+def can_predownload():
+    if helper_client.available():
+        return True
+    try:
+        return all(subprocess.run(cmd, capture_output=True).returncode == 0 for cmd in DOWNLOAD_PROBES)
+    except OSError:
+        return False
+
+def _probe_cache_path():
+    return os.path.join(cache_dir(), "sudoers_probe.json")
+
+def _rule_key():
+    # /etc/sudoers.d is usually not searchable for users, then the directory mtime is the best we get
+    for path in (SUDOERS_FILE, os.path.dirname(SUDOERS_FILE)):
+        try:
+            st = os.stat(path)
+            return [path, st.st_mtime_ns, st.st_size]
+        except OSError:
+            continue
+    return None
+
+def cached_probe():
+    """Returns the cached probe result, or None when the rule may have changed since."""
+    if helper_client.available():
+        return True
+    entry = load_json(_probe_cache_path())
+    key = _rule_key()
+    if not isinstance(entry, dict) or key is None or entry.get("key") != key:
+        return None
+    if not 0 <= time.time() - entry.get("timestamp", 0) < PROBE_CACHE_MAX_AGE:
+        return None
+    return bool(entry.get("ok"))
+
+def store_probe(ok):
+    try:
+        save_json(_probe_cache_path(), {"key": _rule_key(), "ok": ok, "timestamp": time.time()})
+    except OSError:
+        pass
+
+def invalidate_probe():
+    try:
+        os.unlink(_probe_cache_path())
+    except OSError:
+        pass
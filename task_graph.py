@@ -0,0 +1,83 @@
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+SKIPPED = "skipped"
+
+class Task:
+    def __init__(self, name, fn, requires=(), after=()):
+        self.name = name
+        self.fn = fn
+        self.requires = list(requires) # must have succeeded
+        self.after = list(after) # must have finished, either way
+        self.status = PENDING
+        self.duration = 0.0
+        self.error = None
+
+class TaskGraph:
+    """Runs tasks in parallel, keeping only the orderings they declare.
+
+    A task is a callable returning True on success. It starts as soon as everything
+    it depends on has finished, and is skipped if something it `requires` failed.
+    A failing or raising task never stops unrelated branches.
+    """
+
+    def __init__(self, on_status=None):
+        self.tasks = {}
+        self.on_status = on_status # called with (task) whenever a task changes status
+        self.logger = logging.getLogger("TaskGraph")
+
+    def add(self, name, fn, requires=(), after=()):
+        for dep in list(requires) + list(after):
+            if dep not in self.tasks:
+                raise ValueError(f"Task {name} depends on unknown task {dep}")
+        self.tasks[name] = Task(name, fn, requires, after)
+        return self.tasks[name]
+
+    def _set_status(self, task, status):
+        task.status = status
+        if self.on_status:
+            self.on_status(task)
+
+    def _ready(self, task):
+        deps = task.requires + task.after
+        return all(self.tasks[dep].status in (DONE, FAILED, SKIPPED) for dep in deps)
+
+    def _run_task(self, task):
+        start = time.monotonic()
+        try:
+            ok = bool(task.fn())
+        except Exception as e:
+            self.logger.error(f"Task {task.name} raised: {e}")
+            task.error = str(e)
+            ok = False
+        task.duration = time.monotonic() - start
+        return ok
+
+    def run(self, max_workers=4):
+        """Returns {name: status} once every task is done, failed or skipped."""
+        running = {}
+        with ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="task") as pool:
+            while True:
+                for task in self.tasks.values():
+                    if task.status != PENDING or not self._ready(task):
+                        continue
+                    if any(self.tasks[dep].status != DONE for dep in task.requires):
+                        self._set_status(task, SKIPPED)
+                        continue
+                    self._set_status(task, RUNNING)
+                    running[pool.submit(self._run_task, task)] = task
+                if not running:
+                    # Skipping a task can unblock others, go around once more before giving up
+                    if any(task.status == PENDING and self._ready(task) for task in self.tasks.values()):
+                        continue
+                    break
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    task = running.pop(future)
+                    self._set_status(task, DONE if future.result() else FAILED)
+        return {name: task.status for name, task in self.tasks.items()}
@@ -1,12 +1,15 @@
+from collections import deque
 from PySide6.QtWidgets import (
-    QWidget, QVBoxLayout, QTextEdit, QLabel, QScrollArea, 
+    QWidget, QVBoxLayout, QPlainTextEdit, QLabel, QScrollArea, 
     QCheckBox, QPushButton, QHBoxLayout, QGroupBox, QTabWidget
 )
 from PySide6.QtCore import Qt, Signal
 from i18n import get_text
+from settings_store import store
+from zypper_xml import format_size
 
 class AdvancedWindow(QWidget):
-    update_selected = Signal(bool, list, list) # run_zypper, system_apps, user_apps
+    update_selected = Signal(bool, list, list, dict) # run_zypper, system_apps, user_apps, {installation: apps}
 
     def __init__(self, parent=None):
         super().__init__(parent)
@@ -35,6 +38,7 @@ class AdvancedWindow(QWidget):
         self.zypper_checkbox = None
         self.sys_checkboxes = {}
         self.usr_checkboxes = {}
+        self.inst_checkboxes = {} # installation -> {app: checkbox}
         
         self.fp_scroll.setWidget(self.fp_scroll_content)
         self.fp_layout.addWidget(self.fp_scroll, stretch=1)
@@ -53,10 +57,14 @@ class AdvancedWindow(QWidget):
         self.log_label = QLabel(get_text("raw_logs") + ":")
         self.log_layout.addWidget(self.log_label)
         
-        self.log_area = QTextEdit()
+        # Old lines drop off the top once the limit is reached, so a huge dup can't grow the view forever
+        max_lines = store().get("log_max_lines")
+        self.log_area = QPlainTextEdit()
         self.log_area.setReadOnly(True)
+        self.log_area.setMaximumBlockCount(max_lines)
+        self.pending_lines = deque(maxlen=max_lines) # lines received while the window is hidden
         self.log_area.setStyleSheet("""
-            QTextEdit {
+            QPlainTextEdit {
                 background-color: #1a1a1a;
                 color: #d4d4d4;
                 font-family: monospace;
@@ -85,7 +93,16 @@ class AdvancedWindow(QWidget):
             QCheckBox::indicator { width: 18px; height: 18px; }
         """)
         
-    def populate_updates(self, has_zypper, system_apps, user_apps):
+    def _app_checkbox(self, app, staged):
+        cb = QCheckBox(app)
+        if app in staged:
+            # Already pulled in the background, updating it only deploys locally
+            cb.setText(f"{app}  ✓ {get_text('flatpak_staged')}")
+        cb.setChecked(True)
+        return cb
+
+    def populate_updates(self, has_zypper, system_apps, user_apps, installation_apps=None, zypper_summary=None, staged=None):
+        staged = staged or {} # scope -> set of prefetched apps
         # Clear existing
         for i in reversed(range(self.fp_scroll_layout.count())): 
             self.fp_scroll_layout.itemAt(i).widget().setParent(None)
@@ -93,8 +110,10 @@ class AdvancedWindow(QWidget):
         self.zypper_checkbox = None
         self.sys_checkboxes.clear()
         self.usr_checkboxes.clear()
+        self.inst_checkboxes.clear()
+        installation_apps = {name: apps for name, apps in (installation_apps or {}).items() if apps}
         
-        if not has_zypper and not system_apps and not user_apps:
+        if not has_zypper and not system_apps and not user_apps and not installation_apps:
             self.fp_scroll_layout.addWidget(QLabel(get_text("no_updates")))
             self.update_btn.setEnabled(False)
             return
@@ -103,16 +122,28 @@ class AdvancedWindow(QWidget):
         
         if has_zypper:
             self.fp_scroll_layout.addWidget(QLabel(f"<b>{get_text('os_update_zypper')}:</b>"))
-            self.zypper_checkbox = QCheckBox("OpenSUSE System Packages") # Packages names themselves aren't usually translated
+            packages = (zypper_summary or {}).get("zypper_packages", [])
+            if packages:
+                label = get_text("system_packages_count").format(
+                    count=zypper_summary.get("zypper_updates", len(packages)),
+                    size=format_size(zypper_summary.get("zypper_download_size", 0)))
+            else:
+                label = get_text("system_packages")
+            self.zypper_checkbox = QCheckBox(label)
             self.zypper_checkbox.setChecked(True)
             self.fp_scroll_layout.addWidget(self.zypper_checkbox)
+            vendor_changes = [p for p in packages if p.get("vendor_change")]
+            if vendor_changes:
+                vendor_label = QLabel(get_text("vendor_changes").format(count=len(vendor_changes)))
+                vendor_label.setStyleSheet("color: #FFD740; padding-left: 28px;")
+                vendor_label.setToolTip("\n".join(f"{p['name']}: {p.get('old_vendor', '')} -> {p.get('new_vendor', '')}" for p in vendor_changes))
+                self.fp_scroll_layout.addWidget(vendor_label)
             self.fp_scroll_layout.addWidget(QLabel("")) # Spacing
             
         if system_apps:
             self.fp_scroll_layout.addWidget(QLabel(f"<b>System {get_text('apps_flatpaks')}:</b>"))
             for app in system_apps:
-                cb = QCheckBox(app)
-                cb.setChecked(True)
+                cb = self._app_checkbox(app, staged.get("--system", set()))
                 self.sys_checkboxes[app] = cb
                 self.fp_scroll_layout.addWidget(cb)
             self.fp_scroll_layout.addWidget(QLabel("")) # Spacing
@@ -120,22 +151,51 @@ class AdvancedWindow(QWidget):
         if user_apps:
             self.fp_scroll_layout.addWidget(QLabel(f"<b>User {get_text('apps_flatpaks')}:</b>"))
             for app in user_apps:
-                cb = QCheckBox(app)
-                cb.setChecked(True)
+                cb = self._app_checkbox(app, staged.get("--user", set()))
                 self.usr_checkboxes[app] = cb
                 self.fp_scroll_layout.addWidget(cb)
+            self.fp_scroll_layout.addWidget(QLabel("")) # Spacing
+
+        for name, apps in installation_apps.items():
+            self.fp_scroll_layout.addWidget(QLabel(f"<b>{name} {get_text('apps_flatpaks')}:</b>"))
+            self.inst_checkboxes[name] = {}
+            for app in apps:
+                cb = self._app_checkbox(app, staged.get(f"--installation={name}", set()))
+                self.inst_checkboxes[name][app] = cb
+                self.fp_scroll_layout.addWidget(cb)
+            self.fp_scroll_layout.addWidget(QLabel("")) # Spacing
                 
     def set_updating(self, is_updating):
         self.update_btn.setEnabled(not is_updating)
         if self.zypper_checkbox: self.zypper_checkbox.setEnabled(not is_updating)
         for cb in self.sys_checkboxes.values(): cb.setEnabled(not is_updating)
         for cb in self.usr_checkboxes.values(): cb.setEnabled(not is_updating)
+        for boxes in self.inst_checkboxes.values():
+            for cb in boxes.values(): cb.setEnabled(not is_updating)
                 
     def set_log(self, text):
+        self.pending_lines.clear()
         self.log_area.setPlainText(text)
         
     def append_log(self, text):
-        self.log_area.append(text)
+        self.append_lines([text])
+
+    def append_lines(self, lines):
+        if not self.isVisible():
+            # Nobody is looking, keep only what the view could show anyway
+            self.pending_lines.extend(lines)
+            return
+        self._flush_pending()
+        self.log_area.appendPlainText("\n".join(lines))
+
+    def _flush_pending(self):
+        if self.pending_lines:
+            self.log_area.appendPlainText("\n".join(self.pending_lines))
+            self.pending_lines.clear()
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self._flush_pending()
 
     def refresh_texts(self):
         self.setWindowTitle(get_text("selective_updates"))
@@ -149,4 +209,9 @@ class AdvancedWindow(QWidget):
         run_zyp = self.zypper_checkbox.isChecked() if self.zypper_checkbox else False
         selected_sys = [app for app, cb in self.sys_checkboxes.items() if cb.isChecked()]
         selected_usr = [app for app, cb in self.usr_checkboxes.items() if cb.isChecked()]
-        self.update_selected.emit(run_zyp, selected_sys, selected_usr)
+        selected_inst = {}
+        for name, boxes in self.inst_checkboxes.items():
+            apps = [app for app, cb in boxes.items() if cb.isChecked()]
+            if apps:
+                selected_inst[name] = apps
+        self.update_selected.emit(run_zyp, selected_sys, selected_usr, selected_inst)
@@ -0,0 +1,211 @@
+import os
+import time
+from PySide6.QtWidgets import (
+    QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton,
+    QTabWidget, QTableWidget, QTableWidgetItem, QComboBox, QHeaderView, QAbstractItemView
+)
+from PySide6.QtGui import QDesktopServices
+from PySide6.QtCore import Qt, QUrl
+from history import HistoryDB
+from run_log import log_dir
+from i18n import get_text
+
+PAGE_SIZE = 50
+SLOWEST_DAYS = 30
+
+def _format_duration(seconds):
+    if seconds >= 60:
+        return f"{int(seconds // 60)}m {int(seconds % 60)}s"
+    return f"{seconds:.1f}s"
+
+def _format_time(timestamp):
+    return time.strftime("%Y-%m-%d %H:%M", time.localtime(timestamp))
+
+class HistoryWindow(QWidget):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle(get_text("history_title"))
+        self.resize(850, 550)
+
+        self.db = HistoryDB()
+        self.page = 0
+
+        self.layout = QVBoxLayout(self)
+        self.tabs = QTabWidget()
+        self.layout.addWidget(self.tabs)
+
+        # --- Tab 1: Runs ---
+        self.tab_runs = QWidget()
+        self.runs_layout = QVBoxLayout(self.tab_runs)
+
+        self.filter_layout = QHBoxLayout()
+        self.filter_combo = QComboBox()
+        self.filter_combo.addItem(get_text("history_all"), False)
+        self.filter_combo.addItem(get_text("history_failures"), True)
+        self.filter_combo.currentIndexChanged.connect(self._on_filter_changed)
+        self.filter_layout.addWidget(self.filter_combo)
+        self.filter_layout.addStretch()
+        self.folder_btn = QPushButton(get_text("history_open_folder"))
+        self.folder_btn.clicked.connect(self.open_log_folder)
+        self.filter_layout.addWidget(self.folder_btn)
+        self.runs_layout.addLayout(self.filter_layout)
+
+        self.runs_table = self._make_table(7)
+        # Double click opens the transcript of that run
+        self.runs_table.cellDoubleClicked.connect(self._on_run_double_clicked)
+        self.runs_layout.addWidget(self.runs_table, stretch=1)
+
+        self.page_layout = QHBoxLayout()
+        self.prev_btn = QPushButton("<")
+        self.prev_btn.clicked.connect(lambda: self._go_to_page(self.page - 1))
+        self.page_label = QLabel()
+        self.page_label.setAlignment(Qt.AlignCenter)
+        self.next_btn = QPushButton(">")
+        self.next_btn.clicked.connect(lambda: self._go_to_page(self.page + 1))
+        self.page_layout.addWidget(self.prev_btn)
+        self.page_layout.addWidget(self.page_label, stretch=1)
+        self.page_layout.addWidget(self.next_btn)
+        self.runs_layout.addLayout(self.page_layout)
+
+        self.tabs.addTab(self.tab_runs, get_text("history_runs"))
+
+        # --- Tab 2: Slowest phases ---
+        self.tab_phases = QWidget()
+        self.phases_layout = QVBoxLayout(self.tab_phases)
+        self.phases_info = QLabel()
+        self.phases_info.setStyleSheet("padding: 5px; color: #ccc;")
+        self.phases_layout.addWidget(self.phases_info)
+        self.phases_table = self._make_table(5)
+        self.phases_layout.addWidget(self.phases_table, stretch=1)
+        self.tabs.addTab(self.tab_phases, get_text("history_slowest"))
+
+        self.refresh_texts()
+        self._apply_theme()
+
+    def _make_table(self, columns):
+        table = QTableWidget(0, columns)
+        table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        table.verticalHeader().setVisible(False)
+        table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
+        table.horizontalHeader().setStretchLastSection(True)
+        return table
+
+    def _apply_theme(self):
+        self.setStyleSheet("""
+            QWidget { background-color: #282828; color: white; }
+            QTabWidget::pane { border: 1px solid #444; }
+            QTabBar::tab { background: #333; padding: 8px 16px; }
+            QTabBar::tab:selected { background: #444; }
+            QTableWidget { background-color: #1a1a1a; gridline-color: #333; border: 1px solid #444; }
+            QHeaderView::section { background-color: #333; color: #ccc; padding: 4px; border: none; }
+            QComboBox { background: #333; color: white; border: 1px solid #555; border-radius: 4px; padding: 3px; }
+            QPushButton { background-color: #444; border-radius: 4px; padding: 6px 12px; font-weight: bold; }
+            QPushButton:hover { background-color: #555; }
+            QPushButton:disabled { color: #777; }
+        """)
+
+    def showEvent(self, event):
+        # Runs may have finished since the window was last open
+        self.reload()
+        super().showEvent(event)
+
+    def reload(self):
+        self._load_runs()
+        self._load_phases()
+
+    def _failures_only(self):
+        return bool(self.filter_combo.currentData())
+
+    def _on_filter_changed(self, index):
+        self._go_to_page(0)
+
+    def _go_to_page(self, page):
+        self.page = max(0, page)
+        self._load_runs()
+
+    def _load_runs(self):
+        failures_only = self._failures_only()
+        total = self.db.count_runs(failures_only)
+        pages = max(1, (total + PAGE_SIZE - 1) // PAGE_SIZE)
+        self.page = min(self.page, pages - 1)
+        offset = self.page * PAGE_SIZE
+        if failures_only:
+            runs = self.db.failures(PAGE_SIZE, offset)
+        else:
+            runs = self.db.last_runs(PAGE_SIZE, offset)
+
+        self.runs_table.setRowCount(len(runs))
+        for row, run in enumerate(runs):
+            result = get_text("history_ok") if run["success"] else get_text("history_failed")
+            if run["state"] and run["kind"] == "check":
+                result = f"{result} ({run['state']})"
+            values = [
+                _format_time(run["started"]),
+                run["kind"],
+                run["trigger"],
+                _format_duration(run["duration"]),
+                result,
+                f"{run['zypper_count']} / {run['flatpak_count']}",
+                os.path.basename(run["log_path"]) if run["log_path"] else "",
+            ]
+            for column, value in enumerate(values):
+                item = QTableWidgetItem(str(value))
+                if column == 0:
+                    item.setData(Qt.UserRole, run["log_path"])
+                if column == 4 and not run["success"]:
+                    item.setForeground(Qt.red)
+                self.runs_table.setItem(row, column, item)
+
+        self.page_label.setText(get_text("history_page").format(page=self.page + 1, pages=pages, total=total))
+        self.prev_btn.setEnabled(self.page > 0)
+        self.next_btn.setEnabled(self.page < pages - 1)
+
+    def _load_phases(self):
+        since = time.time() - SLOWEST_DAYS * 86400
+        phases = self.db.slowest_phases(PAGE_SIZE, since=since)
+        self.phases_table.setRowCount(len(phases))
+        for row, phase in enumerate(phases):
+            values = [
+                phase["name"],
+                _format_duration(phase["duration"]),
+                "" if phase["exit_code"] is None else phase["exit_code"],
+                f"{phase['kind']} ({phase['trigger']})",
+                _format_time(phase["started"]),
+            ]
+            for column, value in enumerate(values):
+                self.phases_table.setItem(row, column, QTableWidgetItem(str(value)))
+
+    def _on_run_double_clicked(self, row, column):
+        item = self.runs_table.item(row, 0)
+        log_path = item.data(Qt.UserRole) if item else None
+        if not log_path:
+            return
+        # Older transcripts get compressed by the log rotation
+        for path in (log_path, log_path + ".gz"):
+            if os.path.exists(path):
+                QDesktopServices.openUrl(QUrl.fromLocalFile(path))
+                return
+
+    def open_log_folder(self):
+        QDesktopServices.openUrl(QUrl.fromLocalFile(log_dir()))
+
+    def refresh_texts(self):
+        self.setWindowTitle(get_text("history_title"))
+        self.filter_combo.setItemText(0, get_text("history_all"))
+        self.filter_combo.setItemText(1, get_text("history_failures"))
+        self.folder_btn.setText(get_text("history_open_folder"))
+        self.tabs.setTabText(0, get_text("history_runs"))
+        self.tabs.setTabText(1, get_text("history_slowest"))
+        self.runs_table.setHorizontalHeaderLabels([
+            get_text("history_col_started"), get_text("history_col_kind"), get_text("history_col_trigger"),
+            get_text("history_col_duration"), get_text("history_col_result"), get_text("history_col_updates"),
+            get_text("history_col_log"),
+        ])
+        self.phases_table.setHorizontalHeaderLabels([
+            get_text("history_col_phase"), get_text("history_col_duration"), get_text("history_col_exit"),
+            get_text("history_col_run"), get_text("history_col_started"),
+        ])
+        self.phases_info.setText(get_text("history_slowest_info").format(days=SLOWEST_DAYS))
+        if self.isVisible():
+            self._load_runs()
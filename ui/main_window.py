@@ -1,13 +1,27 @@
 import os
+import html
 from PySide6.QtWidgets import (
     QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, 
     QLabel, QPushButton, QProgressBar, QSystemTrayIcon
 )
-from PySide6.QtCore import Qt, QSize, QSettings, QPropertyAnimation, Property, QRect, QRectF
+from PySide6.QtCore import Qt, QSize, QPropertyAnimation, Property, QRect, QRectF
 from PySide6.QtGui import QIcon, QFont, QColor, QPalette, QPixmap, QPainter
 from PySide6.QtSvg import QSvgRenderer
 from .advanced_window import AdvancedWindow
 from i18n import get_text
+from settings_store import store
+from version import APP_VERSION
+from zypper_xml import format_size
+from progress import download_rate, format_eta
+
+def progress_text(summary):
+    parts = [f"{int(summary['percent'])}%"]
+    rate = download_rate(summary)
+    if rate:
+        parts.append(f"{format_size(rate)}/s")
+    if summary.get("eta") is not None:
+        parts.append(get_text("progress_eta").format(eta=format_eta(summary["eta"])))
+    return " · ".join(parts)
 
 class RotatingLabel(QLabel):
     def __init__(self, *args, **kwargs):
@@ -84,7 +98,7 @@ class RotatingLabel(QLabel):
 class MainWindow(QMainWindow):
     def __init__(self, check_icon, parent=None):
         super().__init__(parent)
-        self.setWindowTitle(f"{get_text('title')} v0.1.7")
+        self.setWindowTitle(f"{get_text('title')} v{APP_VERSION}")
         self.setMinimumSize(500, 450) # Increased min height and allowed growth
         
         # Save a reference to the main app's icon for checking state
@@ -182,6 +196,13 @@ class MainWindow(QMainWindow):
         self.logs_btn.setStyleSheet("color: #3498db; background: transparent; border: none; text-decoration: underline; font-weight: bold;")
         self.logs_btn.hide()
         self.content_layout.addWidget(self.logs_btn, alignment=Qt.AlignCenter)
+
+        # Cancel Button (shows while checking or updating)
+        self.cancel_btn = QPushButton(get_text("cancel"))
+        self.cancel_btn.setFixedSize(180, 30)
+        self.cancel_btn.setStyleSheet("color: #aaa; background: transparent; border: none; text-decoration: underline;")
+        self.cancel_btn.hide()
+        self.content_layout.addWidget(self.cancel_btn, alignment=Qt.AlignCenter)
         
         # Progress Bar (hidden by default)
         self.progress_bar = QProgressBar()
@@ -228,10 +249,11 @@ class MainWindow(QMainWindow):
         self.status_icon.set_emoji(emoji)
 
     def refresh_texts(self):
-        self.setWindowTitle(f"{get_text('title')} v0.1.7")
+        self.setWindowTitle(f"{get_text('title')} v{APP_VERSION}")
         self.update_btn.setText(get_text("update_all"))
         self.adv_btn.setText(get_text("advanced"))
         self.logs_btn.setText(get_text("real_time_logs"))
+        self.cancel_btn.setText(get_text("cancel"))
         
         # Force refresh status if it's already set
         if hasattr(self, 'current_state'):
@@ -239,9 +261,16 @@ class MainWindow(QMainWindow):
 
         self.advanced_window.refresh_texts()
 
+    def set_progress(self, summary):
+        self.progress_bar.setRange(0, 100)
+        self.progress_bar.setValue(int(summary["percent"]))
+        self.progress_bar.setFormat(progress_text(summary))
+
     def set_status(self, state, details="", updates_data=None):
         self.current_state = state
         self.last_updates_data = updates_data
+        self.cancel_btn.setVisible(state in ("checking", "updating"))
+        self.cancel_btn.setEnabled(True)
         
         if state == "checking":
             gear_svg = os.path.join(os.path.dirname(__file__), "..", "assets", "icons", "settings_gear.svg")
@@ -263,9 +292,9 @@ class MainWindow(QMainWindow):
             self.status_label.setText(get_text("up_to_date"))
             self.status_label.setStyleSheet("color: #00C853;")
             
-            settings = QSettings("SuseUpdater", "OpenSUSE_Tool")
-            check_zyp = settings.value("check_zypper", True, type=bool)
-            check_fp = settings.value("check_flatpak", True, type=bool)
+            settings = store()
+            check_zyp = settings.get("check_zypper")
+            check_fp = settings.get("check_flatpak")
 
             lines = []
             if check_zyp:
@@ -282,23 +311,34 @@ class MainWindow(QMainWindow):
             self.refresh_link.show()
             self.advanced_window.set_updating(False)
             
-        elif state == "updates_ready":
+        elif state in ("updates_ready", "ready_to_install"):
             self.status_icon.stop_rotation()
             self._set_large_icon(emoji="📦")
-            self.status_label.setText(get_text("updates_available_title"))
+            ready = state == "ready_to_install" # packages are already downloaded
+            self.status_label.setText(get_text("ready_to_install_title" if ready else "updates_available_title"))
             self.status_label.setStyleSheet("color: #FFD740;")
             
-            settings = QSettings("SuseUpdater", "OpenSUSE_Tool")
-            check_zyp = settings.value("check_zypper", True, type=bool)
-            check_fp = settings.value("check_flatpak", True, type=bool)
+            settings = store()
+            check_zyp = settings.get("check_zypper")
+            check_fp = settings.get("check_flatpak")
 
             z_up = (updates_data.get('zypper_updates', 0) > 0) if check_zyp else False
             fs_up_list = updates_data.get('flatpak_system_updates', []) if check_fp else []
             fu_up_list = updates_data.get('flatpak_user_updates', []) if check_fp else []
-            has_flatpak_updates = (len(fs_up_list) + len(fu_up_list)) > 0
+            fi_up = updates_data.get('flatpak_installation_updates', {}) if check_fp else {}
+            has_flatpak_updates = (len(fs_up_list) + len(fu_up_list) + sum(len(a) for a in fi_up.values())) > 0
             
-            z_text = get_text("zypper_updates") if z_up else get_text("zypper_uptodate")
-            f_text = get_text("flatpak_updates") if has_flatpak_updates else get_text("flatpak_uptodate")
+            if z_up and updates_data.get('zypper_packages'):
+                z_text = get_text("zypper_updates_count").format(
+                    count=updates_data['zypper_updates'],
+                    size=format_size(updates_data.get('zypper_download_size', 0)))
+            else:
+                z_text = get_text("zypper_updates") if z_up else get_text("zypper_uptodate")
+            flatpak_count = len(fs_up_list) + len(fu_up_list) + sum(len(a) for a in fi_up.values())
+            f_text = get_text("flatpak_updates_count").format(count=flatpak_count) if has_flatpak_updates else get_text("flatpak_uptodate")
+            
+            if ready:
+                z_text += "<br><i>" + get_text("zypper_staged") + "</i>"
             
             lines = []
             if check_zyp:
@@ -322,14 +362,15 @@ class MainWindow(QMainWindow):
             self.status_label.setText(get_text("conflicts_title"))
             self.status_label.setStyleSheet("color: #FFD740;")
             
-            settings = QSettings("SuseUpdater", "OpenSUSE_Tool")
-            check_zyp = settings.value("check_zypper", True, type=bool)
-            check_fp = settings.value("check_flatpak", True, type=bool)
+            settings = store()
+            check_zyp = settings.get("check_zypper")
+            check_fp = settings.get("check_flatpak")
 
             z_up = "---" if check_zyp else get_text("zypper_uptodate")
             fs_up_list = updates_data.get('flatpak_system_updates', []) if check_fp else []
             fu_up_list = updates_data.get('flatpak_user_updates', []) if check_fp else []
-            has_flatpak_updates = (len(fs_up_list) + len(fu_up_list)) > 0
+            fi_up = updates_data.get('flatpak_installation_updates', {}) if check_fp else {}
+            has_flatpak_updates = (len(fs_up_list) + len(fu_up_list) + sum(len(a) for a in fi_up.values())) > 0
             f_text = get_text("flatpak_updates") if has_flatpak_updates else get_text("flatpak_uptodate")
 
             lines = []
@@ -338,8 +379,14 @@ class MainWindow(QMainWindow):
             if check_fp:
                 lines.append(f"<b>{get_text('apps_flatpaks')}:</b> {f_text}")
 
+            problems = updates_data.get('zypper_problems', [])
+            problem_text = ""
+            if problems:
+                problem_text = "<br><br><i>" + html.escape(problems[0]['description']) + "</i>"
+                if len(problems) > 1:
+                    problem_text += f" (+{len(problems) - 1})"
             self.details_label.setText(
-                "<br>".join(lines) + "<br><br>" +
+                "<br>".join(lines) + problem_text + "<br><br>" +
                 get_text("conflicts_desc")
             )
             # Hide the big button so they don't force Zypper
@@ -361,10 +408,28 @@ class MainWindow(QMainWindow):
             self.update_btn.setEnabled(False)
             self.adv_btn.hide()
             self.logs_btn.show()
+            # Indeterminate until the first progress event arrives
+            self.progress_bar.setRange(0, 0)
+            self.progress_bar.setFormat("")
             self.progress_bar.show()
             self.advanced_window.set_updating(True)
 
-        # Update the advanced window raw logs just in case they open it
-        if updates_data:
+        elif state in ("update_failed", "update_cancelled"):
+            self.status_icon.stop_rotation()
+            self._set_large_icon(emoji="❌")
+            self.status_label.setText(get_text(state))
+            self.status_label.setStyleSheet("color: #FF5252;" if state == "update_failed" else "color: #FFD740;")
+            self.details_label.setText(get_text("check_advanced"))
+            self.update_btn.hide()
+            self.adv_btn.hide()
+            self.logs_btn.show()
+            self.progress_bar.hide()
+            self.refresh_link.setText(get_text("check_updates_link"))
+            self.refresh_link.show()
+            self.advanced_window.set_updating(False)
+
+        # Update the advanced window raw logs just in case they open it, once per set of results
+        if updates_data and updates_data is not getattr(self, '_logged_data', None):
+            self._logged_data = updates_data
             combined_log = updates_data.get('zypper_output', '') + "\n" + updates_data.get('flatpak_output', '')
             self.advanced_window.set_log(combined_log)
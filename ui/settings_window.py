@@ -4,8 +4,9 @@ from PySide6.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QLabel, 
     QCheckBox, QPushButton, QGroupBox, QMessageBox, QComboBox
 )
-from PySide6.QtCore import Qt, QSettings, Signal
-from i18n import get_text
+from PySide6.QtCore import Qt, Signal
+from settings_store import store
+from i18n import get_text, get_language, set_language, available_languages
 
 class SettingsWindow(QWidget):
     settings_changed = Signal()
@@ -17,7 +18,7 @@ class SettingsWindow(QWidget):
         self.setWindowTitle(get_text("settings_title"))
         self.resize(450, 500)
         
-        self.settings = QSettings("SuseUpdater", "OpenSUSE_Tool")
+        self.settings = store()
         
         self.layout = QVBoxLayout(self)
         
@@ -29,10 +30,14 @@ class SettingsWindow(QWidget):
         self.flatpak_cb = QCheckBox(get_text("check_flatpak_label"))
         
         # Load values (default to true)
-        self.zypper_cb.setChecked(self.settings.value("check_zypper", True, type=bool))
-        self.flatpak_cb.setChecked(self.settings.value("check_flatpak", True, type=bool))
+        self.zypper_cb.setChecked(self.settings.get("check_zypper"))
+        self.flatpak_cb.setChecked(self.settings.get("check_flatpak"))
+        
+        self.predownload_cb = QCheckBox(get_text("predownload_label"))
+        self.predownload_cb.setChecked(self.settings.get("predownload"))
         
         self.engines_layout.addWidget(self.zypper_cb)
+        self.engines_layout.addWidget(self.predownload_cb)
         self.engines_layout.addWidget(self.flatpak_cb)
         
         self.layout.addWidget(self.engines_group)
@@ -46,16 +51,16 @@ class SettingsWindow(QWidget):
         self.sys_layout.addWidget(self.autostart_cb)
         
         self.passwordless_cb = QCheckBox(get_text("passwordless_updates"))
-        self.passwordless_cb.setChecked(self.settings.value("passwordless_updates", False, type=bool))
+        self.passwordless_cb.setChecked(self.settings.get("passwordless_updates"))
         self.sys_layout.addWidget(self.passwordless_cb)
         
         # Language Picker
         self.lang_layout = QHBoxLayout()
         self.lang_label = QLabel(f"{get_text('language')}:")
         self.lang_combo = QComboBox()
-        self.lang_combo.addItems(["English", "Slovenčina"])
-        current_lang = self.settings.value("language", "en")
-        self.lang_combo.setCurrentIndex(1 if current_lang == "sk" else 0)
+        for code, name in available_languages():
+            self.lang_combo.addItem(name, code)
+        self.lang_combo.setCurrentIndex(max(0, self.lang_combo.findData(get_language())))
         self.lang_layout.addWidget(self.lang_label)
         self.lang_layout.addWidget(self.lang_combo)
         self.sys_layout.addLayout(self.lang_layout)
@@ -134,10 +139,12 @@ class SettingsWindow(QWidget):
         )
         if reply == QMessageBox.Yes:
             import subprocess
-            subprocess.run(["pkexec", "rm", "-f", "/etc/sudoers.d/suse-updater"])
+            from sudoers import SUDOERS_FILE, invalidate_probe
+            subprocess.run(["pkexec", "rm", "-f", SUDOERS_FILE])
+            invalidate_probe()
             self.zypper_cb.setChecked(False) # Turn off the check so the script doesn't loop fail
             self.passwordless_cb.setChecked(False)
-            self.settings.setValue("passwordless_updates", False)
+            self.settings.set("passwordless_updates", False)
             self.save()
 
     def get_autostart_path(self):
@@ -186,13 +193,21 @@ X-GNOME-Autostart-enabled=true
                 os.remove(desktop_file)
 
     def save(self):
-        lang = "sk" if self.lang_combo.currentIndex() == 1 else "en"
-        self.settings.setValue("language", lang)
-        self.settings.setValue("check_zypper", self.zypper_cb.isChecked())
-        self.settings.setValue("check_flatpak", self.flatpak_cb.isChecked())
+        set_language(self.lang_combo.currentData())
+        self.settings.set("check_zypper", self.zypper_cb.isChecked())
+        self.settings.set("check_flatpak", self.flatpak_cb.isChecked())
         self.toggle_autostart(self.autostart_cb.isChecked())
         
-        old_passwordless = self.settings.value("passwordless_updates", False, type=bool)
+        predownload = self.predownload_cb.isChecked()
+        if predownload and not self.settings.get("predownload"):
+            from sudoers import can_predownload
+            # The installed rule may predate background downloads
+            if not can_predownload() and not self._update_sudoers(self.settings.get("passwordless_updates")):
+                self.predownload_cb.setChecked(False)
+                predownload = False
+        self.settings.set("predownload", predownload)
+        
+        old_passwordless = self.settings.get("passwordless_updates")
         new_passwordless = self.passwordless_cb.isChecked()
         
         if old_passwordless != new_passwordless:
@@ -202,40 +217,37 @@ X-GNOME-Autostart-enabled=true
                     get_text("passwordless_confirm_msg"),
                     QMessageBox.Yes | QMessageBox.No, QMessageBox.No
                 )
-                if reply == QMessageBox.Yes:
-                    self._update_sudoers(True)
-                    self.settings.setValue("passwordless_updates", True)
+                if reply == QMessageBox.Yes and self._update_sudoers(True):
+                    self.settings.set("passwordless_updates", True)
                 else:
                     self.passwordless_cb.setChecked(False)
+            elif self._update_sudoers(False):
+                self.settings.set("passwordless_updates", False)
             else:
-                self._update_sudoers(False)
-                self.settings.setValue("passwordless_updates", False)
+                # The old rule is still in place
+                self.passwordless_cb.setChecked(True)
         
         self.refresh_texts()
         self.settings_changed.emit()
         self.close()
 
     def _update_sudoers(self, passwordless):
-        import subprocess
-        base_rule = "ALL ALL=(root) NOPASSWD: /usr/bin/zypper --non-interactive dup --dry-run, /usr/bin/zypper --non-interactive ref"
-        if passwordless:
-            full_rule = base_rule + ", /usr/bin/zypper --non-interactive dup, /usr/bin/flatpak update -y --system*"
-        else:
-            full_rule = base_rule
-            
-        cmd = f'echo "{full_rule}" > /etc/sudoers.d/suse-updater && chmod 440 /etc/sudoers.d/suse-updater'
+        """Returns False when the rule could not be installed, e.g. the password prompt was cancelled."""
+        from sudoers import install_rule, invalidate_probe
         try:
-            subprocess.run(["pkexec", "bash", "-c", cmd], check=True)
+            install_rule(passwordless)
+            invalidate_probe()
+            return True
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Failed to update sudoers: {e}")
-            self.passwordless_cb.setChecked(False)
-            self.settings.setValue("passwordless_updates", False)
+            return False
 
     def refresh_texts(self):
         self.setWindowTitle(get_text("settings_title"))
         self.engines_group.setTitle(get_text("engines_group"))
         self.zypper_cb.setText(get_text("check_zypper_label"))
         self.flatpak_cb.setText(get_text("check_flatpak_label"))
+        self.predownload_cb.setText(get_text("predownload_label"))
         self.sys_group.setTitle(get_text("sys_behavior"))
         self.autostart_cb.setText(get_text("autostart"))
         self.passwordless_cb.setText(get_text("passwordless_updates"))
@@ -1,8 +1,10 @@
 from PySide6.QtWidgets import QWidget, QVBoxLayout, QLabel, QPushButton, QHBoxLayout, QMessageBox, QApplication, QComboBox
-from PySide6.QtCore import Qt, Signal, QSettings
+from PySide6.QtCore import Qt, Signal
 import subprocess
 import os
-from i18n import get_text
+from settings_store import store
+from i18n import get_text, get_language, set_language, available_languages
+from sudoers import install_rule, store_probe
 
 class WizardWindow(QWidget):
     setup_complete = Signal()
@@ -13,7 +15,7 @@ class WizardWindow(QWidget):
         self.setWindowTitle(get_text("wizard_title"))
         self.setFixedSize(550, 450)
         
-        self.settings = QSettings("SuseUpdater", "OpenSUSE_Tool")
+        self.settings = store()
         
         self.layout = QVBoxLayout(self)
         self.layout.setAlignment(Qt.AlignCenter)
@@ -25,9 +27,9 @@ class WizardWindow(QWidget):
         self.lang_label = QLabel("Language / Jazyk:")
         self.lang_label.setStyleSheet("color: #aaa; font-size: 12px;")
         self.lang_combo = QComboBox()
-        self.lang_combo.addItems(["English", "Slovenčina"])
-        current_lang = self.settings.value("language", "en")
-        self.lang_combo.setCurrentIndex(1 if current_lang == "sk" else 0)
+        for code, name in available_languages():
+            self.lang_combo.addItem(name, code)
+        self.lang_combo.setCurrentIndex(max(0, self.lang_combo.findData(get_language())))
         self.lang_combo.currentIndexChanged.connect(self._on_lang_changed)
         self.lang_layout.addWidget(self.lang_label)
         self.lang_layout.addWidget(self.lang_combo)
@@ -97,8 +99,7 @@ class WizardWindow(QWidget):
         """)
         
     def _on_lang_changed(self, index):
-        lang = "sk" if index == 1 else "en"
-        self.settings.setValue("language", lang)
+        set_language(self.lang_combo.itemData(index))
         self.refresh_texts()
 
     def refresh_texts(self):
@@ -120,11 +121,10 @@ class WizardWindow(QWidget):
             self.skip_btn.setEnabled(False)
             QApplication.processEvents()
             
-            # Inline the command to avoid path issues inside AppDir/pkexec scope
-            # Allowing both ref and dup --dry-run for fresh background checks
-            sudoers_content = 'ALL ALL=(root) NOPASSWD: /usr/bin/zypper --non-interactive dup --dry-run, /usr/bin/zypper --non-interactive ref'
-            cmd = f'echo "{sudoers_content}" > /etc/sudoers.d/suse-updater && chmod 440 /etc/sudoers.d/suse-updater'
-            subprocess.run(["pkexec", "bash", "-c", cmd], check=True)
+            # Allowing both ref and dup --dry-run for fresh background checks,
+            # keeping the passwordless commands if the user had enabled them
+            passwordless = self.settings.get("passwordless_updates")
+            install_rule(passwordless)
             
             # Test if the rule is correctly recognized by sudo policy!
             self.install_btn.setText("Testing Rule...")
@@ -140,6 +140,7 @@ class WizardWindow(QWidget):
             
             if ref_proc.returncode != 0 or test_proc.returncode != 0:
                 raise Exception(f"Rule installed, but test failed.\nRef exit: {ref_proc.returncode}, Dup exit: {test_proc.returncode}")
+            store_probe(True)
 
             self.setup_complete.emit()
             self.close()
@@ -0,0 +1,357 @@
+import queue
+import signal
+import subprocess
+import shlex
+import time
+import logging
+import threading
+import functools
+
+from repo_refresh import RefreshPolicy, DEFAULT_WINDOW_MINUTES
+from log_batcher import LineBatcher
+from run_log import RunLog, rotate_logs
+from history import HistoryDB, PhaseRecorder
+from task_graph import TaskGraph, DONE, RUNNING
+from progress import tracker_for, combine
+from proc_control import ProcessGroup, DEFAULT_UPDATE_TIMEOUT_MINUTES
+from zypp_lock import wait_for_lock, DEFAULT_LOCK_WAIT, CANCEL_POLL_SECONDS
+import helper_client
+
+PROGRESS_INTERVAL = 0.2 # seconds between progress events
+
+# Markers echoed by the privileged script, mapped to history phase names
+SCRIPT_PHASES = {
+    "___REF___": "zypper_ref",
+    "___DUP___": "zypper_dup",
+    "___FLATPAK___": "flatpak_system",
+}
+
+class UpdateEngine:
+    """Applies the selected updates. `on_lines` receives batches of log lines, see LineBatcher,
+    `on_progress` the overall progress, see progress.combine. Needs no Qt, the GUI wraps it in UpdaterRunner."""
+
+    def __init__(self, run_zypper=True, flatpak_system_apps=[], flatpak_user_apps=[], flatpak_installation_apps=None, config=None,
+                 trigger="update_all", zypper_count=0, on_lines=None, on_progress=None):
+        self.on_lines = on_lines
+        self.on_progress = on_progress
+        self._progress = {} # task -> latest progress event
+        self._progress_lock = threading.Lock()
+        self._last_progress = 0.0
+        self.config = config or {}
+        self.trigger = trigger # update_all or selective
+        self.zypper_count = zypper_count
+        self.recorder = PhaseRecorder()
+        self.procs = ProcessGroup()
+        self.timeout = self.config.get("update_timeout_minutes", DEFAULT_UPDATE_TIMEOUT_MINUTES) * 60 or None
+        self.exit_code = 0
+        self.run_zypper = run_zypper
+        self.flatpak_system_apps = flatpak_system_apps
+        self.flatpak_user_apps = flatpak_user_apps
+        self.flatpak_installation_apps = {name: apps for name, apps in (flatpak_installation_apps or {}).items() if apps}
+        self.logger = logging.getLogger("UpdateEngine")
+        
+    @property
+    def cancelled(self):
+        return self.procs.cancelled
+
+    def cancel(self):
+        """Stops the running commands, tasks that haven't started yet fail right away. A running
+        zypper dup is left to finish. Safe to call from any thread."""
+        self.procs.cancel()
+        if self.procs.protected_running():
+            self._log("The system upgrade can't be stopped safely, it finishes first.")
+
+    def installing(self):
+        """Whether a zypper dup is running, which nothing may interrupt."""
+        return self.procs.protected_running()
+
+    def _log(self, text):
+        with self._log_lock:
+            self._run_log.write(text)
+        self._batcher.add(text)
+
+    def run(self):
+        """Returns (success, run log path)."""
+        success = True
+        # The transcript streams straight to disk, only the path travels back to the GUI
+        self._run_log = RunLog("update")
+        self._log_lock = threading.Lock()
+        self._batcher = LineBatcher(self.on_lines or (lambda lines: None))
+        
+        try:
+            graph = self._build_graph()
+            graph.on_status = self._on_task_status
+            for name in graph.tasks:
+                self._progress[name] = {"task": name, "phase": None, "percent": 0.0, "eta": None}
+            statuses = graph.run(max_workers=len(graph.tasks))
+            for task in graph.tasks.values():
+                self._log(f"Task {task.name}: {task.status} ({task.duration:.1f}s)")
+            success = all(status == DONE for status in statuses.values())
+
+        except Exception as e:
+            self.logger.error(f"Error during update execution: {e}")
+            self._log(f"Exception: {e}")
+            success = False
+            
+        if self.cancelled:
+            self._log("Cancelled.")
+        self._log("Done.")
+        # Deliver the last batch before announcing the result
+        self._batcher.close()
+        self._run_log.close()
+        rotate_logs()
+        flatpak_count = (len(self.flatpak_system_apps) + len(self.flatpak_user_apps)
+                         + sum(len(apps) for apps in self.flatpak_installation_apps.values()))
+        HistoryDB().record_run("update", self.trigger, self.recorder, success, exit_code=self.exit_code,
+                               state="cancelled" if self.cancelled else ("success" if success else "failed"),
+                               zypper_count=self.zypper_count if self.run_zypper else 0,
+                               flatpak_count=flatpak_count, log_path=self._run_log.path)
+        return success, self._run_log.path
+
+    def _report(self, event, force=False):
+        with self._progress_lock:
+            self._progress[event["task"]] = event
+            now = time.monotonic()
+            if not force and now - self._last_progress < PROGRESS_INTERVAL:
+                return
+            self._last_progress = now
+            summary = combine(self._progress)
+        if self.on_progress:
+            self.on_progress(summary)
+
+    def _on_task_status(self, task):
+        if task.status != RUNNING:
+            # Finished, failed and skipped tasks all stop holding the bar back
+            self._report({"task": task.name, "phase": None, "percent": 100.0, "eta": None}, force=True)
+
+    def _record_spans(self, spans, phase_name):
+        # e.g. zypper_dup:download and zypper_dup:install, to tell a slow mirror from slow scriptlets
+        for sub_phase, (start, end) in spans.items():
+            self.recorder.add(f"{phase_name}:{sub_phase}", start, end - start)
+
+    def _build_graph(self):
+        # Only real dependencies are ordered: ref before dup. Flatpak installations each have
+        # their own lock, so they don't wait for zypper or for each other.
+        passwordless = self.config.get("passwordless_updates", False)
+        self._policy = RefreshPolicy(self.config.get("refresh_window_minutes", DEFAULT_WINDOW_MINUTES))
+        # None when the last check already refreshed every repository inside the window
+        ref_cmd = self._policy.plan() if self.run_zypper else None
+        if self.run_zypper and ref_cmd is None:
+            self._log("Repositories were refreshed recently, skipping zypper ref.")
+
+        graph = TaskGraph()
+        if not passwordless and not helper_client.available():
+            # A single privileged script, so pkexec prompts for the password only once
+            if self.run_zypper or self.flatpak_system_apps or self.flatpak_installation_apps:
+                graph.add("system", lambda: self._run_privileged_script(ref_cmd))
+        else:
+            # Each command separately, through the root helper (polkit remembers the password) or sudo -n
+            if self.run_zypper:
+                dup_after = []
+                if ref_cmd:
+                    graph.add("zypper_ref", lambda: self._run_passwordless_ref(ref_cmd))
+                    dup_after = ["zypper_ref"] # a failed refresh still leaves usable metadata
+                graph.add("zypper_dup", self._run_dup, after=dup_after)
+            if self.flatpak_system_apps:
+                graph.add("flatpak_system", self._run_flatpak_system)
+            for name, inst_apps in self.flatpak_installation_apps.items():
+                graph.add(f"flatpak_installation:{name}", functools.partial(self._run_flatpak_installation, name, inst_apps))
+
+        # User flatpaks always run separately without root
+        if self.flatpak_user_apps:
+            graph.add("flatpak_user", self._run_flatpak_user)
+        return graph
+
+    def _run_privileged_script(self, ref_cmd):
+        script = "set -e\n"
+        if self.run_zypper:
+            if ref_cmd:
+                script += "echo '___REF___'\n"
+                script += " ".join(shlex.quote(arg) for arg in ref_cmd) + "\n"
+            script += "echo '___DUP___'\n"
+            script += "zypper --non-interactive dup\n"
+        if self.flatpak_system_apps:
+            apps = " ".join(shlex.quote(app) for app in self.flatpak_system_apps)
+            script += "echo '___FLATPAK___'\n"
+            script += f"flatpak update -y --system {apps}\n"
+        for name, inst_apps in self.flatpak_installation_apps.items():
+            # Names come from the flatpak config and the app ids from its output, none of it is shell-safe
+            apps = " ".join(shlex.quote(app) for app in inst_apps)
+            script += f"echo {shlex.quote('___FLATPAK_INSTALLATION___ ' + name)}\n"
+            script += f"flatpak update -y {shlex.quote('--installation=' + name)} {apps}\n"
+
+        # Every step of the script gets an equal share of the "system" task's progress
+        steps = script.count("echo '___")
+        step = -1
+        tracker = None
+
+        # Better to wait here than to ask for the password and then fail on the lock
+        if self.cancelled or (self.run_zypper and not self._wait_for_zypp()):
+            return False
+        self._log("Requesting privileges and starting system updates...")
+        cmd = ["pkexec", "sh", "-c", script]
+        # Once pkexec has switched to root we can no longer signal the script. Cancel and the timeout
+        # then only stop us from waiting for it, the script runs on as root until it finishes.
+        # With a dup in it we wait in any case, the script must not lose its output mid-upgrade.
+        proc = self.procs.popen(cmd, self.timeout, protected=self.run_zypper,
+                                stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+        current_phase, phase_start, phase_bytes = None, time.time(), 0
+        for line in self._read_until_stopped(proc):
+            if line:
+                clean_line = line.strip()
+                if clean_line in SCRIPT_PHASES or clean_line.startswith("___FLATPAK_INSTALLATION___ "):
+                    # Each marker closes the previous step of the script
+                    if current_phase:
+                        self.recorder.add(current_phase, phase_start, time.time() - phase_start, 0, phase_bytes)
+                        if tracker:
+                            self._record_spans(tracker.spans, current_phase)
+                    current_phase = SCRIPT_PHASES.get(clean_line) or "flatpak_installation:" + clean_line.split(" ", 1)[1]
+                    phase_start, phase_bytes = time.time(), 0
+                    step += 1
+                    tracker = tracker_for(current_phase)
+                    self._report({"task": "system", "phase": current_phase, "percent": 100.0 * step / steps, "eta": None})
+                else:
+                    phase_bytes += len(line)
+                    event = tracker.feed(clean_line) if tracker else None
+                    if event:
+                        event = dict(event, task="system", percent=100.0 * (step + event["percent"] / 100) / steps)
+                        self._report(event)
+                if clean_line == "___REF___":
+                    self._log("Refreshing repositories (zypper ref)...")
+                elif clean_line == "___DUP___":
+                    if ref_cmd:
+                        self._policy.record_refresh(ref_cmd)
+                    self._log("Running zypper dup (system upgrade)...")
+                elif clean_line == "___FLATPAK___":
+                    self._log(f"Updating {len(self.flatpak_system_apps)} system flatpaks...")
+                elif clean_line.startswith("___FLATPAK_INSTALLATION___ "):
+                    name = clean_line.split(" ", 1)[1]
+                    self._log(f"Updating {len(self.flatpak_installation_apps[name])} flatpaks in installation '{name}'...")
+                else:
+                    self._log(f"System: {clean_line}")
+        abandoned = proc.poll() is None and (self.cancelled or proc.timed_out) and not proc.protected
+        returncode = -signal.SIGTERM if abandoned else proc.wait()
+        self.procs.release(proc)
+        if current_phase:
+            self.recorder.add(current_phase, phase_start, time.time() - phase_start, returncode, phase_bytes)
+            if tracker:
+                self._record_spans(tracker.spans, current_phase)
+        if proc.timed_out:
+            self._log(f"System update did not finish within {self.timeout // 60} min.")
+        if abandoned:
+            self._log("Stopped waiting for the system update, it keeps running as root until it finishes.")
+        if returncode != 0:
+            self.exit_code = returncode
+            self._log(f"System update failed with return code {returncode}")
+        return returncode == 0
+
+    def _read_until_stopped(self, proc):
+        """Yields the output lines of `proc`, and stops early after cancel() or its timeout
+        even while the process, out of our reach as root, keeps writing."""
+        lines = queue.Queue()
+
+        def read():
+            for line in iter(proc.stdout.readline, ''):
+                lines.put(line)
+            lines.put(None)
+        threading.Thread(target=read, daemon=True).start()
+        while True:
+            try:
+                line = lines.get(timeout=CANCEL_POLL_SECONDS)
+            except queue.Empty:
+                if (self.cancelled or proc.timed_out) and not proc.protected:
+                    return
+                continue
+            if line is None:
+                return
+            yield line
+
+    def _wait_for_zypp(self):
+        """Waits for YaST or a terminal zypper to finish. False if the lock stayed taken."""
+        started = time.time()
+        waited = []
+
+        def announce(pid, name):
+            waited.append(name)
+            self._log(f"Waiting for {name} (pid {pid}) to release the package manager lock...")
+        free = wait_for_lock(DEFAULT_LOCK_WAIT, announce, cancelled=lambda: self.cancelled)
+        if waited:
+            self.recorder.add("zypp_lock_wait", started, time.time() - started)
+        if not free and not self.cancelled:
+            self._log(f"Gave up waiting for {waited[-1]} after {DEFAULT_LOCK_WAIT // 60} min.")
+        return free
+
+    def _run_passwordless_ref(self, ref_cmd):
+        if not self._wait_for_zypp():
+            return False
+        self._log("Refreshing repositories (zypper ref)...")
+        ref_ok = self._run_ref(ref_cmd)
+        if not ref_ok and len(ref_cmd) > 3:
+            # Sudoers rules from older versions only allow a full refresh
+            ref_cmd = ref_cmd[:3]
+            ref_ok = self._run_ref(ref_cmd)
+        if ref_ok:
+            self._policy.record_refresh(ref_cmd)
+        return ref_ok
+
+    def _run_dup(self):
+        if not self._wait_for_zypp():
+            return False
+        self._log("Running zypper dup (system upgrade)...")
+        dup_cmd = ["sudo", "-n", "zypper", "--non-interactive", "dup"]
+        # No timeout and no cancel: stopping it mid-transaction leaves the system half upgraded
+        return self._stream(dup_cmd, "Zypper Dup", "zypper_dup", ("dup", {}), protected=True)
+
+    def _run_flatpak_system(self):
+        self._log(f"Updating {len(self.flatpak_system_apps)} system flatpaks...")
+        fp_cmd = ["sudo", "-n", "flatpak", "update", "-y", "--system"] + self.flatpak_system_apps
+        args = {"scope": "system", "apps": self.flatpak_system_apps}
+        return self._stream(fp_cmd, "Flatpak (System)", "flatpak_system", ("flatpak_update", args))
+
+    def _run_flatpak_installation(self, name, inst_apps):
+        self._log(f"Updating {len(inst_apps)} flatpaks in installation '{name}'...")
+        inst_cmd = ["sudo", "-n", "flatpak", "update", "-y", f"--installation={name}"] + inst_apps
+        args = {"scope": name, "apps": inst_apps}
+        return self._stream(inst_cmd, f"Flatpak ({name})", f"flatpak_installation:{name}", ("flatpak_update", args))
+
+    def _run_flatpak_user(self):
+        self._log(f"Updating {len(self.flatpak_user_apps)} user flatpaks...")
+        usr_cmd = ["flatpak", "update", "-y", "--user"] + self.flatpak_user_apps
+        return self._stream(usr_cmd, "Flatpak (User)", "flatpak_user")
+
+    def _stream(self, cmd, prefix, phase_name, privileged=None, protected=False):
+        """Runs `cmd`, or the (op, args) `privileged` in the root helper with `cmd` as the fallback.
+        A `protected` command runs to the end, see ProcessGroup."""
+        if self.cancelled:
+            return False
+        tracker = tracker_for(phase_name)
+        kwargs = dict(stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, protected=protected)
+        with self.recorder.phase(phase_name) as phase:
+            if privileged:
+                proc = self.procs.privileged(*privileged, cmd, self.timeout, on_progress=self._report, **kwargs)
+            else:
+                proc = self.procs.popen(cmd, self.timeout, **kwargs)
+            helper = isinstance(proc, helper_client.HelperProcess)
+            if helper:
+                # The helper sends its own progress events and spans
+                tracker = None
+            for line in iter(proc.stdout.readline, ''):
+                if line:
+                    phase["output_bytes"] += len(line)
+                    self._log(f"{prefix}: {line.strip()}")
+                    event = tracker.feed(line) if tracker else None
+                    if event:
+                        self._report(event)
+            proc.wait()
+            phase["exit_code"] = proc.returncode
+            self.procs.release(proc)
+        if proc.timed_out:
+            self._log(f"{prefix}: did not finish within {self.timeout // 60} min, stopped.")
+        if helper or tracker:
+            self._record_spans(proc.spans if helper else tracker.spans, phase_name)
+        if proc.returncode != 0:
+            self.exit_code = proc.returncode
+        return proc.returncode == 0
+
+    def _run_ref(self, ref_cmd):
+        return self._stream(["sudo", "-n"] + ref_cmd, "Zypper Ref", "zypper_ref", ("refresh", {"repos": ref_cmd[3:]}))
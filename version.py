@@ -0,0 +1 @@
+APP_VERSION = "0.1.7"
@@ -0,0 +1,70 @@
+import os
+import time
+import select
+
+# libzypp writes the PID of the process holding the package manager lock here
+ZYPP_PID_FILE = "/run/zypp.pid"
+ZYPPER_EXIT_LOCKED = 7
+DEFAULT_LOCK_WAIT = 900 # seconds
+CANCEL_POLL_SECONDS = 2.0
+
+def _alive(pid):
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            # The state follows the command name, which may contain spaces
+            state = f.read().rsplit(")", 1)[1].split()[0]
+    except (OSError, IndexError):
+        return False
+    return state != "Z"
+
+def lock_holder(pid_file=ZYPP_PID_FILE):
+    """PID of the live process holding the zypp lock, or None when it is free."""
+    try:
+        with open(pid_file) as f:
+            pid = int(f.read().strip() or 0)
+    except (OSError, ValueError):
+        return None
+    # A zypper that crashed leaves its PID behind
+    if pid <= 0 or pid == os.getpid() or not _alive(pid):
+        return None
+    return pid
+
+def process_name(pid):
+    try:
+        with open(f"/proc/{pid}/comm") as f:
+            return f.read().strip()
+    except OSError:
+        return "another process"
+
+def _wait_for_exit(pid, timeout):
+    # A pidfd turns readable when the process exits, so there is nothing to poll
+    try:
+        fd = os.pidfd_open(pid)
+    except (AttributeError, OSError):
+        time.sleep(min(timeout, CANCEL_POLL_SECONDS))
+        return
+    try:
+        select.select([fd], [], [], timeout)
+    finally:
+        os.close(fd)
+
+def wait_for_lock(timeout=DEFAULT_LOCK_WAIT, on_wait=None, cancelled=None, pid_file=ZYPP_PID_FILE):
+    """Blocks while another process (YaST, a zypper in a terminal) holds the zypp lock.
+
+    Returns True once the lock is free, False on timeout or when `cancelled()`
+    turns true. `on_wait(pid, name)` is called once for every new holder.
+    """
+    deadline = time.monotonic() + timeout
+    announced = None
+    while True:
+        pid = lock_holder(pid_file)
+        if pid is None:
+            return True
+        if pid != announced:
+            announced = pid
+            if on_wait:
+                on_wait(pid, process_name(pid))
+        remaining = deadline - time.monotonic()
+        if remaining <= 0 or (cancelled and cancelled()):
+            return False
+        _wait_for_exit(pid, min(remaining, CANCEL_POLL_SECONDS) if cancelled else remaining)
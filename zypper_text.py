@@ -0,0 +1,138 @@
+import re
+import codecs
+from collections import deque
+
+from progress import ZYPPER_TOTAL_RE, parse_size
+
+# Raw lines kept for the log view, the rest of the output is only parsed
+OUTPUT_TAIL_LINES = 500
+CHUNK_SIZE = 65536
+
+# The following 12 packages are going to be upgraded:
+# The following NEW package is going to be installed:
+# The following 2 packages are going to change vendor:
+# The following product is going to be upgraded:
+HEADER_RE = re.compile(r"^The following (?:(\d+) )?(?:NEW )?(package|patch|pattern|product|source package|application)(?:e?s)?"
+                       r" (?:is|are) going to (?:be )?(.+?):$")
+HEADER_ACTIONS = {
+    "upgraded": "upgrade",
+    "downgraded": "downgrade",
+    "installed": "install",
+    "REMOVED": "remove",
+    "reinstalled": "reinstall",
+    "change architecture": "change-arch",
+    "change vendor": "change-vendor",
+}
+# Sections that count as pending updates, arch and vendor changes are listed again under upgrade
+COUNTED_ACTIONS = ("upgrade", "downgrade", "install", "remove", "reinstall")
+PROBLEM_RE = re.compile(r"^Problem: (?:\d+: )?(.*)")
+SOLUTION_RE = re.compile(r"^\s*Solution \d+: (.*)")
+
+class TextDryRunParser:
+    """Line state machine over the plain `zypper dup --dry-run` output, for sudoers rules without --xmlout.
+
+    Lines are handled one at a time as they arrive. Only the counts, problems
+    and the last `tail_lines` raw lines are kept, so memory does not grow with
+    the size of the update.
+    """
+
+    def __init__(self, tail_lines=OUTPUT_TAIL_LINES):
+        self.tail = deque(maxlen=tail_lines)
+        self.lines = 0
+        self.counts = {} # action -> packages
+        self.problems = []
+        self.download_size = 0
+        self.nothing_to_do = False
+        self.dependency_issue = False
+        self._state = None # None, "packages" or "problem"
+        self._section = None
+        self._declared = None
+        self._listed = 0
+
+    def feed(self, line):
+        line = line.rstrip("\r\n")
+        self.tail.append(line)
+        self.lines += 1
+        stripped = line.strip()
+        indented = line[:1].isspace()
+
+        if self._state == "packages":
+            if indented and stripped:
+                self._listed += len(stripped.split())
+                return
+            self._end_section()
+        elif self._state == "problem":
+            match = SOLUTION_RE.match(line)
+            if match:
+                self.problems[-1]["solutions"].append({"description": match.group(1).strip(), "details": ""})
+                return
+            if indented or not stripped:
+                if stripped:
+                    target = self.problems[-1]["solutions"] or [self.problems[-1]]
+                    target[-1]["details"] = (target[-1]["details"] + "\n" + stripped).strip()
+                return
+            self._state = None
+
+        match = HEADER_RE.match(stripped)
+        if match and match.group(3) in HEADER_ACTIONS:
+            self._state = "packages"
+            # Products, patterns and the like are listed too, but only packages are counted
+            self._section = HEADER_ACTIONS[match.group(3)] if match.group(2) == "package" else None
+            self._declared = int(match.group(1)) if match.group(1) else None
+            self._listed = 0
+            return
+        match = PROBLEM_RE.match(stripped)
+        if match:
+            self._state = "problem"
+            self.problems.append({"description": match.group(1).strip(), "details": "", "solutions": []})
+            return
+        if "Nothing to do." in line:
+            self.nothing_to_do = True
+        match = ZYPPER_TOTAL_RE.search(line)
+        if match:
+            self.download_size = parse_size(*match.groups())
+        if "depend" in line.lower():
+            self.dependency_issue = True
+
+    def _end_section(self):
+        if self._section:
+            count = self._declared if self._declared is not None else self._listed
+            self.counts[self._section] = self.counts.get(self._section, 0) + count
+        self._state = self._section = None
+
+    def finish(self):
+        if self._state == "packages":
+            self._end_section()
+        self._state = None
+
+    def output(self):
+        text = "\n".join(self.tail)
+        omitted = self.lines - len(self.tail)
+        return f"[{omitted} earlier lines omitted]\n" + text if omitted > 0 else text
+
+    def result(self, returncode):
+        # Exit codes 100+ are informational (updates or a reboot needed), same rule as the XML path
+        conflict = bool(self.problems or self.dependency_issue or 0 < returncode < 100) and not self.nothing_to_do
+        return {
+            "zypper_updates": 0 if self.nothing_to_do else sum(self.counts.get(a, 0) for a in COUNTED_ACTIONS),
+            "zypper_conflict": conflict,
+            "zypper_output": self.output(),
+            "zypper_problems": self.problems,
+            "zypper_download_size": self.download_size,
+        }
+
+def parse_dup_text(stream, tail_lines=OUTPUT_TAIL_LINES):
+    """Runs a binary stream through TextDryRunParser, decoding chunk by chunk as it arrives."""
+    parser = TextDryRunParser(tail_lines)
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    pending = ""
+    for chunk in iter(lambda: stream.read(CHUNK_SIZE), b""):
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            parser.feed(line)
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        parser.feed(pending)
+    parser.finish()
+    return parser
@@ -0,0 +1,152 @@
+import xml.etree.ElementTree as ET
+
+# Sections of <install-summary> and the action they stand for
+SUMMARY_SECTIONS = {
+    "to-upgrade": "upgrade",
+    "to-downgrade": "downgrade",
+    "to-install": "install",
+    "to-reinstall": "reinstall",
+    "to-remove": "remove",
+    "to-change-arch": "change-arch",
+    "to-change-vendor": "change-vendor",
+}
+
+def _int_attr(elem, *names):
+    for name in names:
+        value = elem.get(name)
+        if value:
+            try:
+                return int(value)
+            except ValueError:
+                pass
+    return 0
+
+def _text(elem, tag):
+    child = elem.find(tag)
+    return (child.text or "").strip() if child is not None else ""
+
+def _parse_problem(elem):
+    problem = {
+        "description": _text(elem, "description"),
+        "details": _text(elem, "details"),
+        "solutions": [],
+    }
+    for sol in elem.iter("solution"):
+        problem["solutions"].append({
+            "description": _text(sol, "description"),
+            "details": _text(sol, "details"),
+        })
+    return problem
+
+def parse_dup_xml(stream):
+    """Parse the output of `zypper --xmlout dup --dry-run` from a binary stream.
+
+    Elements are consumed as they arrive and discarded right after, so memory
+    only grows with the package records themselves, not with the raw XML.
+    """
+    result = {
+        "packages": [],
+        "problems": [],
+        "messages": [],
+        "download_size": 0,
+        "packages_to_change": 0,
+        "valid": False,
+    }
+    packages = {} # (name, arch) -> record, keeps vendor changes merged with their upgrade
+    section = None
+    section_elem = None
+    depth_in_problem = 0
+    path = [] # open elements, root first
+
+    for event, elem in ET.iterparse(stream, events=("start", "end")):
+        tag = elem.tag
+        if event == "start":
+            path.append(elem)
+            if tag == "stream":
+                result["valid"] = True
+            elif tag in SUMMARY_SECTIONS:
+                section = SUMMARY_SECTIONS[tag]
+                section_elem = elem
+            elif tag == "problem":
+                depth_in_problem += 1
+            elif tag == "install-summary":
+                result["download_size"] = _int_attr(elem, "download-size")
+                result["packages_to_change"] = _int_attr(elem, "packages-to-change")
+            continue
+
+        path.pop()
+        if tag == "solvable" and section:
+            key = (elem.get("name", ""), elem.get("arch", ""))
+            record = packages.get(key)
+            if record is None:
+                record = {
+                    "name": key[0],
+                    "arch": key[1],
+                    "action": section,
+                    "old_version": elem.get("edition-old", ""),
+                    "new_version": elem.get("edition", ""),
+                    "repo": elem.get("repository", ""),
+                    "vendor_change": False,
+                    "download_size": _int_attr(elem, "download-size", "size"),
+                }
+                packages[key] = record
+                result["packages"].append(record)
+            if section == "change-vendor":
+                record["vendor_change"] = True
+                record["old_vendor"] = elem.get("vendor-old", "")
+                record["new_vendor"] = elem.get("vendor", "")
+            elif record["action"] == "change-vendor":
+                record["action"] = section
+            section_elem.remove(elem)
+        elif tag in SUMMARY_SECTIONS:
+            section = section_elem = None
+            elem.clear()
+        elif tag == "problem":
+            depth_in_problem -= 1
+            if depth_in_problem == 0:
+                result["problems"].append(_parse_problem(elem))
+                elem.clear()
+        elif tag == "message" and not depth_in_problem:
+            text = (elem.text or "").strip()
+            if text:
+                result["messages"].append({"type": elem.get("type", "info"), "text": text})
+            elem.clear()
+
+        # Drop finished top-level elements (progress, messages, summaries) from the tree
+        if len(path) == 1 and not depth_in_problem:
+            path[0].remove(elem)
+
+    if not result["packages_to_change"]:
+        result["packages_to_change"] = sum(1 for p in result["packages"] if p["action"] != "change-vendor")
+    if not result["download_size"]:
+        result["download_size"] = sum(p["download_size"] for p in result["packages"])
+    return result
+
+def format_size(num_bytes):
+    size = float(num_bytes)
+    for unit in ("B", "KiB", "MiB", "GiB"):
+        if size < 1024 or unit == "GiB":
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+
+def summarize(parsed, max_packages=None):
+    # Human readable transcript for the raw log tab, the package list is in the results anyway
+    lines = [m["text"] for m in parsed["messages"]]
+    shown = parsed["packages"] if max_packages is None else parsed["packages"][:max_packages]
+    for p in shown:
+        version = f"{p['old_version']} -> {p['new_version']}" if p["old_version"] else p["new_version"]
+        vendor = " (vendor change)" if p["vendor_change"] else ""
+        lines.append(f"{p['action']}: {p['name']}.{p['arch']} {version} [{p['repo']}]{vendor}")
+    if len(shown) < len(parsed["packages"]):
+        lines.append(f"... and {len(parsed['packages']) - len(shown)} more")
+    for problem in parsed["problems"]:
+        lines.append(f"Problem: {problem['description']}")
+        if problem["details"]:
+            lines.append(f"  {problem['details']}")
+        for i, sol in enumerate(problem["solutions"], 1):
+            lines.append(f"  Solution {i}: {sol['description']}")
+    if parsed["packages"]:
+        lines.append(f"{parsed['packages_to_change']} packages to change, overall download size: {format_size(parsed['download_size'])}.")
+    elif not parsed["problems"]:
+        lines.append("Nothing to do.")
+    return "\n".join(lines)